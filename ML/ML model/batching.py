@@ -0,0 +1,354 @@
+"""
+Micro-batching
+asyncio front end for `predict.py --serve` that scores concurrent requests
+together.
+
+The backend keeps many single-row requests in flight on one predictor
+process. Answered one by one, each pays the fixed cost of a model call
+(building the feature matrix, walking the trees), which at one row dominates
+the actual evaluation. MicroBatcher queues the rows of incoming requests and
+scores them as one matrix with Predictor.predict_batch, then hands every
+caller its own slice of the results.
+
+While a batch is being scored the next one fills up, so under load batches
+grow with the scoring time even with no window at all (`window_ms` 0, the
+default of predict.py). A window additionally holds a batch open for up to
+`window_ms` after its oldest request arrived, or until it holds `max_batch`
+rows. The wait adapts: when waiting gathers nothing (an idle server, or
+clients that only send after their previous reply), it decays to zero
+instead of delaying every lone request. A request that has waited more than
+`max_latency_ms` by the time its batch closes is answered with an
+"Overloaded" error instead of making the backlog worse.
+
+Batch sizes and queue waits are kept in histograms, reported by
+{ "cmd": "stats" } under "batching".
+"""
+
+import asyncio
+import bisect
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+WAIT_MS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+# StreamReader line limit; a "batch" request can be a long line
+LINE_LIMIT = 64 * 1024 * 1024
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, mean, max and bucket-bound quantiles."""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (max for the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        buckets = {f'le_{bound:g}': count for bound, count in zip(self.bounds, self.counts)}
+        buckets['le_inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 4) if self.count else None,
+            'max': round(self.max, 4),
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+class MicroBatcher:
+    """Collects rows from concurrent callers and scores them as one batch.
+
+    `score(rows)` must return one result per row in order. It runs on a
+    single worker thread, so it is never called concurrently and a slow batch
+    does not stall reading, queueing or shedding of the next requests.
+    `threaded=False` runs it on the event loop instead, blocking everything
+    else while it scores.
+    """
+
+    def __init__(self, score, window_ms=2.0, max_batch=256, max_latency_ms=1000.0, threaded=True):
+        self.score = score
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max_latency_ms / 1000
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self.batches = self.rows = self.shed = 0
+        self._queue = None
+        self._carry = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='predict') if threaded else None
+        # How long a batch currently waits for more rows, between 0 and the window
+        self.wait = self.window
+        self._probe = 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def submit(self, rows):
+        """Score `rows` (a list of payloads) in the next batch; returns their results."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((rows, future, time.perf_counter()))
+        return await future
+
+    async def drain(self):
+        """Wait until every request submitted before this call has been answered."""
+        await self.submit([])
+
+    async def _next(self, timeout):
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        if timeout is None:
+            return await self._queue.get()
+        if timeout <= 0:
+            return self._queue.get_nowait()
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    async def _collect(self):
+        """Wait for the first request, then gather a batch behind it."""
+        batch = [await self._next(None)]
+        # Let requests that were read together with the first one reach the queue
+        await asyncio.sleep(0)
+        n_rows = len(batch[0][0])
+        deadline = batch[0][2] + self.wait
+        waited = joined = False
+        while n_rows < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                if self._carry is None and self._queue.empty() and timeout > 0:
+                    waited = True
+                    item = await self._next(timeout)
+                    joined = True
+                else:
+                    item = await self._next(0)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if n_rows + len(item[0]) > self.max_batch:
+                # Never split a request; it starts the next batch instead
+                self._carry = item
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        self._adapt(waited, joined, len(batch))
+        return batch
+
+    def _adapt(self, waited, joined, n_requests):
+        """Shrink the wait when it gathers nothing, grow it back when it does.
+
+        Clients that each wait for their reply before sending again can never
+        be joined by waiting, so the wait decays to zero. At zero it is probed
+        again now and then once batches show concurrent arrivals.
+        """
+        if joined:
+            self.wait = min(self.window, self.wait * 2)
+        elif waited:
+            self.wait = self.wait / 2 if self.wait > self.window / 64 else 0.0
+        elif self.wait == 0.0 and n_requests > 1:
+            self._probe += 1
+            if self._probe % 32 == 0:
+                self.wait = self.window / 8
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            closed = time.perf_counter()
+            live = []
+            for rows, future, arrived in batch:
+                if future.done():
+                    continue
+                if not rows:
+                    # A drain() marker: everything queued before it is in this batch
+                    live.append((rows, future))
+                    continue
+                waited = closed - arrived
+                self.queue_wait_ms.observe(waited * 1000)
+                if waited > self.max_latency:
+                    self.shed += 1
+                    details = f'queued {waited * 1000:.0f} ms'
+                    future.set_result([{ 'error': 'Overloaded', 'details': details }
+                                       for _ in rows])
+                else:
+                    live.append((rows, future))
+            if not live:
+                continue
+            rows = [row for item_rows, _ in live for row in item_rows]
+            results = []
+            if rows:
+                self.batches += 1
+                self.rows += len(rows)
+                self.batch_sizes.observe(len(rows))
+                try:
+                    if self._executor is not None:
+                        results = await loop.run_in_executor(self._executor, self.score, rows)
+                    else:
+                        results = self.score(rows)
+                except Exception as e:
+                    results = [{ 'error': 'Model prediction failed', 'details': str(e) }
+                               for _ in rows]
+            start = 0
+            for item_rows, future in live:
+                if not future.done():
+                    future.set_result(results[start:start + len(item_rows)])
+                start += len(item_rows)
+
+    def stats(self):
+        return {
+            'windowMs': self.window * 1000,
+            'currentWaitMs': round(self.wait * 1000, 4),
+            'maxBatch': self.max_batch,
+            'maxLatencyMs': self.max_latency * 1000,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'batches': self.batches,
+            'rows': self.rows,
+            'shed': self.shed,
+            'rowsPerBatch': round(self.rows / self.batches, 2) if self.batches else None,
+            'batchSize': self.batch_sizes.to_dict(),
+            'queueWaitMs': self.queue_wait_ms.to_dict(),
+        }
+
+
+async def handle_line(predictor, batcher, line):
+    """Async counterpart of predict.handle_line that scores through the batcher."""
+    from predict import format_reply, parse_request
+
+    started = time.perf_counter()
+    request_id, kind, body = parse_request(line)
+    if kind == 'error':
+        result = body
+    elif kind == 'stats':
+        # Report the state after the requests sent before this one
+        await batcher.drain()
+        result = dict(predictor.stats(), batching=batcher.stats())
+    elif kind == 'batch':
+        result = { 'results': await batcher.submit(body) }
+    else:
+        result = dict((await batcher.submit([body]))[0])
+    return format_reply(result, request_id, started)
+
+
+async def _answer_stream(predictor, batcher, reader, write):
+    """Answer every line of `reader`, replying in request order.
+
+    Each line is handled as its own task, so many requests of one stream can
+    wait in the same batch; a writer task sends the replies in order.
+    """
+    replies = asyncio.Queue()
+
+    async def writer():
+        while True:
+            task = await replies.get()
+            if task is None:
+                return
+            await write(await task)
+
+    writing = asyncio.ensure_future(writer())
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        line = line.decode('utf-8')
+        if line.strip():
+            replies.put_nowait(asyncio.ensure_future(handle_line(predictor, batcher, line)))
+    replies.put_nowait(None)
+    await writing
+
+
+class _ThreadLineReader:
+    """readline() on a worker thread, for stdin that cannot be polled (a regular file)."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def readline(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self.stream.readline)
+
+
+async def _stdin_reader():
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=LINE_LIMIT)
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    except (ValueError, OSError):
+        return _ThreadLineReader(sys.stdin.buffer)
+    return reader
+
+
+async def serve(predictor, batcher, socket_path=None):
+    """Serve the line protocol on stdin/stdout, or on a Unix socket, until EOF or interrupted."""
+    import os
+
+    batcher.start()
+    try:
+        if socket_path:
+            async def connection(reader, writer):
+                async def write(reply):
+                    writer.write(reply.encode('utf-8'))
+                    await writer.drain()
+                try:
+                    await _answer_stream(predictor, batcher, reader, write)
+                finally:
+                    writer.close()
+
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            server = await asyncio.start_unix_server(connection, socket_path, limit=LINE_LIMIT)
+            print(f'[predict] listening on {socket_path} (micro-batching)', file=sys.stderr)
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                os.unlink(socket_path)
+        else:
+            reader = await _stdin_reader()
+
+            async def write(reply):
+                sys.stdout.write(reply)
+                sys.stdout.flush()
+
+            await _answer_stream(predictor, batcher, reader, write)
+    finally:
+        await batcher.close()
+
+
+def run(predictor, window_ms, max_batch, max_latency_ms, socket_path=None):
+    """Blocking entry point used by predict.py --serve."""
+    batcher = MicroBatcher(predictor.predict_batch, window_ms, max_batch, max_latency_ms)
+    try:
+        asyncio.run(serve(predictor, batcher, socket_path))
+    except KeyboardInterrupt:
+        pass
+    return batcher
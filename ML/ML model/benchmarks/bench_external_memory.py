@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+External-memory Training Benchmark
+Memory and time of training on a processed dataset in memory (the default
+xgboost_model.py path) versus out of core (--external-memory) for several
+chunk sizes.
+
+Every run trains the same fixed parameters (external_memory.DEFAULT_PARAMS,
+hist) in a fresh process and reports wall time (load + train + test
+metrics), peak RSS (VmHWM) and peak anonymous RSS. Peak RSS also counts
+file-backed pages (the memory-mapped dataset and page cache), which the
+kernel can drop under pressure; anonymous memory is what has to fit in RAM.
+
+Usage:
+    python benchmarks/bench_suite.py --sizes 5m --stages generate preprocess --workdir data
+    python benchmarks/bench_external_memory.py --data data/5m/processed.parquet
+        [--chunk-rows 100000 500000] [--n-estimators 200] [--json out.json]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import warnings
+from pathlib import Path
+
+ML_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ML_DIR))
+warnings.filterwarnings('ignore')
+
+RESULT_PREFIX = 'BENCH_RESULT '
+
+
+class PeakAnonRss:
+    """Samples RssAnon of this process every 20 ms (the kernel keeps no peak for it)."""
+
+    def __init__(self):
+        self.peak_kb = 0
+        threading.Thread(target=self._sample, daemon=True).start()
+
+    def _sample(self):
+        while True:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('RssAnon:'):
+                        self.peak_kb = max(self.peak_kb, int(line.split()[1]))
+            time.sleep(0.02)
+
+
+def vm_hwm_mb():
+    with open('/proc/self/status') as f:
+        return [int(line.split()[1]) / 1024 for line in f if line.startswith('VmHWM:')][0]
+
+
+def run_in_memory(args):
+    import xgboost as xgb
+    from external_memory import DEFAULT_PARAMS
+    from xgboost_model import load_processed_data, prepare_train_test_split, regression_metrics
+
+    df = load_processed_data(args.data)
+    X_train, X_test, y_train, y_test = prepare_train_test_split(df)
+    del df
+    params = dict(DEFAULT_PARAMS, n_estimators=args.n_estimators)
+    model = xgb.XGBRegressor(objective='reg:squarederror', tree_method='hist',
+                             random_state=42, n_jobs=-1, **params)
+    model.fit(X_train, y_train)
+    return {'train_rows': len(X_train), 'test_rmse': regression_metrics(y_test, model.predict(X_test))['rmse']}
+
+
+def run_external(args):
+    import external_memory
+
+    params = dict(external_memory.DEFAULT_PARAMS, n_estimators=args.n_estimators)
+    booster, info = external_memory.train(args.data, params, chunk_rows=args.chunk_rows[0], nthread=-1)
+    metrics = external_memory.evaluate(booster, args.data, chunk_rows=args.chunk_rows[0])
+    return {'train_rows': info['rows'], 'cache_mb': info['cache_bytes'] / 1e6,
+            'test_rmse': metrics['test']['rmse']}
+
+
+def run(mode, args, chunk_rows=None):
+    """One training run in a fresh interpreter; returns its result dict."""
+    cmd = [sys.executable, __file__, '--data', str(args.data), '--mode', mode,
+           '--n-estimators', str(args.n_estimators)]
+    if chunk_rows:
+        cmd += ['--chunk-rows', str(chunk_rows)]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, text=True)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"{mode} run failed (exit {proc.returncode})")
+    return json.loads(lines[-1][len(RESULT_PREFIX):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--data', required=True, help='processed dataset (.csv, .parquet or .arrow)')
+    parser.add_argument('--chunk-rows', nargs='+', type=int, default=[100_000, 500_000])
+    parser.add_argument('--n-estimators', type=int, default=200)
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--mode', choices=('in_memory', 'external'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # Child process: one run, reported on the last stdout line
+        rss = PeakAnonRss()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            result = (run_in_memory if args.mode == 'in_memory' else run_external)(args)
+        result.update(wall_s=time.perf_counter() - started, peak_rss_mb=vm_hwm_mb(),
+                      peak_anon_mb=rss.peak_kb / 1024)
+        print(RESULT_PREFIX + json.dumps(result))
+        return result
+
+    runs = [('in memory', 'in_memory', None)]
+    runs += [(f'external, {n:,}-row chunks', 'external', n) for n in args.chunk_rows]
+    results = []
+    print(f"{'mode':<30} {'wall s':>7} {'peak RSS MB':>12} {'anon MB':>8} {'cache MB':>9} {'test RMSE':>10}")
+    for label, mode, chunk_rows in runs:
+        result = run(mode, args, chunk_rows)
+        result.update(mode=label, chunk_rows=chunk_rows)
+        results.append(result)
+        cache = f"{result['cache_mb']:.0f}" if 'cache_mb' in result else '-'
+        print(f"{label:<30} {result['wall_s']:>7.1f} {result['peak_rss_mb']:>12.0f} {result['peak_anon_mb']:>8.0f} "
+              f"{cache:>9} {result['test_rmse']:>10,.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter Search Benchmark
+Compares wall time and best CV RMSE of the search engines in
+xgboost_model.hyperparameter_tuning: the exhaustive GridSearchCV
+(324 configurations x 5 folds) against random search and successive halving
+on prebuilt folds with early stopping.
+
+All engines score the same unshuffled 5-fold split, so the CV RMSE values are
+directly comparable. The test RMSE of the refitted model is reported too.
+
+Usage:
+    python benchmarks/bench_hyperparameter_search.py [--rows N] [--engines grid random halving]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ML_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ML_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+warnings.filterwarnings('ignore')
+
+
+def best_cv_rmse(engine, X, y, seed, n_iter):
+    """Best CV RMSE an engine reports, scored on the shared folds."""
+    from sklearn.model_selection import cross_val_score
+    import xgboost as xgb
+    from xgboost_model import hyperparameter_tuning
+
+    out = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        model, params = hyperparameter_tuning(X, y, search=engine, n_iter=n_iter, seed=seed)
+    elapsed = time.perf_counter() - started
+    # Re-score the chosen parameters with plain 5-fold CV so every engine is
+    # measured the same way (early stopping scores are slightly optimistic)
+    scores = cross_val_score(xgb.XGBRegressor(objective='reg:squarederror', random_state=seed, **params),
+                             X, y, cv=5, scoring='neg_mean_squared_error')
+    return model, params, elapsed, float(np.sqrt(-scores.mean()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--engines', nargs='+', default=['grid', 'random', 'halving'])
+    parser.add_argument('--n-iter', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+    from bench_processed_formats import make_processed_frame
+
+    df = make_processed_frame(args.rows, seed=args.seed)
+    X = df.drop(columns=['Price'])
+    y = df['Price']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=args.seed)
+
+    print(f"{len(X_train):,} training rows x {X.shape[1]} features")
+    print(f"{'engine':<9} {'wall s':>8} {'CV RMSE':>12} {'test RMSE':>12}  params")
+    results = {}
+    for engine in args.engines:
+        model, params, elapsed, cv_rmse = best_cv_rmse(engine, X_train, y_train, args.seed, args.n_iter)
+        test_rmse = float(np.sqrt(np.mean((model.predict(X_test) - y_test) ** 2)))
+        results[engine] = {'wall_s': elapsed, 'cv_rmse': cv_rmse, 'test_rmse': test_rmse, 'params': params}
+        print(f"{engine:<9} {elapsed:>8.1f} {cv_rmse:>12,.2f} {test_rmse:>12,.2f}  {params}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'rows': args.rows, 'results': results}, f, indent=2, default=int)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Micro-batching Benchmark
+Throughput and latency of `predict.py --serve` for concurrent single-row
+requests, one request at a time (--no-micro-batch) versus micro-batched.
+
+Like the backend, the benchmark keeps requests in flight on one predictor
+process over stdin/stdout, matching replies by id. Two load shapes:
+  --concurrency C   closed loop: C clients, each sends its next request when
+                    the previous reply arrives
+  --rates R         open loop: requests arrive at R per second (Poisson),
+                    whether or not earlier ones were answered, like
+                    independent users
+Latency is measured from writing a request to reading its reply; CPU is the
+predictor process's user+system time per request. The batch-size and
+queue-wait histograms of each micro-batched run come from { "cmd": "stats" }.
+
+Usage:
+    python benchmarks/bench_micro_batching.py [--concurrency 1 8 64] [--rates 500 2000]
+        [--requests 5000] [--windows 0 2] [--json out.json]
+
+The model is the one predict.py would use (PREDICT_MODEL_REGISTRY or
+xgboost_model.pkl). The prediction cache and table are disabled so every row
+reaches the model.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ML_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ML_DIR / 'benchmarks'))
+
+
+def cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+async def run_server(server_args, payloads, concurrency=None, rate=None):
+    env = dict(os.environ, PREDICT_TABLE_PATH='off')
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, str(ML_DIR / 'predict.py'), '--serve', '--cache-size', '0', *server_args,
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        env=env, limit=1 << 24)
+    pending = {}
+
+    async def read_replies():
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                return
+            reply = json.loads(line)
+            future = pending.pop(reply.get('id'), None)
+            if future is not None:
+                future.set_result(reply)
+
+    reader = asyncio.ensure_future(read_replies())
+
+    async def request(payload, request_id):
+        future = asyncio.get_running_loop().create_future()
+        pending[request_id] = future
+        proc.stdin.write((json.dumps(dict(payload, id=request_id)) + '\n').encode())
+        return await future
+
+    # Warm up: the model loads before the first reply
+    await request(payloads[0], -1)
+
+    latencies = []
+
+    async def timed(i):
+        started = time.perf_counter()
+        reply = await request(payloads[i], i)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if 'error' in reply:
+            raise RuntimeError(reply)
+
+    next_id = iter(range(len(payloads)))
+
+    async def client():
+        for i in next_id:
+            await timed(i)
+
+    cpu_before = cpu_seconds(proc.pid)
+    started = time.perf_counter()
+    if rate is None:
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    else:
+        arrivals = np.cumsum(np.random.default_rng(1).exponential(1 / rate, len(payloads)))
+        tasks = []
+        for i, at in enumerate(arrivals):
+            delay = started + at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(timed(i)))
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    cpu = cpu_seconds(proc.pid) - cpu_before
+    stats = await request({'cmd': 'stats'}, -2)
+
+    proc.stdin.close()
+    await proc.wait()
+    reader.cancel()
+    return {
+        'requests_per_s': len(payloads) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': statistics.fmean(latencies),
+        'cpu_us_per_request': cpu / len(payloads) * 1e6,
+        'batching': stats.get('batching'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--concurrency', nargs='*', type=int, default=[1, 8, 64])
+    parser.add_argument('--rates', nargs='*', type=float, default=[500, 2000],
+                        help='open-loop arrival rates, requests per second')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--windows', nargs='+', type=float, default=[0, 2],
+                        help='micro-batching windows to compare, in ms')
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    from synthetic_data import sample_payloads
+
+    payloads = sample_payloads(args.requests, seed=7)
+    modes = [('one at a time', ['--no-micro-batch'])]
+    modes += [(f'batched, {w:g} ms window', ['--micro-batch', '--batch-window-ms', str(w),
+                                             '--max-batch', str(args.max_batch)]) for w in args.windows]
+    results = []
+    loads = [('closed', {'concurrency': c}, f'C={c}') for c in args.concurrency]
+    loads += [('open', {'rate': r}, f'{r:g}/s') for r in args.rates]
+    print(f"{'mode':<24} {'load':>7} {'req/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'cpu µs/req':>10} "
+          f"{'rows/batch':>10} {'wait p99 ms':>11}")
+    for shape, load, load_label in loads:
+        for label, server_args in modes:
+            result = asyncio.run(run_server(server_args, payloads, **load))
+            result.update(mode=label, load=shape, **load)
+            results.append(result)
+            batching = result['batching'] or {}
+            wait_p99 = (batching.get('queueWaitMs') or {}).get('p99')
+            print(f"{label:<24} {load_label:>7} {result['requests_per_s']:>8,.0f} {result['p50_ms']:>7.3f} "
+                  f"{result['p99_ms']:>7.3f} {result['cpu_us_per_request']:>10.0f} "
+                  f"{batching.get('rowsPerBatch') or '-':>10} "
+                  f"{'-' if wait_p99 is None else f'{wait_p99:.3g}':>11}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Model Load Benchmark
+Compares cold-start load time and resident memory of the model formats:
+pickle.load, joblib.load and native xgb.Booster (UBJSON and JSON).
+
+Each format is loaded in a fresh Python process so import costs are counted
+and memory from one run does not leak into the next.
+
+Usage:
+    python benchmarks/bench_model_load.py [--model PATH] [--repeats N]
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ML_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in the child process; prints one JSON line with the measurements
+LOADER = r'''
+import json, sys, time, resource, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, sys.argv[3])
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+method, path = sys.argv[1], sys.argv[2]
+rss_before = rss_mb()
+started = time.perf_counter()
+# Import what each format needs first, so import and load time are reported separately
+if method == 'pickle':
+    import pickle, xgboost.sklearn
+elif method == 'joblib':
+    import joblib, xgboost.sklearn
+else:
+    import xgboost
+    from model_io import load_native_model
+imported = time.perf_counter()
+if method == 'pickle':
+    with open(path, 'rb') as f:
+        model = pickle.load(f)
+elif method == 'joblib':
+    model = joblib.load(path)
+else:
+    model = load_native_model(path)
+loaded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'load_ms': (loaded - imported) * 1000,
+    'total_ms': (loaded - started) * 1000,
+    'rss_mb': rss_mb(),
+    'rss_delta_mb': rss_mb() - rss_before,
+}))
+'''
+
+
+def run_once(method, path):
+    out = subprocess.run(
+        [sys.executable, '-c', LOADER, method, str(path), str(ML_DIR)],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--model', default=str(ML_DIR / 'xgboost_model.pkl'))
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ML_DIR))
+    import joblib
+    from model_io import export_native_model
+
+    workdir = Path(tempfile.mkdtemp(prefix='bench_model_load_'))
+    try:
+        pkl = workdir / 'xgboost_model.pkl'
+        shutil.copy(args.model, pkl)
+        model = joblib.load(str(pkl))
+        files = {
+            'pickle': pkl,
+            'joblib': pkl,
+            'native-ubj': export_native_model(model, pkl, fmt='.ubj'),
+            'native-json': export_native_model(model, pkl, fmt='.json'),
+        }
+
+        print(f"{'format':<12} {'size KB':>8} {'import ms':>10} {'load ms':>8} {'total ms':>9} {'RSS MB':>7} {'RSS delta MB':>13}")
+        results = {}
+        for name, path in files.items():
+            method = name if name in ('pickle', 'joblib') else 'native'
+            runs = [run_once(method, path) for _ in range(args.repeats)]
+            r = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            r['size_kb'] = path.stat().st_size / 1024
+            results[name] = r
+            print(f"{name:<12} {r['size_kb']:>8.1f} {r['import_ms']:>10.1f} {r['load_ms']:>8.2f} "
+                  f"{r['total_ms']:>9.1f} {r['rss_mb']:>7.1f} {r['rss_delta_mb']:>13.1f}")
+        print(f"\n(medians of {args.repeats} fresh processes each)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+if __name__ == '__main__':
+    main()
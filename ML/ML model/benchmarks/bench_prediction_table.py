@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Prediction Table Benchmark
+Build time, file size, open time and lookup latency of prediction_table.py,
+next to live inference for the same single requests and 100-row batches.
+
+Usage:
+    python benchmarks/bench_prediction_table.py [--model PATH] [--pairs 1000 100000]
+
+Pairs are synthetic: payloads drawn from dataset.csv (see synthetic_data.py),
+each with its own location. The table is written to a temporary directory.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+ML_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ML_DIR))
+sys.path.insert(0, str(ML_DIR / 'benchmarks'))
+warnings.filterwarnings('ignore')
+
+
+def per_call_us(fn, n):
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        for i in range(n):
+            fn(i)
+        timings.append((time.perf_counter() - started) / n * 1e6)
+    return statistics.median(timings)
+
+
+def bench(model, model_path, n_pairs, workdir):
+    from predict import predict_batch
+    from prediction_table import PredictionTable, build_table
+    from synthetic_data import sample_payloads
+
+    payloads = sample_payloads(n_pairs)
+    for i, payload in enumerate(payloads):
+        payload['location'] = f'Market {i}'
+    path = Path(workdir) / f'table_{n_pairs}.bin'
+
+    started = time.perf_counter()
+    written, _ = build_table(model, payloads, path, model_path)
+    build_s = time.perf_counter() - started
+    started = time.perf_counter()
+    table = PredictionTable(path)
+    open_ms = (time.perf_counter() - started) * 1000
+
+    n = min(n_pairs, 2000)
+    batches = [payloads[i:i + 100] for i in range(0, min(n_pairs, 10_000), 100)]
+    result = {
+        'pairs': written,
+        'build_s': round(build_s, 3),
+        'file_bytes': path.stat().st_size,
+        'open_ms': round(open_ms, 3),
+        'find_us': per_call_us(lambda i: table.find(payloads[i]['Crop'], payloads[i]['location']), n),
+        'request_table_us': per_call_us(lambda i: predict_batch(model, [payloads[i]], table=table), n),
+        'request_live_us': per_call_us(lambda i: predict_batch(model, [payloads[i]]), n),
+        'batch100_table_us': per_call_us(lambda i: predict_batch(model, batches[i], table=table), len(batches)),
+        'batch100_live_us': per_call_us(lambda i: predict_batch(model, batches[i]), len(batches)),
+    }
+    assert predict_batch(model, batches[0], table=table) == predict_batch(model, batches[0])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--model', type=Path, default=None,
+                        help='model file (default: the one predict.py would use)')
+    parser.add_argument('--pairs', nargs='+', type=int, default=[1_000, 100_000])
+    args = parser.parse_args()
+
+    from predict import load_model, resolve_model_path
+
+    model_path = args.model or resolve_model_path()
+    model = load_model(model_path)
+    if model is None:
+        sys.exit(f"No model at {model_path}")
+    print(f"model: {model_path} ({type(model.estimator).__name__}, version {model.version})")
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_pairs in args.pairs:
+            result = bench(model, model_path, n_pairs, workdir)
+            results.append(result)
+            print(f"{n_pairs:>8,} pairs: build {result['build_s']:.2f} s, {result['file_bytes'] / 1024:,.0f} KB, "
+                  f"open {result['open_ms']:.2f} ms, find {result['find_us']:.1f} µs | "
+                  f"request {result['request_table_us']:.0f} µs vs live {result['request_live_us']:.0f} µs | "
+                  f"100 rows {result['batch100_table_us']:.0f} µs vs live {result['batch100_live_us']:.0f} µs")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Processed Data Format Benchmark
+Compares write time, read time and on-disk size of the processed dataset as
+CSV (the original path), Parquet and memory-mapped Arrow IPC.
+
+The rows are the real dataset.csv resampled with noise up to --rows and run
+through feature_engineering, so column types match the real pipeline.
+
+Usage:
+    python benchmarks/bench_processed_formats.py [--rows N] [--repeats N]
+"""
+
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ML_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ML_DIR))
+warnings.filterwarnings('ignore')
+
+
+def make_processed_frame(n_rows, seed=42):
+    import contextlib
+    import io
+    import pandas as pd
+    from data_preprocessing import feature_engineering
+
+    rng = np.random.default_rng(seed)
+    raw = pd.read_csv(ML_DIR / 'dataset.csv')
+    df = raw.iloc[rng.integers(0, len(raw), n_rows)].reset_index(drop=True)
+    numeric = df.select_dtypes(include=[np.number]).columns
+    df[numeric] = df[numeric] * rng.normal(1.0, 0.05, size=(n_rows, len(numeric)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        processed, _, _ = feature_engineering(df)
+    return processed
+
+
+def timed(fn, repeats):
+    timings = []
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    from data_io import read_processed_data, write_processed_data
+
+    df = make_processed_frame(args.rows)
+    workdir = Path(tempfile.mkdtemp(prefix='bench_formats_'))
+    results = {}
+    try:
+        print(f"{args.rows:,} rows x {df.shape[1]} columns")
+        print(f"{'format':<9} {'write ms':>10} {'read ms':>10} {'size MB':>9} {'max rel err':>12}")
+        for fmt in ('csv', 'parquet', 'arrow'):
+            path = workdir / f'processed_data.{fmt}'
+            write_ms, _ = timed(lambda: write_processed_data(df, path), args.repeats)
+            read_ms, loaded = timed(lambda: read_processed_data(path), args.repeats)
+            # Relative error introduced by the format (float32 downcast, text round trip)
+            a = loaded[df.columns].to_numpy(np.float64)
+            b = df.to_numpy(np.float64)
+            rel_err = float(np.max(np.abs(a - b) / np.maximum(np.abs(b), 1e-12)))
+            size_mb = path.stat().st_size / 1e6
+            results[fmt] = {'write_ms': write_ms, 'read_ms': read_ms, 'size_mb': size_mb, 'max_rel_err': rel_err}
+            print(f"{fmt:<9} {write_ms:>10.1f} {read_ms:>10.1f} {size_mb:>9.1f} {rel_err:>12.2e}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+if __name__ == '__main__':
+    main()
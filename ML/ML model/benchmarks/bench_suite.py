@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+End-to-End Benchmark Suite
+Runs the ML pipeline on synthetic data of several sizes and writes every
+measurement to one JSON file, so runs can be compared for regressions.
+
+For each size (dataset.csv scaled to e.g. 10k, 1M, 10M rows):
+  generate     write the synthetic raw CSV (synthetic_data.py)
+  preprocess   data_preprocessing.preprocess_streaming: wall time, rows/s
+  train        xgboost_model pipeline with fixed parameters on up to
+               --train-rows rows (plus a successive-halving search on
+               --search-rows rows): wall time of load, fit and save
+  predict      cold start of a one-shot `predict.py` process, then
+               Predictor.predict_batch latency percentiles for single
+               payloads and batches of 100 / 1,000 / 10,000 rows
+Every stage runs in a fresh Python process and reports its peak RSS
+(VmHWM; ru_maxrss would include the parent's memory inherited at fork).
+
+The ASR benchmark of the farmer voice bot (bench_transcriber.py next to
+vosk_transcriber.py) runs once and is included under "asr" when found.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 10k 1m 10m] [--json results.json]
+    python benchmarks/bench_suite.py --sizes 10k --compare baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ML_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+ASR_BENCH = (ML_DIR.parent.parent / 'bot' / 'farmer-voice-bot' / 'farmer-voice-bot'
+             / 'backend' / 'benchmarks' / 'bench_transcriber.py')
+sys.path.insert(0, str(ML_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+warnings.filterwarnings('ignore')
+
+FIXED_PARAMS = {
+    'n_estimators': 200,
+    'learning_rate': 0.1,
+    'max_depth': 5,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'min_child_weight': 3,
+}
+BATCH_SIZES = (100, 1_000, 10_000)
+RESULT_PREFIX = 'BENCH_RESULT '
+
+# Runs a script as __main__ and reports its peak RSS on stderr's last line
+PEAK_RSS_WRAPPER = r'''
+import runpy, sys
+script = sys.argv.pop(1)
+sys.path.insert(0, script.rsplit('/', 1)[0])
+try:
+    runpy.run_path(script, run_name='__main__')
+finally:
+    with open('/proc/self/status') as f:
+        hwm = [line.split()[1] for line in f if line.startswith('VmHWM:')][0]
+    sys.stderr.write(f'\nPEAK_RSS_KB {hwm}\n')
+'''
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process (VmHWM)."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {
+        'n': int(samples.size),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'mean_ms': float(samples.mean()),
+    }
+
+
+def processed_path(workdir):
+    try:
+        import pyarrow  # noqa: F401
+        return Path(workdir) / 'processed.parquet'
+    except ImportError:
+        return Path(workdir) / 'processed.csv'
+
+
+# ---------------------------------------------------------------- stages
+# Each runs in its own process (see run_stage) and returns a dict.
+
+def stage_generate(args):
+    from synthetic_data import write_dataset
+
+    raw = Path(args.workdir) / 'raw.csv'
+    started = time.perf_counter()
+    rows = write_dataset(raw, args.rows, seed=args.seed)
+    return {'rows': rows, 'wall_s': time.perf_counter() - started,
+            'csv_mb': raw.stat().st_size / 1e6}
+
+
+def stage_preprocess(args):
+    from data_preprocessing import preprocess_streaming
+    from feature_schema import SCHEMA_FILENAME
+
+    output = processed_path(args.workdir)
+    started = time.perf_counter()
+    n_rows, _, _ = preprocess_streaming(Path(args.workdir) / 'raw.csv', output,
+                                        output.with_name(SCHEMA_FILENAME), chunksize=args.chunksize)
+    wall = time.perf_counter() - started
+    return {'rows': n_rows, 'wall_s': wall, 'rows_per_s': n_rows / wall,
+            'output': output.suffix[1:], 'output_mb': output.stat().st_size / 1e6}
+
+
+def stage_train(args):
+    import xgboost as xgb
+    from feature_schema import load_schema, schema_path_for
+    from model_registry import publish
+    from xgboost_model import (hyperparameter_tuning, load_processed_data,
+                               prepare_train_test_split, regression_metrics, save_model)
+
+    data = processed_path(args.workdir)
+    started = time.perf_counter()
+    df = load_processed_data(data)
+    if len(df) > args.train_rows:
+        df = df.iloc[:args.train_rows]
+    schema = load_schema(schema_path_for(data))
+    X_train, X_test, y_train, y_test = prepare_train_test_split(df)
+    load_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    model = xgb.XGBRegressor(objective='reg:squarederror', tree_method='hist',
+                             random_state=args.seed, n_jobs=-1, **FIXED_PARAMS)
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - started
+    metrics = regression_metrics(y_test, model.predict(X_test))
+
+    started = time.perf_counter()
+    publish(Path(args.workdir) / 'registry',
+            lambda path: save_model(model, path, schema, X_train.columns.tolist()))
+    save_s = time.perf_counter() - started
+
+    result = {'rows': len(df), 'load_s': load_s, 'fit_s': fit_s, 'save_s': save_s,
+              'test_rmse': metrics['rmse']}
+    if args.search_rows:
+        n = min(args.search_rows, len(X_train))
+        started = time.perf_counter()
+        hyperparameter_tuning(X_train.iloc[:n], y_train.iloc[:n], search='halving', seed=args.seed)
+        result['search_halving'] = {'rows': n, 'wall_s': time.perf_counter() - started}
+    return result
+
+
+def stage_predict(args):
+    from predict import Predictor
+    from synthetic_data import sample_payloads
+
+    started = time.perf_counter()
+    predictor = Predictor(registry=Path(args.workdir) / 'registry', cache=None, background=False)
+    load_ms = (time.perf_counter() - started) * 1000
+    payloads = sample_payloads(max(BATCH_SIZES), seed=args.seed)
+
+    single = []
+    for i in range(args.single_requests):
+        started = time.perf_counter()
+        predictor.predict_batch([payloads[i % len(payloads)]])
+        single.append((time.perf_counter() - started) * 1000)
+
+    batches = {}
+    for size in BATCH_SIZES:
+        timings = []
+        for _ in range(max(3, args.batch_repeats * 1000 // size)):
+            started = time.perf_counter()
+            predictor.predict_batch(payloads[:size])
+            timings.append((time.perf_counter() - started) * 1000)
+        batch = percentiles(timings)
+        batch['rows_per_s'] = size / (batch['p50_ms'] / 1000)
+        batches[str(size)] = batch
+    return {'model': predictor.model.name, 'load_ms': load_ms,
+            'single': percentiles(single), 'batch': batches}
+
+
+STAGES = {
+    'generate': stage_generate,
+    'preprocess': stage_preprocess,
+    'train': stage_train,
+    'predict': stage_predict,
+}
+
+
+def run_stage(name, args, rows, workdir):
+    """Run one stage in a fresh interpreter; returns its result dict."""
+    cmd = [sys.executable, __file__, '--stage', name, '--workdir', str(workdir),
+           '--rows', str(rows), '--seed', str(args.seed), '--chunksize', str(args.chunksize),
+           '--train-rows', str(args.train_rows), '--search-rows', str(args.search_rows),
+           '--single-requests', str(args.single_requests), '--batch-repeats', str(args.batch_repeats)]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, text=True)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"stage {name} failed (exit {proc.returncode})")
+    return json.loads(lines[-1][len(RESULT_PREFIX):])
+
+
+def cold_start(workdir, payload, repeats):
+    """Wall time and peak RSS of one-shot predict.py processes."""
+    env = dict(os.environ, PREDICT_MODEL_REGISTRY=str(Path(workdir) / 'registry'))
+    walls, rss = [], []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', PEAK_RSS_WRAPPER, str(ML_DIR / 'predict.py')],
+                              env=env, input=json.dumps(payload).encode(), capture_output=True)
+        walls.append((time.perf_counter() - started) * 1000)
+        rss.append(int(proc.stderr.split()[-1]) / 1024)
+        if proc.returncode != 0 or b'predictedPrice' not in proc.stdout:
+            raise RuntimeError(f"predict.py failed: {proc.stdout[:200]!r}")
+    result = percentiles(walls)
+    result['peak_rss_mb'] = max(rss)
+    return result
+
+
+def run_asr(args):
+    with tempfile.NamedTemporaryFile(suffix='.json') as out:
+        cmd = [sys.executable, str(ASR_BENCH), '--json', out.name]
+        if args.asr_durations:
+            cmd += ['--durations', *map(str, args.asr_durations)]
+        if subprocess.run(cmd, stdout=subprocess.DEVNULL).returncode != 0:
+            raise RuntimeError("ASR benchmark failed")
+        return json.load(open(out.name, encoding='utf-8'))
+
+
+def environment():
+    import xgboost
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ML_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'xgboost': xgboost.__version__,
+    }
+
+
+# ---------------------------------------------------------------- comparison
+
+def flatten(tree, prefix=''):
+    out = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten(value, path + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[path] = value
+    return out
+
+
+def compare(baseline, current):
+    """Print every timing/throughput/memory metric with its ratio to the baseline."""
+    old = flatten(baseline.get('results', {}))
+    new = flatten(current.get('results', {}))
+    print(f"\n{'metric':<58} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for key in sorted(old.keys() & new.keys()):
+        if not key.endswith(('_s', '_ms', '_mb', 'per_s')):
+            continue
+        ratio = new[key] / old[key] if old[key] else float('nan')
+        # Throughput is better when higher; everything else when lower
+        worse = ratio < 0.9 if key.endswith('per_s') else ratio > 1.1
+        print(f"{key:<58} {old[key]:>12.4g} {new[key]:>12.4g} {ratio:>6.2f}x{' !' if worse else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', nargs='+', default=['10k', '1m'],
+                        help='dataset sizes, e.g. 10k 1m 10m')
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=list(STAGES))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunksize', type=int, default=500_000, help='preprocessing chunk rows')
+    parser.add_argument('--train-rows', type=str, default='1m',
+                        help='train on at most this many rows')
+    parser.add_argument('--search-rows', type=str, default='10k',
+                        help='rows for the halving search benchmark (0 skips it)')
+    parser.add_argument('--single-requests', type=int, default=1000)
+    parser.add_argument('--batch-repeats', type=int, default=20,
+                        help='1,000-row batches timed; other sizes scale inversely')
+    parser.add_argument('--cold-starts', type=int, default=5)
+    parser.add_argument('--asr', action=argparse.BooleanOptionalAction, default=ASR_BENCH.exists(),
+                        help='include the voice bot transcriber benchmark')
+    parser.add_argument('--asr-durations', nargs='+', type=int, help='clip lengths for the ASR benchmark')
+    parser.add_argument('--workdir', help='keep generated data here (default: a temp dir)')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--stage', choices=list(STAGES), help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    from synthetic_data import parse_rows, sample_payloads
+
+    args.train_rows = parse_rows(args.train_rows)
+    args.search_rows = parse_rows(args.search_rows)
+
+    if args.stage:
+        # Child process: run one stage, report it on the last stdout line
+        args.rows = parse_rows(args.rows)
+        with contextlib.redirect_stdout(sys.stderr if os.environ.get('BENCH_VERBOSE') else open(os.devnull, 'w')):
+            result = STAGES[args.stage](args)
+        result['peak_rss_mb'] = peak_rss_mb()
+        print(RESULT_PREFIX + json.dumps(result))
+        return result
+
+    results = {'environment': environment(), 'results': {}}
+    with contextlib.ExitStack() as stack:
+        root = Path(args.workdir) if args.workdir else Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        for size in args.sizes:
+            rows = parse_rows(size)
+            workdir = root / size
+            workdir.mkdir(parents=True, exist_ok=True)
+            entry = results['results'].setdefault(f'rows_{size}', {})
+            print(f"\n== {rows:,} rows ==")
+            for name in args.stages:
+                entry[name] = run_stage(name, args, rows, workdir)
+                print(f"  {name:<11} {json.dumps(entry[name])}")
+                if name == 'predict':
+                    entry['cold_start'] = cold_start(workdir, sample_payloads(1, seed=args.seed)[0],
+                                                     args.cold_starts)
+                    print(f"  {'cold_start':<11} {json.dumps(entry['cold_start'])}")
+        if args.asr:
+            results['results']['asr'] = run_asr(args)
+            print(f"\n== ASR ==\n  {json.dumps(results['results']['asr'])}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
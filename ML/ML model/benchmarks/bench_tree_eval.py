@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tree Evaluator Benchmark
+Compares predict.py's pure NumPy TreeEnsemble against native xgboost
+(Booster.inplace_predict) at batch sizes from 1 to 100k rows, and checks that
+both give the same predictions.
+
+Usage:
+    python benchmarks/bench_tree_eval.py [--model PATH] [--repeats N]
+
+With the default model the rows are sampled from processed_data.csv with
+noise added and some values set to NaN, so the missing-value branches are
+exercised as well.
+"""
+
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ML_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ML_DIR))
+warnings.filterwarnings('ignore')
+
+BATCH_SIZES = (1, 10, 100, 1_000, 10_000, 100_000)
+
+
+def make_rows(n_features, n_rows, seed=42):
+    """Synthetic rows shaped like the training data."""
+    rng = np.random.default_rng(seed)
+    data_file = ML_DIR / 'processed_data.csv'
+    base = None
+    if data_file.exists():
+        import pandas as pd
+        df = pd.read_csv(data_file).drop(columns=['Price'])
+        if df.shape[1] == n_features:
+            base = df.to_numpy(np.float32)
+    if base is None:
+        base = rng.normal(size=(64, n_features)).astype(np.float32)
+    X = base[rng.integers(0, len(base), n_rows)]
+    X = X * rng.normal(1.0, 0.1, size=X.shape).astype(np.float32)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+
+def time_call(fn, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--model', default=str(ML_DIR / 'xgboost_model.pkl'))
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    import joblib
+    from predict import TreeEnsemble
+    from xgboost_model import export_tree_arrays
+
+    model = joblib.load(args.model)
+    booster = model.get_booster()
+    workdir = Path(tempfile.mkdtemp(prefix='bench_tree_eval_'))
+    try:
+        trees = TreeEnsemble.load(export_tree_arrays(model, workdir / 'model.trees.npz'))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    X_all = make_rows(booster.num_features(), max(BATCH_SIZES))
+    print(f"trees: {len(trees.roots)}, nodes: {len(trees.feature)}, max depth: {trees.max_depth}")
+    print(f"{'batch':>8} {'numpy ms':>10} {'xgboost ms':>11} {'numpy rows/s':>13} {'xgboost rows/s':>15} {'max |diff|':>11}")
+    results = []
+    for n in BATCH_SIZES:
+        X = X_all[:n]
+        diff = float(np.max(np.abs(trees.predict(X) - booster.inplace_predict(X))))
+        numpy_ms = time_call(trees.predict, X, args.repeats)
+        xgb_ms = time_call(booster.inplace_predict, X, args.repeats)
+        results.append({'batch': n, 'numpy_ms': numpy_ms, 'xgboost_ms': xgb_ms, 'max_abs_diff': diff})
+        print(f"{n:>8} {numpy_ms:>10.3f} {xgb_ms:>11.3f} {n / numpy_ms * 1000:>13,.0f} "
+              f"{n / xgb_ms * 1000:>15,.0f} {diff:>11.4g}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
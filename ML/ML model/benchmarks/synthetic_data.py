@@ -0,0 +1,58 @@
+"""
+Synthetic Data
+Generators for benchmarks: dataset.csv scaled to any number of rows, and
+prediction payloads drawn from the same distribution.
+
+Rows are real dataset.csv rows resampled with 5% multiplicative noise on the
+numeric columns, so encoders, derived features and the model see the same
+categories and value ranges as the real pipeline. Large datasets are written
+in chunks, so generating 10M rows needs about as much memory as 1M.
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+
+ML_DIR = Path(__file__).resolve().parent.parent
+DATASET = ML_DIR / 'dataset.csv'
+CHUNK_ROWS = 1_000_000
+
+
+def parse_rows(text):
+    """'10k' -> 10_000, '1m' -> 1_000_000, '2500' -> 2500."""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([km]?)', str(text).strip().lower())
+    if not match:
+        raise ValueError(f"Invalid row count: {text!r} (use e.g. 10k, 1m, 10m)")
+    return int(float(match.group(1)) * {'': 1, 'k': 1_000, 'm': 1_000_000}[match.group(2)])
+
+
+def sample_rows(n_rows, seed=42, raw=None):
+    """n_rows resampled dataset.csv rows with noise, as a DataFrame."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    raw = pd.read_csv(DATASET) if raw is None else raw
+    df = raw.iloc[rng.integers(0, len(raw), n_rows)].reset_index(drop=True)
+    numeric = df.select_dtypes(include=[np.number]).columns
+    df[numeric] = (df[numeric] * rng.normal(1.0, 0.05, size=(n_rows, len(numeric)))).round(2)
+    return df
+
+
+def write_dataset(path, n_rows, seed=42, chunk_rows=CHUNK_ROWS):
+    """Write an n_rows raw dataset CSV with the columns of dataset.csv."""
+    import pandas as pd
+
+    raw = pd.read_csv(DATASET)
+    written = 0
+    for i, start in enumerate(range(0, n_rows, chunk_rows)):
+        chunk = sample_rows(min(chunk_rows, n_rows - start), seed + i, raw)
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        written += len(chunk)
+    return written
+
+
+def sample_payloads(n, seed=42):
+    """n predict.py payloads (raw feature columns, as the backend sends them)."""
+    rows = sample_rows(n, seed).drop(columns=['Price'])
+    return rows.to_dict(orient='records')
@@ -0,0 +1,170 @@
+"""
+Processed Data I/O
+Reading and writing the processed dataset as CSV, Parquet or Arrow IPC.
+
+The format follows the file extension:
+  .csv               plain text (the original format)
+  .parquet           columnar, zstd-compressed; smallest on disk
+  .arrow / .feather  Arrow IPC file, uncompressed so it can be memory-mapped
+                     and read without copying
+
+For the binary formats features are stored as float32 (XGBoost trains on
+float32 anyway) and the label-encoded columns as small integers; the target
+stays float64 so prices are not rounded. pyarrow is only needed for the
+binary formats and is imported on first use.
+
+iter_processed_data reads any of the formats back in chunks, for training
+on datasets that do not fit in memory (external_memory.py).
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import ENCODED_COLUMNS
+
+CSV_SUFFIXES = ('.csv',)
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+
+def data_format(filepath):
+    """Return 'csv', 'parquet' or 'arrow' for a file path."""
+    suffix = Path(filepath).suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        return 'parquet'
+    if suffix in ARROW_SUFFIXES:
+        return 'arrow'
+    return 'csv'
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("pyarrow is required for Parquet/Arrow files (pip install pyarrow)") from e
+    return pyarrow
+
+
+def storage_dtypes(columns, target_col='Price', code_dtype=np.int16):
+    """Compact dtypes for the processed columns."""
+    dtypes = {}
+    for col in columns:
+        if col == target_col:
+            dtypes[col] = np.float64
+        elif col in ENCODED_COLUMNS:
+            dtypes[col] = code_dtype
+        else:
+            dtypes[col] = np.float32
+    return dtypes
+
+
+def code_dtype_for(max_code):
+    """Smallest signed integer type that holds category codes up to max_code."""
+    return np.int16 if max_code < np.iinfo(np.int16).max else np.int32
+
+
+def downcast(df, target_col='Price', code_dtype=None):
+    """Cast a processed frame to its storage dtypes (returns a new frame)."""
+    if code_dtype is None:
+        codes = [df[col].max() for col in ENCODED_COLUMNS if col in df.columns]
+        code_dtype = code_dtype_for(max(codes, default=0))
+    return df.astype(storage_dtypes(df.columns, target_col, code_dtype))
+
+
+class ProcessedDataWriter:
+    """Writes a processed dataset chunk by chunk in the format of `filepath`.
+
+    Binary formats need the same dtypes for every chunk, so pass `code_dtype`
+    (see code_dtype_for) when chunks are written separately.
+    """
+
+    def __init__(self, filepath, target_col='Price', code_dtype=np.int16):
+        self.filepath = str(filepath)
+        self.format = data_format(filepath)
+        self.target_col = target_col
+        self.code_dtype = code_dtype
+        self._writer = None
+        self._chunks = 0
+
+    def write(self, chunk):
+        if self.format == 'csv':
+            chunk.to_csv(self.filepath, mode='w' if self._chunks == 0 else 'a',
+                         header=(self._chunks == 0), index=False)
+            self._chunks += 1
+            return
+        pa = _require_pyarrow()
+        table = pa.Table.from_pandas(downcast(chunk, self.target_col, self.code_dtype),
+                                     preserve_index=False)
+        if self._writer is None:
+            if self.format == 'parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.filepath, table.schema, compression='zstd')
+            else:
+                self._writer = pa.ipc.new_file(self.filepath, table.schema)
+        self._writer.write_table(table)
+        self._chunks += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_processed_data(df, filepath, target_col='Price'):
+    """Write a whole processed frame in the format of `filepath`."""
+    if data_format(filepath) == 'csv':
+        df.to_csv(filepath, index=False)
+        return
+    codes = [df[col].max() for col in ENCODED_COLUMNS if col in df.columns]
+    with ProcessedDataWriter(filepath, target_col, code_dtype_for(max(codes, default=0))) as writer:
+        writer.write(df)
+
+
+def read_processed_data(filepath):
+    """Read a processed dataset written by write_processed_data.
+
+    Arrow IPC files are memory-mapped and converted without copying where
+    the column types allow; Parquet is read with memory mapping enabled.
+    """
+    fmt = data_format(filepath)
+    if fmt == 'csv':
+        return pd.read_csv(filepath)
+    pa = _require_pyarrow()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(filepath, memory_map=True).to_pandas()
+    source = pa.memory_map(str(filepath), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def iter_processed_data(filepath, chunk_rows=500_000):
+    """Yield a processed dataset as DataFrames of at most `chunk_rows` rows, in file order.
+
+    Only one chunk is held in memory at a time: CSV is parsed incrementally,
+    Parquet is read batch by batch and Arrow IPC files are memory-mapped and
+    sliced.
+    """
+    fmt = data_format(filepath)
+    if fmt == 'csv':
+        yield from pd.read_csv(filepath, chunksize=chunk_rows)
+        return
+    pa = _require_pyarrow()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(filepath, memory_map=True).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+    reader = pa.ipc.open_file(pa.memory_map(str(filepath), 'r'))
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(start, chunk_rows).to_pandas()
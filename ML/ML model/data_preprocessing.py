@@ -3,18 +3,25 @@ Data Preprocessing and Feature Engineering Script
 This script cleans the data and performs feature engineering for crop price prediction
 """
 
+import argparse
+from pathlib import Path
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.preprocessing import LabelEncoder
+from data_io import ProcessedDataWriter, code_dtype_for, write_processed_data
+from stats_engine import StatsAccumulator, count_outliers, frame_statistics, set_outlier_counts
+from feature_schema import (DERIVED_FEATURES, ENCODED_COLUMNS, SCHEMA_FILENAME, build_schema,
+                            derived_feature, save_schema)
+from instrumentation import span
+from reporting import ReportWriter
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set visualization style
-sns.set_style('whitegrid')
-plt.rcParams['figure.figsize'] = (12, 8)
+# Columns dropped after encoding: the raw categoricals and CostCultivation2,
+# which is almost perfectly correlated with CostCultivation
+FEATURES_TO_REMOVE = ['State', 'Crop', 'CostCultivation2']
 
+@span
 def load_data(filepath):
     """Load the dataset"""
     print("=" * 60)
@@ -26,21 +33,40 @@ def load_data(filepath):
     print(f"\nColumns: {list(df.columns)}")
     return df
 
-def exploratory_analysis(df):
-    """Perform exploratory data analysis"""
+def correlation_frame(report):
+    """Correlation matrix of a statistics report as a labelled DataFrame"""
+    return pd.DataFrame(report['correlation'], index=report['columns'], columns=report['columns'])
+
+@span
+def exploratory_analysis(df, report=None, reports=None):
+    """Perform exploratory data analysis
+    
+    Statistics, missing counts and correlations come from one stats_engine
+    report over all numeric columns; pass `report` to reuse one already computed.
+    The correlation heatmap is rendered only when `reports` (a ReportWriter) is given.
+    """
     print("\n" + "=" * 60)
     print("EXPLORATORY DATA ANALYSIS")
     print("=" * 60)
     
+    if report is None:
+        report = frame_statistics(df)
+    stats = report['stats']
+    
     # Basic info
     print("\nDataset Info:")
     print(df.info())
     
     print("\nBasic Statistics:")
-    print(df.describe())
+    describe_rows = [('count', 'count'), ('mean', 'mean'), ('std', 'std'), ('min', 'min'),
+                     ('25%', 'q1'), ('50%', 'median'), ('75%', 'q3'), ('max', 'max')]
+    print(pd.DataFrame({col: [stats[col][key] for _, key in describe_rows] for col in report['columns']},
+                       index=[label for label, _ in describe_rows]))
     
     print("\nMissing Values:")
-    print(df.isnull().sum())
+    missing = {col: stats[col]['missing'] if col in stats else int(df[col].isnull().sum())
+               for col in df.columns}
+    print(pd.Series(missing))
     
     print("\nDuplicate Rows:", df.duplicated().sum())
     
@@ -48,62 +74,49 @@ def exploratory_analysis(df):
     print("\n" + "-" * 60)
     print("CATEGORICAL FEATURES ANALYSIS")
     print("-" * 60)
-    print(f"\nUnique States: {df['State'].nunique()}")
-    print(df['State'].value_counts())
-    print(f"\nUnique Crops: {df['Crop'].nunique()}")
-    print(df['Crop'].value_counts())
+    state_counts = df['State'].value_counts()
+    print(f"\nUnique States: {len(state_counts)}")
+    print(state_counts)
+    crop_counts = df['Crop'].value_counts()
+    print(f"\nUnique Crops: {len(crop_counts)}")
+    print(crop_counts)
     
     # Correlation analysis
     print("\n" + "-" * 60)
     print("CORRELATION ANALYSIS")
     print("-" * 60)
     
-    # Select only numeric columns
-    numeric_df = df.select_dtypes(include=[np.number])
+    corr_matrix = correlation_frame(report)
     
     # Correlation with target (Price)
-    correlations = numeric_df.corr()['Price'].sort_values(ascending=False)
+    correlations = corr_matrix['Price'].sort_values(ascending=False)
     print("\nCorrelation with Price:")
     print(correlations)
     
     # Check multicollinearity between CostCultivation features
-    cost_corr = df[['CostCultivation', 'CostCultivation2']].corr()
+    cost_corr = corr_matrix.loc[['CostCultivation', 'CostCultivation2'], ['CostCultivation', 'CostCultivation2']]
     print(f"\nCorrelation between CostCultivation and CostCultivation2:")
     print(cost_corr)
     
     # Visualize correlations
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(numeric_df.corr(), annot=True, cmap='coolwarm', center=0, 
-                fmt='.2f', square=True, linewidths=1)
-    plt.title('Feature Correlation Matrix', fontsize=16, fontweight='bold')
-    plt.tight_layout()
-    plt.savefig('/Users/nishanishmitha/Desktop/ML model /correlation_matrix.png', dpi=300, bbox_inches='tight')
-    print("\n✓ Correlation matrix saved as 'correlation_matrix.png'")
-    plt.close()
+    if reports is not None:
+        reports.render('correlation_matrix', corr_matrix)
     
     return correlations
 
-def detect_outliers(df, columns):
-    """Detect outliers using IQR method"""
-    print("\n" + "=" * 60)
-    print("OUTLIER DETECTION")
-    print("=" * 60)
-    
+def report_outliers(report):
+    """Print IQR outliers from a statistics report and return them per column"""
     outlier_info = {}
     
-    for col in columns:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)]
-        outlier_count = len(outliers)
+    for col in report['columns']:
+        stats = report['stats'][col]
+        outlier_count = stats['outliers']
+        lower_bound = stats['lower_bound']
+        upper_bound = stats['upper_bound']
         
         outlier_info[col] = {
             'count': outlier_count,
-            'percentage': (outlier_count / len(df)) * 100,
+            'percentage': stats['outlier_pct'],
             'lower_bound': lower_bound,
             'upper_bound': upper_bound
         }
@@ -115,6 +128,23 @@ def detect_outliers(df, columns):
     
     return outlier_info
 
+@span
+def detect_outliers(df, columns, report=None):
+    """Detect outliers using IQR method
+    
+    All columns are handled together by stats_engine in one NumPy pass;
+    pass `report` to reuse statistics already computed for these columns.
+    """
+    print("\n" + "=" * 60)
+    print("OUTLIER DETECTION")
+    print("=" * 60)
+    
+    if report is None or report['columns'] != list(columns):
+        report = frame_statistics(df, list(columns))
+    
+    return report_outliers(report)
+
+@span
 def feature_engineering(df):
     """Perform feature engineering"""
     print("\n" + "=" * 60)
@@ -137,17 +167,10 @@ def feature_engineering(df):
     # 2. Create derived features
     print("\n2. Creating derived features...")
     
-    # Cost efficiency: Production per unit cost
-    df_engineered['Cost_Efficiency'] = df_engineered['Production'] / (df_engineered['CostCultivation'] + 1)
-    
-    # Yield to Rainfall ratio
-    df_engineered['Yield_Rainfall_Ratio'] = df_engineered['Yield'] / (df_engineered['RainFall Annual'] + 1)
-    
-    # Temperature-Rainfall interaction
-    df_engineered['Temp_Rain_Interaction'] = df_engineered['Temperature'] * df_engineered['RainFall Annual']
-    
-    # Total cultivation cost (average of both cost columns)
-    df_engineered['Total_Cost_Avg'] = (df_engineered['CostCultivation'] + df_engineered['CostCultivation2']) / 2
+    # Cost efficiency, yield/rainfall ratio, temperature-rainfall interaction and
+    # average cultivation cost; formulas are shared with predict.py via feature_schema
+    for name in DERIVED_FEATURES:
+        df_engineered[name] = derived_feature(name, df_engineered)
     
     print("   ✓ Cost_Efficiency created")
     print("   ✓ Yield_Rainfall_Ratio created")
@@ -162,7 +185,7 @@ def feature_engineering(df):
     print(f"   Correlation between cost features: {cost_corr:.4f}")
     
     # Remove original categorical columns and one of the highly correlated cost columns
-    features_to_remove = ['State', 'Crop', 'CostCultivation2']
+    features_to_remove = FEATURES_TO_REMOVE
     df_engineered = df_engineered.drop(columns=features_to_remove)
     
     print(f"   ✓ Removed features: {features_to_remove}")
@@ -170,7 +193,8 @@ def feature_engineering(df):
     
     return df_engineered, le_state, le_crop
 
-def visualize_feature_distributions(df):
+@span
+def visualize_feature_distributions(df, reports):
     """Visualize feature distributions"""
     print("\n" + "=" * 60)
     print("GENERATING VISUALIZATIONS")
@@ -182,65 +206,162 @@ def visualize_feature_distributions(df):
     # Remove encoded columns for cleaner visualization
     viz_cols = [col for col in numeric_cols if 'Encoded' not in col and col != 'Price']
     
-    # Distribution plots
-    n_cols = 3
-    n_rows = (len(viz_cols) + n_cols - 1) // n_cols
-    
-    fig, axes = plt.subplots(n_rows, n_cols, figsize=(15, n_rows * 4))
-    axes = axes.flatten() if n_rows > 1 else [axes] if n_cols == 1 else axes
-    
-    for idx, col in enumerate(viz_cols):
-        if idx < len(axes):
-            axes[idx].hist(df[col], bins=20, color='skyblue', edgecolor='black', alpha=0.7)
-            axes[idx].set_title(f'Distribution of {col}', fontweight='bold')
-            axes[idx].set_xlabel(col)
-            axes[idx].set_ylabel('Frequency')
-            axes[idx].grid(True, alpha=0.3)
-    
-    # Hide unused subplots
-    for idx in range(len(viz_cols), len(axes)):
-        axes[idx].axis('off')
-    
-    plt.tight_layout()
-    plt.savefig('/Users/nishanishmitha/Desktop/ML model /feature_distributions.png', dpi=300, bbox_inches='tight')
-    print("✓ Feature distributions saved as 'feature_distributions.png'")
-    plt.close()
+    reports.render('feature_distributions', df[viz_cols])
 
+@span
 def save_processed_data(df, filepath):
-    """Save the processed dataset"""
-    df.to_csv(filepath, index=False)
+    """Save the processed dataset (CSV, Parquet or Arrow, by file extension)"""
+    write_processed_data(df, filepath)
     print(f"\n✓ Processed data saved to: {filepath}")
     print(f"  Final shape: {df.shape}")
     print(f"  Features: {list(df.columns)}")
 
-def main():
+@span
+def save_feature_schema(df, le_state, le_crop, filepath, target_col='Price'):
+    """Save the column order and encoder vocabularies used by predict.py"""
+    columns = [col for col in df.columns if col != target_col]
+    schema = build_schema(columns, {'State': le_state, 'Crop': le_crop}, target=target_col)
+    save_schema(schema, filepath)
+    print(f"✓ Feature schema saved to: {filepath}")
+
+@span
+def fit_encoders_streaming(filepath, chunksize):
+    """First pass over the CSV: collect category vocabularies and statistics
+    
+    Codes are assigned in sorted order, exactly like LabelEncoder.fit on the
+    full column. Numeric columns are folded into a StatsAccumulator chunk by
+    chunk, so statistics are available without holding the dataset.
+    """
+    categorical_cols = list(ENCODED_COLUMNS.values())
+    categories = {col: set() for col in categorical_cols}
+    accumulator = None
+    n_rows = 0
+    for chunk in pd.read_csv(filepath, chunksize=chunksize):
+        n_rows += len(chunk)
+        for col in categorical_cols:
+            categories[col].update(chunk[col].dropna().unique())
+        if accumulator is None:
+            accumulator = StatsAccumulator(chunk.select_dtypes(include=[np.number]).columns)
+        accumulator.update(chunk[accumulator.columns].to_numpy(dtype=np.float64))
+    vocabularies = {col: {str(cat): code for code, cat in enumerate(sorted(values))}
+                    for col, values in categories.items()}
+    return vocabularies, n_rows, accumulator
+
+@span
+def transform_chunk(chunk, vocabularies):
+    """Apply the feature_engineering transforms to one chunk, in place
+    
+    Produces the same columns, in the same order, as feature_engineering.
+    """
+    for encoded_col, raw_col in ENCODED_COLUMNS.items():
+        chunk[encoded_col] = chunk[raw_col].map(vocabularies[raw_col])
+    for name in DERIVED_FEATURES:
+        chunk[name] = derived_feature(name, chunk)
+    chunk.drop(columns=FEATURES_TO_REMOVE, inplace=True)
+    return chunk
+
+@span
+def preprocess_streaming(input_file, output_file, schema_file, chunksize=100_000):
+    """Preprocess a CSV too large for memory, one chunk at a time
+    
+    Pass 1 fits the encoders and statistics; pass 2 counts outliers, then
+    transforms each chunk and appends it to the output file. Peak memory is
+    bounded by the chunk size, not the dataset.
+    """
+    print("=" * 60)
+    print(f"STREAMING PREPROCESSING (chunks of {chunksize:,} rows)")
+    print("=" * 60)
+    
+    print("\n1. Fitting encoders and statistics...")
+    vocabularies, n_rows, accumulator = fit_encoders_streaming(input_file, chunksize)
+    for col, vocab in vocabularies.items():
+        print(f"   ✓ {col} encoded: {len(vocab)} unique values")
+    stats_report = accumulator.report()
+    outlier_counts = np.zeros(len(accumulator.columns), dtype=np.int64)
+    
+    print("\n2. Transforming chunks...")
+    columns = None
+    n_chunks = 0
+    code_dtype = code_dtype_for(max(len(vocab) for vocab in vocabularies.values()))
+    with ProcessedDataWriter(output_file, code_dtype=code_dtype) as writer:
+        for chunk in pd.read_csv(input_file, chunksize=chunksize):
+            outlier_counts += count_outliers(chunk[accumulator.columns].to_numpy(dtype=np.float64), stats_report)
+            transform_chunk(chunk, vocabularies)
+            writer.write(chunk)
+            columns = list(chunk.columns)
+            n_chunks += 1
+    print(f"   ✓ {n_rows:,} rows in {n_chunks} chunks written to: {output_file}")
+    
+    print("\n3. Outliers (IQR method" + ("" if stats_report['exact_quantiles'] else ", sampled quartiles") + "):")
+    set_outlier_counts(stats_report, outlier_counts)
+    report_outliers(stats_report)
+    
+    schema = build_schema([col for col in columns if col != 'Price'], vocabularies)
+    save_schema(schema, schema_file)
+    print(f"✓ Feature schema saved to: {schema_file}")
+    return n_rows, columns, stats_report
+
+def parse_args(argv=None):
+    """Command line options"""
+    parser = argparse.ArgumentParser(description='Crop price data preprocessing')
+    parser.add_argument('--input', default='/Users/nishanishmitha/Desktop/ML model /dataset.csv',
+                        help='raw dataset CSV')
+    parser.add_argument('--output', default='/Users/nishanishmitha/Desktop/ML model /processed_data.csv',
+                        help='processed dataset to write (.csv, .parquet or .arrow)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='stream the input in chunks of this many rows (skips EDA and plots)')
+    parser.add_argument('--plots', action=argparse.BooleanOptionalAction, default=False,
+                        help='render the PNG figures (off by default)')
+    parser.add_argument('--plots-dir', default=None,
+                        help='directory for the figures (default: next to --output)')
+    parser.add_argument('--background-plots', action='store_true',
+                        help='render figures in a background process')
+    return parser.parse_args(argv)
+
+@span
+def main(argv=None):
     """Main execution function"""
     print("\n" + "=" * 60)
     print("CROP PRICE PREDICTION - DATA PREPROCESSING")
     print("=" * 60)
     
     # File paths
-    input_file = '/Users/nishanishmitha/Desktop/ML model /dataset.csv'
-    output_file = '/Users/nishanishmitha/Desktop/ML model /processed_data.csv'
-    
-    # 1. Load data
-    df = load_data(input_file)
-    
-    # 2. Exploratory analysis
-    correlations = exploratory_analysis(df)
-    
-    # 3. Detect outliers
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-    outlier_info = detect_outliers(df, numeric_cols)
-    
-    # 4. Feature engineering
-    df_processed, le_state, le_crop = feature_engineering(df)
-    
-    # 5. Visualize distributions
-    visualize_feature_distributions(df_processed)
-    
-    # 6. Save processed data
-    save_processed_data(df_processed, output_file)
+    args = parse_args(argv)
+    input_file = args.input
+    output_file = args.output
+    schema_file = str(Path(output_file).with_name(SCHEMA_FILENAME))
+    
+    if args.chunksize:
+        preprocess_streaming(input_file, output_file, schema_file, args.chunksize)
+        print("\n" + "=" * 60)
+        print("PREPROCESSING COMPLETE!")
+        print("=" * 60)
+        return
+    
+    reports = ReportWriter(args.plots_dir or Path(output_file).parent, enabled=args.plots,
+                           background=args.background_plots)
+    with reports:
+        # 1. Load data
+        df = load_data(input_file)
+        
+        # 2. Exploratory analysis (statistics for all numeric columns computed once)
+        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+        stats_report = frame_statistics(df, numeric_cols)
+        correlations = exploratory_analysis(df, stats_report, reports)
+        
+        # 3. Detect outliers
+        outlier_info = detect_outliers(df, numeric_cols, stats_report)
+        
+        # 4. Feature engineering
+        df_processed, le_state, le_crop = feature_engineering(df)
+        
+        # 5. Visualize distributions
+        if args.plots:
+            visualize_feature_distributions(df_processed, reports)
+        
+        # 6. Save processed data
+        save_processed_data(df_processed, output_file)
+        save_feature_schema(df_processed, le_state, le_crop, schema_file)
     
     print("\n" + "=" * 60)
     print("PREPROCESSING COMPLETE!")
@@ -255,9 +376,10 @@ def main():
         print(f"    {i}. {feature}: {corr:.4f}")
     
     print("\nGenerated Files:")
-    print("  ✓ processed_data.csv")
-    print("  ✓ correlation_matrix.png")
-    print("  ✓ feature_distributions.png")
+    print(f"  ✓ {Path(output_file).name}")
+    print(f"  ✓ {SCHEMA_FILENAME}")
+    for path in reports.written:
+        print(f"  ✓ {path.name}")
 
 if __name__ == "__main__":
     main()
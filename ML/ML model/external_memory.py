@@ -0,0 +1,191 @@
+"""
+Out-of-core Training
+Trains the price model on a processed dataset that does not fit in memory.
+
+XGBoost reads the data through a DataIter that streams it from disk in
+chunks (data_io.iter_processed_data). An ExtMemQuantileDMatrix sketches
+the feature quantiles over one pass, then keeps only the quantized pages,
+written to a cache directory on disk and read back page by page in every
+boosting round of the `hist` tree method. Neither the feature matrix nor a
+pandas copy of the dataset is ever held in memory; what still grows with
+the row count is XGBoost's per-row state (labels, gradients, predictions
+and row positions, a few dozen bytes per training row).
+
+The train/test split is made without copies: every row's global index is
+hashed with the seed, and a row belongs to the test set when its hash falls
+below `test_size`. Each pass over the file recomputes the same split chunk
+by chunk, so the test rows never have to be held apart in memory; the split
+is also independent of the chunk size and file format.
+
+Test metrics are accumulated over chunks (StreamingMetrics) and match
+xgboost_model.regression_metrics.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import xgboost as xgb
+
+from data_io import iter_processed_data
+
+DEFAULT_CHUNK_ROWS = 500_000
+# Fixed parameters for out-of-core runs; the hyperparameter search needs the
+# training set in memory (override with xgboost_model.py --params)
+DEFAULT_PARAMS = {
+    'n_estimators': 200,
+    'learning_rate': 0.1,
+    'max_depth': 5,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'min_child_weight': 3,
+}
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_split(start, n_rows, test_size=0.2, seed=42):
+    """Boolean test-set mask for rows start .. start + n_rows - 1.
+
+    splitmix64 of the row index and seed, scaled to [0, 1): a row is in the
+    test set when that falls below `test_size`.
+    """
+    with np.errstate(over='ignore'):
+        z = np.arange(start, start + n_rows, dtype=np.uint64) + np.uint64(seed) * _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) * 2.0 ** -53 < test_size
+
+
+def iter_split(filepath, subset='train', target_col='Price', chunk_rows=DEFAULT_CHUNK_ROWS,
+               test_size=0.2, seed=42):
+    """Yield (X float32 array, y, feature names) chunks of one side of the hash split."""
+    start = 0
+    for chunk in iter_processed_data(filepath, chunk_rows):
+        mask = hash_split(start, len(chunk), test_size, seed)
+        start += len(chunk)
+        if subset == 'train':
+            mask = ~mask
+        if not mask.any():
+            continue
+        features = [col for col in chunk.columns if col != target_col]
+        X = chunk[features].to_numpy(dtype=np.float32)[mask]
+        y = chunk[target_col].to_numpy(dtype=np.float64)[mask]
+        yield X, y, features
+
+
+class ChunkIter(xgb.DataIter):
+    """Feeds one side of the hash split to XGBoost, one on-disk chunk at a time."""
+
+    def __init__(self, filepath, cache_prefix, subset='train', target_col='Price',
+                 chunk_rows=DEFAULT_CHUNK_ROWS, test_size=0.2, seed=42):
+        self._args = (filepath, subset, target_col, chunk_rows, test_size, seed)
+        self._chunks = None
+        self.rows = 0
+        self.feature_names = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter_split(*self._args)
+            self.rows = 0
+        try:
+            X, y, features = next(self._chunks)
+        except StopIteration:
+            return False
+        self.rows += len(y)
+        self.feature_names = features
+        input_data(data=X, label=y, feature_names=features)
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+class StreamingMetrics:
+    """RMSE, MAE, R² and MAPE accumulated over chunks of (y_true, y_pred)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ss_res = 0.0
+        self.abs_sum = 0.0
+        self.ape_sum = 0.0
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64)
+        residuals = y_true - np.asarray(y_pred, dtype=np.float64)
+        abs_residuals = np.abs(residuals)
+        self.ss_res += float(residuals @ residuals)
+        self.abs_sum += float(abs_residuals.sum())
+        self.ape_sum += float(np.sum(abs_residuals / np.abs(y_true)))
+        # Chan et al.: merge the chunk's mean and sum of squares into the totals
+        n = len(y_true)
+        mean = float(y_true.mean())
+        m2 = float(np.sum((y_true - mean) ** 2))
+        total = self.n + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.mean += delta * n / total
+        self.n = total
+
+    def result(self):
+        return {
+            'rmse': float(np.sqrt(self.ss_res / self.n)),
+            'mae': self.abs_sum / self.n,
+            'r2': 1 - self.ss_res / self.m2 if self.m2 > 0 else float('nan'),
+            'mape': self.ape_sum / self.n * 100,
+        }
+
+
+def booster_params(params, seed=42, nthread=-1):
+    """xgb.train parameters and number of rounds from XGBRegressor-style `params`."""
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    rounds = int(params.pop('n_estimators'))
+    params.update(objective='reg:squarederror', tree_method='hist', seed=seed,
+                  nthread=os.cpu_count() if nthread is None or nthread < 0 else nthread)
+    return params, rounds
+
+
+def train(filepath, params=None, target_col='Price', chunk_rows=DEFAULT_CHUNK_ROWS,
+          test_size=0.2, seed=42, nthread=-1, cache_dir=None):
+    """Train on the train side of the hash split through an external-memory matrix.
+
+    The page cache goes to a temporary directory under `cache_dir` (default:
+    the system temp dir) and is removed afterwards. Returns (booster, info)
+    with the train row count, feature names and the cache's size on disk.
+    """
+    xgb_params, rounds = booster_params(params, seed, nthread)
+    with tempfile.TemporaryDirectory(prefix='xgb-extmem-', dir=cache_dir) as cache:
+        it = ChunkIter(filepath, os.path.join(cache, 'train'), 'train', target_col,
+                       chunk_rows, test_size, seed)
+        dtrain = xgb.ExtMemQuantileDMatrix(it, max_bin=xgb_params.get('max_bin', 256),
+                                           nthread=xgb_params['nthread'])
+        booster = xgb.train(xgb_params, dtrain, num_boost_round=rounds)
+        cache_bytes = sum(entry.stat().st_size for entry in os.scandir(cache) if entry.is_file())
+        info = {'rows': it.rows, 'feature_names': it.feature_names, 'rounds': rounds,
+                'cache_bytes': cache_bytes}
+        del dtrain
+    return booster, info
+
+
+def evaluate(booster, filepath, target_col='Price', chunk_rows=DEFAULT_CHUNK_ROWS,
+             test_size=0.2, seed=42):
+    """Metrics on both sides of the hash split, predicting chunk by chunk.
+
+    Returns {'train': metrics, 'test': metrics}.
+    """
+    totals = {'train': StreamingMetrics(), 'test': StreamingMetrics()}
+    start = 0
+    for chunk in iter_processed_data(filepath, chunk_rows):
+        is_test = hash_split(start, len(chunk), test_size, seed)
+        start += len(chunk)
+        X = chunk.drop(columns=[target_col]).to_numpy(dtype=np.float32)
+        y = chunk[target_col].to_numpy(dtype=np.float64)
+        y_pred = booster.inplace_predict(X)
+        for subset, mask in (('train', ~is_test), ('test', is_test)):
+            if mask.any():
+                totals[subset].update(y[mask], y_pred[mask])
+    return {subset: m.result() for subset, m in totals.items()}
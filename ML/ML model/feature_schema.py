@@ -0,0 +1,209 @@
+"""
+Feature Schema
+Shared description of the model inputs, used by training and by predict.py.
+
+Training writes `feature_schema.json` next to the model: the model's column
+order plus the LabelEncoder vocabularies as plain dicts. predict.py turns the
+schema into a FeatureBuilder, which builds the model's input matrix straight
+from JSON payloads with NumPy only (no pandas or sklearn at serve time).
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+SCHEMA_FILENAME = 'feature_schema.json'
+
+# Model columns holding label-encoded categories, and the raw column each encodes
+ENCODED_COLUMNS = {
+    'State_Encoded': 'State',
+    'Crop_Encoded': 'Crop',
+}
+
+# Derived features: name -> (input columns, function of those columns).
+# The functions work on pandas Series during training and on NumPy arrays at
+# serve time, so both paths compute exactly the same values.
+DERIVED_FEATURES = {
+    # Cost efficiency: Production per unit cost
+    'Cost_Efficiency': (('Production', 'CostCultivation'),
+                        lambda production, cost: production / (cost + 1)),
+    # Yield to Rainfall ratio
+    'Yield_Rainfall_Ratio': (('Yield', 'RainFall Annual'),
+                             lambda yield_, rainfall: yield_ / (rainfall + 1)),
+    # Temperature-Rainfall interaction
+    'Temp_Rain_Interaction': (('Temperature', 'RainFall Annual'),
+                              lambda temperature, rainfall: temperature * rainfall),
+    # Total cultivation cost (average of both cost columns)
+    'Total_Cost_Avg': (('CostCultivation', 'CostCultivation2'),
+                       lambda cost, cost2: (cost + cost2) / 2),
+}
+
+# Payload keys accepted for each raw column, tried in order
+RAW_ALIASES = {
+    'State': ('State', 'state'),
+    'Crop': ('Crop', 'crop'),
+    'CostCultivation': ('CostCultivation', 'costCultivation'),
+    'CostCultivation2': ('CostCultivation2', 'costCultivation2'),
+    'Production': ('Production', 'production'),
+    'Yield': ('Yield', 'yield'),
+    'Temperature': ('Temperature', 'temperature'),
+    'RainFall Annual': ('RainFall Annual', 'rainfallAnnual', 'rainfall'),
+}
+
+# Columns of the original two-feature model shipped before schemas existed;
+# it always treated a missing value as 0
+LEGACY_COLUMNS = ['currentPrice', 'change']
+LEGACY_DEFAULTS = {'currentPrice': 0.0, 'change': 0.0}
+
+
+def derived_feature(name, columns):
+    """Compute derived feature `name` from a mapping of column -> values."""
+    inputs, fn = DERIVED_FEATURES[name]
+    return fn(*(columns[col] for col in inputs))
+
+
+def encoder_vocabulary(encoder):
+    """Return a fitted LabelEncoder's classes as a {category: code} dict."""
+    return {str(cls): int(code) for code, cls in enumerate(encoder.classes_)}
+
+
+def build_schema(columns, encoders, target='Price'):
+    """Build a schema dict from the model's column order and fitted encoders.
+
+    `encoders` maps raw column name (e.g. 'State') to a LabelEncoder or to an
+    already-extracted {category: code} dict.
+    """
+    vocabularies = {}
+    for raw_col, encoder in encoders.items():
+        vocabularies[raw_col] = encoder if isinstance(encoder, dict) else encoder_vocabulary(encoder)
+    return {
+        'version': SCHEMA_VERSION,
+        'target': target,
+        'columns': [str(col) for col in columns],
+        'encoders': vocabularies,
+    }
+
+
+def save_schema(schema, filepath):
+    """Write the schema as compact JSON."""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(schema, f, separators=(',', ':'), ensure_ascii=False)
+
+
+def load_schema(filepath):
+    """Read a schema written by save_schema."""
+    with open(filepath, encoding='utf-8') as f:
+        schema = json.load(f)
+    if schema.get('version') != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported feature schema version: {schema.get('version')}")
+    return schema
+
+
+def schema_path_for(model_path):
+    """Location of the schema that belongs to a model file."""
+    return Path(model_path).with_name(SCHEMA_FILENAME)
+
+
+class FeatureBuilder:
+    """Builds model input rows from payload dicts according to a schema.
+
+    The per-column plan is resolved once at construction, so building a batch
+    is one pass over the payloads into preallocated arrays followed by
+    vectorized derived-feature arithmetic. Every raw input is required unless
+    `defaults` gives a value for it: a payload without it (or with a category
+    outside the vocabulary) is not scored on NaNs but reported by build().
+    """
+
+    def __init__(self, columns, encoders=None, defaults=None):
+        self.columns = list(columns)
+        encoders = encoders or {}
+        defaults = defaults or {}
+        # Constructor arguments as plain JSON, to rebuild the same builder elsewhere
+        self.spec = {'columns': self.columns, 'encoders': encoders, 'defaults': defaults}
+
+        needed = []
+        for col in self.columns:
+            if col in DERIVED_FEATURES:
+                needed.extend(DERIVED_FEATURES[col][0])
+            elif col in ENCODED_COLUMNS:
+                needed.append(ENCODED_COLUMNS[col])
+            else:
+                needed.append(col)
+        # Raw inputs in first-use order, each read from the payload exactly once
+        self._inputs = list(dict.fromkeys(needed))
+        self._input_index = {name: i for i, name in enumerate(self._inputs)}
+        self._defaults = np.array([defaults.get(name, np.nan) for name in self._inputs],
+                                  dtype=np.float64)
+        self._required = np.isnan(self._defaults)
+
+        self._readers = []
+        for name in self._inputs:
+            keys = RAW_ALIASES.get(name, (name,))
+            vocab = encoders.get(name)
+            if vocab is not None:
+                # Case-insensitive lookup; payloads say 'Tomato', data says 'TOMATO'
+                vocab = {str(k).strip().casefold(): float(v) for k, v in vocab.items()}
+            self._readers.append((keys, vocab))
+
+    @classmethod
+    def from_schema(cls, schema):
+        return cls(schema['columns'], schema.get('encoders'))
+
+    def build(self, payloads, missing=None):
+        """Return (X, errors) for a list of payload dicts.
+
+        X is a float32 array of shape (len(payloads), len(columns)); `errors`
+        maps row index to a message for rows that could not be encoded; their
+        rows in X are incomplete and must not be scored. Rows lacking required
+        inputs are errors too, unless a `missing` dict is passed: it then
+        receives {row index: [raw input names]} for them instead.
+        """
+        n = len(payloads)
+        raw = np.empty((len(self._inputs), n), dtype=np.float64)
+        raw[:] = self._defaults[:, None]
+        errors = {}
+
+        readers = self._readers
+        for i, payload in enumerate(payloads):
+            if not isinstance(payload, dict):
+                errors[i] = 'Expected a JSON object'
+                continue
+            for j, (keys, vocab) in enumerate(readers):
+                value = None
+                for key in keys:
+                    value = payload.get(key)
+                    if value is not None:
+                        break
+                if value is None:
+                    continue
+                if vocab is not None:
+                    raw[j, i] = vocab.get(str(value).strip().casefold(), np.nan)
+                    continue
+                try:
+                    raw[j, i] = float(value)
+                except (TypeError, ValueError) as e:
+                    errors[i] = str(e)
+                    break
+
+        absent = np.isnan(raw) & self._required[:, None]
+        for i in np.flatnonzero(absent.any(axis=0)).tolist():
+            if i in errors:
+                continue
+            names = [self._inputs[j] for j in np.flatnonzero(absent[:, i])]
+            if missing is None:
+                errors[i] = f"Missing or unknown inputs: {', '.join(names)}"
+            else:
+                missing[i] = names
+
+        inputs = {name: raw[i] for name, i in self._input_index.items()}
+        X = np.empty((n, len(self.columns)), dtype=np.float32)
+        for k, col in enumerate(self.columns):
+            if col in DERIVED_FEATURES:
+                X[:, k] = derived_feature(col, inputs)
+            elif col in ENCODED_COLUMNS:
+                X[:, k] = inputs[ENCODED_COLUMNS[col]]
+            else:
+                X[:, k] = inputs[col]
+        return X, errors
@@ -0,0 +1,320 @@
+"""
+Incremental Retraining Script
+Updates the trained model with rows appended to the raw dataset since the last
+run, without re-running preprocessing, the hyperparameter search or a full fit.
+
+A watermark file next to the model (xgboost_model.watermark.json) records how
+far into the raw CSV previous runs have read (a byte offset on a line
+boundary) and which model version it belongs to. Each run:
+
+  1. reads only the bytes after the watermark and encodes them with the
+     vocabularies in feature_schema.json (new states/crops get new codes)
+  2. assigns every new row to train or holdout by a stable hash of its
+     values; holdout rows accumulate in xgboost_model.holdout.csv
+  3. continues boosting the current booster on the new training rows with a
+     few extra trees (--mode boost), or refits the leaf values of the
+     existing trees to them (--mode refresh)
+  4. scores the current and the candidate model on the whole holdout and
+     publishes the candidate (and advances the watermark) only if neither
+     RMSE nor MAE gets worse than --tolerance allows
+
+If there is no watermark for the current model (first run, or after a full
+retrain with xgboost_model.py) the run only bootstraps: the whole file is
+marked as seen and the holdout starts empty, so it only ever contains rows
+that neither the current nor the candidate model was trained on.
+
+With --registry the current version is read from a model registry (see
+model_registry.py) and the candidate is published to it atomically; the
+watermark and holdout then live in the registry directory.
+
+Usage:
+    python incremental.py [--input dataset.csv] [--model xgboost_model.pkl | --registry DIR]
+                          [--mode boost|refresh] [--extra-trees N] [--dry-run]
+"""
+
+import argparse
+import io
+import json
+import pickle
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_io import read_processed_data, write_processed_data
+from data_preprocessing import transform_chunk
+from feature_schema import ENCODED_COLUMNS, load_schema, schema_path_for
+from model_io import artifact_version
+from model_registry import MODEL_FILENAME, current_model_path, publish
+from prediction_table import refresh_after_publish
+
+warnings.filterwarnings('ignore')
+
+ML_DIR = Path(__file__).resolve().parent
+WATERMARK_SUFFIX = '.watermark.json'
+HOLDOUT_SUFFIX = '.holdout.csv'
+
+
+def watermark_path(model_path):
+    return Path(model_path).with_suffix(WATERMARK_SUFFIX)
+
+
+def holdout_path(model_path):
+    return Path(model_path).with_suffix(HOLDOUT_SUFFIX)
+
+
+def model_version(model_path):
+    return artifact_version(model_path, schema_path_for(model_path))
+
+
+def read_watermark(model_path):
+    """Return the watermark dict, or None if there is none."""
+    path = watermark_path(model_path)
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_watermark(model_path, watermark):
+    with open(watermark_path(model_path), 'w', encoding='utf-8') as f:
+        json.dump(watermark, f, indent=2)
+
+
+def read_rows_since(input_file, offset=None):
+    """Read the CSV rows after byte `offset` (all rows if offset is None).
+
+    Returns (rows DataFrame, header line, new offset). A trailing line without
+    a newline is left for the next run, in case it is still being written.
+    """
+    with open(input_file, 'rb') as f:
+        header = f.readline()
+        start = len(header) if offset is None else offset
+        size = f.seek(0, 2)
+        if size < start:
+            raise ValueError(f"{input_file} is shorter than the watermark "
+                             f"({size} < {start} bytes); run a full retrain")
+        f.seek(start)
+        data = f.read()
+    complete = data[:data.rfind(b'\n') + 1]
+    columns = header.decode('utf-8').strip().split(',')
+    if complete.strip():
+        rows = pd.read_csv(io.BytesIO(complete), header=None, names=columns)
+    else:
+        rows = pd.DataFrame(columns=columns)
+    return rows, header.decode('utf-8').strip(), start + len(complete)
+
+
+def extend_vocabularies(schema, rows):
+    """Vocabularies from the schema plus codes for categories never seen before.
+
+    New categories get codes after the existing ones, so existing codes (and
+    the trees that split on them) keep their meaning.
+    """
+    vocabularies = {col: dict(vocab) for col, vocab in schema['encoders'].items()}
+    added = {}
+    for raw_col in ENCODED_COLUMNS.values():
+        vocab = vocabularies.setdefault(raw_col, {})
+        for value in pd.unique(rows[raw_col].dropna().astype(str)):
+            if value not in vocab:
+                vocab[value] = max(vocab.values(), default=-1) + 1
+                added.setdefault(raw_col, []).append(value)
+    return vocabularies, added
+
+
+def holdout_mask(rows, holdout_pct):
+    """Stable per-row holdout assignment from a hash of the raw values."""
+    hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    return (hashes % 100) < holdout_pct
+
+
+def encode_rows(rows, vocabularies, columns, target_col='Price'):
+    """Raw rows -> (X in model column order, y)."""
+    processed = transform_chunk(rows.copy(), vocabularies)
+    return processed[columns], processed[target_col]
+
+
+def holdout_metrics(model, X, y):
+    """RMSE, MAE and R² of `model` on the holdout rows."""
+    y = np.asarray(y, dtype=np.float64)
+    residuals = y - model.predict(X)
+    ss_tot = np.sum((y - y.mean()) ** 2)
+    return {
+        'rmse': float(np.sqrt(np.mean(residuals ** 2))),
+        'mae': float(np.mean(np.abs(residuals))),
+        'r2': float(1 - np.sum(residuals ** 2) / ss_tot) if ss_tot > 0 else float('nan'),
+    }
+
+
+def update_model(model, X, y, mode='boost', extra_trees=20):
+    """Candidate model: `model` continued on (X, y).
+
+    'boost' appends `extra_trees` trees fitted to the new rows' residuals;
+    'refresh' keeps the tree structure and refits the leaf values. Uses
+    xgb.train on a plain DMatrix because the refresh updater cannot run on
+    the QuantileDMatrix that XGBRegressor.fit builds.
+    """
+    import xgboost as xgb
+
+    booster = model.get_booster()
+    params = model.get_xgb_params()
+    if mode == 'boost':
+        rounds = extra_trees
+    elif mode == 'refresh':
+        rounds = booster.num_boosted_rounds()
+        params.update(process_type='update', updater='refresh', refresh_leaf=True)
+    else:
+        raise ValueError(f"Unknown update mode {mode!r}")
+    dtrain = xgb.DMatrix(X, label=y)
+    updated = xgb.train(params, dtrain, num_boost_round=rounds, xgb_model=booster)
+
+    candidate = xgb.XGBRegressor(**dict(model.get_params(), n_estimators=updated.num_boosted_rounds()))
+    candidate.load_model(bytearray(updated.save_raw('ubj')))
+    return candidate
+
+
+def regressed(current, candidate, tolerance):
+    """True if any error metric of the candidate is worse beyond `tolerance`."""
+    return any(candidate[key] > current[key] * (1 + tolerance) for key in ('rmse', 'mae'))
+
+
+def bootstrap(input_file, model_file, state_file, columns, target_col='Price'):
+    """Mark the whole input as seen and start an empty holdout.
+
+    The existing rows are not used for validation: the current model was
+    trained on most of them, which would make any update look like a regression.
+    """
+    rows, header, offset = read_rows_since(input_file)
+    write_processed_data(pd.DataFrame(columns=list(columns) + [target_col]), holdout_path(state_file))
+    watermark = {
+        'source': str(Path(input_file).resolve()),
+        'header': header,
+        'offset': offset,
+        'rows': len(rows),
+        'model_version': model_version(model_file),
+        'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    write_watermark(state_file, watermark)
+    print(f"✓ Watermark initialised at {len(rows):,} rows ({offset:,} bytes)")
+    return watermark
+
+
+def parse_args(argv=None):
+    """Command line options"""
+    parser = argparse.ArgumentParser(description='Crop price incremental retraining')
+    parser.add_argument('--input', default=str(ML_DIR / 'dataset.csv'),
+                        help='raw dataset CSV that new rows are appended to')
+    parser.add_argument('--model', default=str(ML_DIR / 'xgboost_model.pkl'),
+                        help='trained model to update')
+    parser.add_argument('--registry', default=None,
+                        help='update the model published in this registry directory instead of --model')
+    parser.add_argument('--mode', choices=('boost', 'refresh'), default='boost',
+                        help='add trees (boost) or refit leaf values (refresh)')
+    parser.add_argument('--extra-trees', type=int, default=20,
+                        help='trees added per run with --mode boost')
+    parser.add_argument('--holdout-pct', type=int, default=20,
+                        help='percentage of new rows held out for validation')
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='allowed relative increase of holdout RMSE/MAE')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='train and validate, but do not publish')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function; returns True if a new model was published"""
+    print("\n" + "=" * 60)
+    print("CROP PRICE PREDICTION - INCREMENTAL RETRAINING")
+    print("=" * 60)
+
+    args = parse_args(argv)
+    if args.registry:
+        # Watermark and holdout live at the registry root, the model in its current version
+        model_file = current_model_path(args.registry)
+        if model_file is None:
+            raise FileNotFoundError(f"Nothing published in registry {args.registry}")
+        state_file = Path(args.registry) / MODEL_FILENAME
+    else:
+        model_file = state_file = Path(args.model)
+    schema = load_schema(schema_path_for(model_file))
+
+    # 1. Find the rows added since the last run
+    watermark = read_watermark(state_file)
+    if watermark is None or watermark.get('model_version') != model_version(model_file):
+        print("\nNo watermark for the current model; bootstrapping.")
+        bootstrap(args.input, model_file, state_file, schema['columns'], schema['target'])
+        return False
+    rows, header, offset = read_rows_since(args.input, watermark['offset'])
+    if header != watermark['header']:
+        raise ValueError("The dataset header changed since the last run; run a full retrain")
+    print(f"\n1. New rows since last run: {len(rows):,}")
+    if rows.empty:
+        print("   Nothing to do.")
+        return False
+
+    # 2. Encode with the saved vocabularies and split off the holdout rows
+    vocabularies, added = extend_vocabularies(schema, rows)
+    for col, values in added.items():
+        print(f"   + new {col} values: {values}")
+    mask = holdout_mask(rows, args.holdout_pct)
+    X_new, y_new = encode_rows(rows[~mask], vocabularies, schema['columns'], schema['target'])
+    X_hold_new, y_hold_new = encode_rows(rows[mask], vocabularies, schema['columns'], schema['target'])
+    holdout = read_processed_data(holdout_path(state_file))
+    holdout = pd.concat([holdout, pd.concat([X_hold_new, y_hold_new], axis=1)],
+                        ignore_index=True).astype(np.float64)
+    X_hold, y_hold = holdout[schema['columns']], holdout[schema['target']]
+    print(f"   Training rows: {len(X_new):,}, holdout rows: {len(holdout):,} ({len(X_hold_new):,} new)")
+    if X_new.empty or holdout.empty:
+        print("   Not enough new rows to train and validate; waiting for more data.")
+        return False
+
+    # 3. Continue from the current booster
+    with open(model_file, 'rb') as f:
+        model = pickle.load(f)
+    started = time.perf_counter()
+    candidate = update_model(model, X_new, y_new, args.mode, args.extra_trees)
+    print(f"\n2. Candidate ({args.mode}) trained in {time.perf_counter() - started:.2f}s: "
+          f"{model.get_booster().num_boosted_rounds()} -> "
+          f"{candidate.get_booster().num_boosted_rounds()} trees")
+
+    # 4. Validate on the holdout and publish only if nothing regressed
+    current_metrics = holdout_metrics(model, X_hold, y_hold)
+    candidate_metrics = holdout_metrics(candidate, X_hold, y_hold)
+    print("\n3. Holdout validation:")
+    print(f"   {'':<10} {'RMSE':>12} {'MAE':>12} {'R²':>8}")
+    for name, m in (('current', current_metrics), ('candidate', candidate_metrics)):
+        print(f"   {name:<10} {m['rmse']:>12,.2f} {m['mae']:>12,.2f} {m['r2']:>8.4f}")
+    if regressed(current_metrics, candidate_metrics, args.tolerance):
+        print("\n✗ Candidate regressed on the holdout; keeping the current model.")
+        return False
+    if args.dry_run:
+        print("\n✓ Candidate passed validation (dry run, not published).")
+        return False
+
+    from xgboost_model import save_model
+    new_schema = dict(schema, encoders=vocabularies)
+    if args.registry:
+        version, model_file = publish(args.registry, lambda path: save_model(
+            candidate, path, new_schema, schema['columns']))
+        print(f"✓ Published model version {version} to registry: {args.registry}")
+    else:
+        save_model(candidate, model_file, new_schema, schema['columns'])
+    table_rows = refresh_after_publish(model_file, args.registry)
+    if table_rows is not None:
+        print(f"✓ Prediction table rebuilt for the new model: {table_rows} pairs")
+    write_processed_data(holdout, holdout_path(state_file))
+    write_watermark(state_file, dict(
+        watermark,
+        offset=offset,
+        rows=watermark['rows'] + len(rows),
+        model_version=model_version(model_file),
+        updated_at=time.strftime('%Y-%m-%dT%H:%M:%S'),
+    ))
+    print(f"\n✓ Published updated model; watermark at {watermark['rows'] + len(rows):,} rows")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Instrumentation
+Stage-level timing, memory and profiling hooks for the ML pipeline.
+
+Off by default. When PIPELINE_TRACE is not set, @span returns the decorated
+function unchanged and stage() returns a shared no-op context manager, so
+instrumented code runs exactly as before.
+
+Environment:
+  PIPELINE_TRACE=json|chrome   record spans and write one file per run
+                               (1 means json)
+  PIPELINE_TRACE_DIR=DIR       where trace files go (default ./traces)
+  PIPELINE_PROFILE=cprofile,tracemalloc
+                               cprofile: one .prof file per stage (plus
+                               its top functions in the trace);
+                               tracemalloc: Python allocation peak per stage
+  PIPELINE_PROFILE_DEPTH=N     nesting depth of the stages cProfile covers
+                               (default 1: the stages called from main; a
+                               profiled stage includes everything below it)
+
+Each span records wall time, RSS before/after, the process's peak RSS so
+far (VmHWM) and its parent span. The json format holds the spans and a
+per-stage summary; the chrome format is a Chrome trace (chrome://tracing or
+https://ui.perfetto.dev) with one complete event per span. A short summary
+is printed to stderr when the file is written at exit.
+
+Usage:
+    from instrumentation import span, stage
+
+    @span
+    def load_data(filepath): ...
+
+    with stage('GridSearchCV'):
+        grid_search.fit(X, y)
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+TRACE_FORMAT = os.environ.get('PIPELINE_TRACE', '').strip().lower()
+if TRACE_FORMAT in ('', '0', 'false', 'off'):
+    TRACE_FORMAT = ''
+elif TRACE_FORMAT not in ('json', 'chrome'):
+    TRACE_FORMAT = 'json'
+ENABLED = bool(TRACE_FORMAT)
+TRACE_DIR = Path(os.environ.get('PIPELINE_TRACE_DIR', 'traces'))
+PROFILERS = {p.strip() for p in os.environ.get('PIPELINE_PROFILE', '').lower().split(',') if p.strip()}
+# A long-running server (predict.py --serve) records a span per request; keep
+# the first MAX_SPANS and count the rest
+MAX_SPANS = int(os.environ.get('PIPELINE_TRACE_MAX_SPANS', '100000'))
+PROFILE_DEPTH = int(os.environ.get('PIPELINE_PROFILE_DEPTH', '1'))
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def _page_size():
+    try:
+        return os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return 4096
+
+
+_PAGE_MB = _page_size() / (1024 * 1024)
+
+
+def rss_mb():
+    """Current resident memory of this process in MB, or None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except OSError:
+        return None
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far (VmHWM) in MB, or None."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class Recorder:
+    """Collects the spans of one process and writes them at exit."""
+
+    def __init__(self, trace_format, trace_dir, profilers, profile_depth=1):
+        self.format = trace_format
+        self.trace_dir = Path(trace_dir)
+        self.profilers = profilers
+        self.profile_depth = profile_depth
+        self.pid = os.getpid()
+        self.started_ns = time.perf_counter_ns()
+        self.started_at = time.strftime('%Y%m%d-%H%M%S')
+        self.spans = []
+        self.dropped = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.profiling = False
+        if 'tracemalloc' in profilers:
+            import tracemalloc
+            tracemalloc.start()
+        atexit.register(self.write)
+
+    def _stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name):
+        stack = self._stack()
+        record = {
+            'name': name,
+            'parent': stack[-1]['name'] if stack else None,
+            'depth': len(stack),
+            'tid': threading.get_ident(),
+            'rss_before_mb': rss_mb(),
+        }
+        profiler = None
+        # cProfile allows one active profiler, so a stage nested in a
+        # profiled one shows up inside its parent's profile
+        if 'cprofile' in self.profilers and not self.profiling and len(stack) >= self.profile_depth:
+            import cProfile
+            profiler = cProfile.Profile()
+            self.profiling = True
+        if 'tracemalloc' in self.profilers:
+            import tracemalloc
+            if stack:
+                stack[-1]['_py_peak'] = max(stack[-1].get('_py_peak', 0), tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            record['_py_start'] = tracemalloc.get_traced_memory()[0]
+        stack.append(record)
+        record['start_ns'] = time.perf_counter_ns()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['dur_ns'] = time.perf_counter_ns() - record['start_ns']
+            stack.pop()
+            record['rss_after_mb'] = rss_mb()
+            record['peak_rss_mb'] = peak_rss_mb()
+            if 'tracemalloc' in self.profilers:
+                import tracemalloc
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, record.pop('_py_peak', 0))
+                start = record.pop('_py_start')
+                record['py_alloc_peak_mb'] = (peak - start) / (1024 * 1024)
+                record['py_alloc_net_mb'] = (current - start) / (1024 * 1024)
+                if stack:
+                    stack[-1]['_py_peak'] = max(stack[-1].get('_py_peak', 0), peak)
+            if profiler is not None:
+                self.profiling = False
+                record['profile'] = self._save_profile(profiler, name)
+            with self.lock:
+                if len(self.spans) < MAX_SPANS:
+                    self.spans.append(record)
+                else:
+                    self.dropped += 1
+
+    def _save_profile(self, profiler, name):
+        import io
+        import pstats
+
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+        path = self.trace_dir / f'{self._basename()}-{safe}-{len(self.spans)}.prof'
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:10]
+        return {
+            'file': str(path),
+            'top_cumulative': [
+                {'function': f'{Path(func[0]).name}:{func[1]}({func[2]})',
+                 'calls': entry[1], 'cumulative_s': round(entry[3], 6)}
+                for func, entry in top
+            ],
+        }
+
+    def _basename(self):
+        script = Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else 'python'
+        return f'{script}-{self.started_at}-{self.pid}'
+
+    def summary(self):
+        """Per stage name: calls, total and max wall time, max peak RSS."""
+        stages = {}
+        for record in self.spans:
+            entry = stages.setdefault(record['name'], {'calls': 0, 'total_s': 0.0, 'max_s': 0.0,
+                                                       'peak_rss_mb': None})
+            seconds = record['dur_ns'] / 1e9
+            entry['calls'] += 1
+            entry['total_s'] += seconds
+            entry['max_s'] = max(entry['max_s'], seconds)
+            if record['peak_rss_mb'] is not None:
+                entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0, record['peak_rss_mb'])
+        return stages
+
+    def _chrome_events(self):
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid,
+                   'args': {'name': ' '.join(sys.argv) or 'python'}}]
+        for record in sorted(self.spans, key=lambda r: r['start_ns']):
+            args = {k: v for k, v in record.items()
+                    if k not in ('name', 'tid', 'start_ns', 'dur_ns', 'depth', 'parent')}
+            events.append({
+                'name': record['name'], 'cat': 'pipeline', 'ph': 'X', 'pid': self.pid,
+                'tid': record['tid'], 'ts': (record['start_ns'] - self.started_ns) / 1000,
+                'dur': record['dur_ns'] / 1000, 'args': args,
+            })
+            if record['rss_after_mb'] is not None:
+                events.append({
+                    'name': 'rss_mb', 'ph': 'C', 'pid': self.pid,
+                    'ts': (record['start_ns'] + record['dur_ns'] - self.started_ns) / 1000,
+                    'args': {'rss': round(record['rss_after_mb'], 1)},
+                })
+        return events
+
+    def write(self):
+        """Write the trace file (once, at exit); returns its path."""
+        if not self.spans or os.getpid() != self.pid:
+            return None
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        stages = self.summary()
+        if self.format == 'chrome':
+            path = self.trace_dir / f'{self._basename()}.trace.json'
+            payload = {'traceEvents': self._chrome_events(), 'displayTimeUnit': 'ms'}
+        else:
+            path = self.trace_dir / f'{self._basename()}.json'
+            spans = []
+            for record in sorted(self.spans, key=lambda r: r['start_ns']):
+                record = dict(record)
+                record['start_s'] = (record.pop('start_ns') - self.started_ns) / 1e9
+                record['wall_s'] = record.pop('dur_ns') / 1e9
+                spans.append(record)
+            payload = {'argv': sys.argv, 'pid': self.pid, 'started_at': self.started_at,
+                       'profilers': sorted(self.profilers), 'dropped_spans': self.dropped,
+                       'stages': stages, 'spans': spans}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=1, default=str)
+        self.spans = []
+
+        print(f"\n[trace] {path}", file=sys.stderr)
+        for name, entry in sorted(stages.items(), key=lambda kv: -kv[1]['total_s'])[:15]:
+            print(f"[trace] {name:<40} {entry['calls']:>5}x {entry['total_s']:>9.3f} s", file=sys.stderr)
+        return path
+
+
+_recorder = Recorder(TRACE_FORMAT, TRACE_DIR, PROFILERS, PROFILE_DEPTH) if ENABLED else None
+
+
+def span(func=None, *, name=None):
+    """Decorator recording each call of a pipeline function as a span.
+
+    Usable as @span or @span(name='...'). Returns the function itself when
+    tracing is off.
+    """
+    if func is None:
+        return functools.partial(span, name=name)
+    if _recorder is None:
+        return func
+    label = name or func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _recorder.span(label):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def stage(name):
+    """Context manager recording a block as a span (no-op when tracing is off)."""
+    if _recorder is None:
+        return _NULL_STAGE
+    return _recorder.span(name)
+
+
+def write_trace():
+    """Write the spans recorded so far now instead of at exit."""
+    return _recorder.write() if _recorder is not None else None
@@ -0,0 +1,231 @@
+"""
+Model Bundle
+A family of models in one file: one member per crop (or crop group), plus a
+default member for every other row, and the routing between them.
+
+`xgboost_model.py --per-crop` writes `xgboost_model.bundle` next to the
+usual artifacts of the global model. The file is an uncompressed zip:
+  bundle.json               manifest: route column, crop code -> member,
+                            and per member its crops, row counts and scores
+  members/<name>.trees.npz  the member's trees for predict.py's NumPy evaluator
+  members/<name>.ubj        the member's native booster
+
+predict.py serves the bundle through ModelBundle: each row goes to the
+member of its crop code (rows of unknown crops to the default member), and
+a batch is scored with one call per member. Members are read from the zip
+on first use and the least recently used ones are evicted once the loaded
+members exceed `max_bytes` (PREDICT_BUNDLE_MAX_MB, default 256).
+"""
+
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+BUNDLE_SUFFIX = '.bundle'
+MANIFEST_NAME = 'bundle.json'
+BUNDLE_VERSION = 1
+DEFAULT_MEMBER = 'default'
+DEFAULT_MAX_MB = 256
+
+
+def bundle_path(model_path):
+    """Path of the model bundle belonging to `model_path`."""
+    return Path(model_path).with_suffix(BUNDLE_SUFFIX)
+
+
+def find_bundle(model_path):
+    """The bundle of `model_path` if it is at least as new as the pickle, else None.
+
+    A global model retrained after the bundle was written (e.g. by
+    incremental.py) takes over again instead of being shadowed by stale
+    members.
+    """
+    path = bundle_path(model_path)
+    if not path.exists():
+        return None
+    model_path = Path(model_path)
+    if model_path.exists() and model_path.stat().st_mtime > path.stat().st_mtime:
+        return None
+    return path
+
+
+def member_files(name):
+    return {'trees': f'members/{name}.trees.npz', 'native': f'members/{name}.ubj'}
+
+
+def write_bundle(path, manifest, files):
+    """Write a bundle atomically: `manifest` dict plus {archive name: bytes}."""
+    path = Path(path)
+    manifest = dict(manifest, bundle_version=BUNDLE_VERSION, created_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    fd, tmp = tempfile.mkstemp(prefix='.bundle-', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with zipfile.ZipFile(f, 'w', compression=zipfile.ZIP_STORED) as zf:
+                zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+                for name, data in files.items():
+                    zf.writestr(name, data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return path
+
+
+def read_manifest(path):
+    with zipfile.ZipFile(path) as zf:
+        return json.loads(zf.read(MANIFEST_NAME))
+
+
+def _nbytes(estimator):
+    """Memory held by a loaded member (array bytes, or the booster's serialized size)."""
+    arrays = [value for value in vars(estimator).values() if isinstance(value, np.ndarray)]
+    if arrays:
+        return sum(a.nbytes for a in arrays)
+    return getattr(estimator, 'serialized_bytes', 0)
+
+
+class ModelBundle:
+    """Routes rows to the bundle member of their crop, loading members on demand.
+
+    `fmt` ('auto'/'trees' or 'native') picks which stored format members are
+    loaded from. A single member larger than `max_bytes` is still loaded; it
+    just evicts everything else. The bundle file stays open until close().
+    """
+
+    def __init__(self, path, fmt='auto', max_bytes=None):
+        self.path = Path(path)
+        self.fmt = fmt
+        if max_bytes is None:
+            max_bytes = float(os.environ.get('PREDICT_BUNDLE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024
+        self.max_bytes = max_bytes
+        self._zip = zipfile.ZipFile(self.path)
+        self.manifest = json.loads(self._zip.read(MANIFEST_NAME))
+        self.feature_names_in_ = self.manifest.get('feature_names')
+        self.route_col = self.manifest['feature_names'].index(self.manifest['route_column'])
+
+        # Members by index; route_table maps an integer crop code to a member index
+        self.names = list(self.manifest['members'])
+        default = self.names.index(self.manifest.get('default', DEFAULT_MEMBER))
+        self.default_index = default
+        routes = {int(code): self.names.index(name) for code, name in self.manifest['routes'].items()}
+        self.route_table = np.full(max(routes, default=-1) + 1, default, dtype=np.int64)
+        for code, index in routes.items():
+            if code >= 0:
+                self.route_table[code] = index
+
+        self._loaded = OrderedDict()
+        self.loaded_bytes = 0
+        self.loads = self.evictions = 0
+        self.rows = [0] * len(self.names)
+
+    def route(self, X):
+        """Member index of every row of X."""
+        codes = np.asarray(X)[:, self.route_col]
+        members = np.full(len(codes), self.default_index, dtype=np.int64)
+        known = (codes >= 0) & (codes < len(self.route_table))  # False for NaN
+        members[known] = self.route_table[codes[known].astype(np.int64)]
+        return members
+
+    def predict(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        members = self.route(X)
+        if len(X) and (members == members[0]).all():
+            self.rows[members[0]] += len(X)
+            return np.asarray(self.member(members[0]).predict(X), dtype=np.float32)
+        out = np.empty(len(X), dtype=np.float32)
+        for index in np.unique(members):
+            rows = np.flatnonzero(members == index)
+            self.rows[index] += len(rows)
+            out[rows] = self.member(index).predict(X[rows])
+        return out
+
+    def member(self, index):
+        """The loaded estimator of member `index`, reading it from the bundle if needed."""
+        estimator = self._loaded.get(index)
+        if estimator is not None:
+            self._loaded.move_to_end(index)
+            return estimator[0]
+        estimator = self._load_member(self.names[index])
+        size = _nbytes(estimator)
+        self._loaded[index] = (estimator, size)
+        self.loaded_bytes += size
+        self.loads += 1
+        while self.loaded_bytes > self.max_bytes and len(self._loaded) > 1:
+            _, (_, evicted) = self._loaded.popitem(last=False)
+            self.loaded_bytes -= evicted
+            self.evictions += 1
+        return estimator
+
+    def _load_member(self, name):
+        files = self.manifest['members'][name]['files']
+        if self.fmt in ('auto', 'trees') and files.get('trees'):
+            from predict import TreeEnsemble
+            with np.load(io.BytesIO(self._zip.read(files['trees']))) as arrays:
+                return TreeEnsemble({key: arrays[key] for key in arrays.files})
+        from model_io import BoosterEstimator
+        import xgboost as xgb
+
+        data = self._zip.read(files['native'])
+        booster = xgb.Booster()
+        booster.load_model(bytearray(data))
+        estimator = BoosterEstimator(booster, self.feature_names_in_)
+        estimator.serialized_bytes = len(data)
+        return estimator
+
+    def stats(self):
+        return {
+            'members': len(self.names),
+            'loaded': [self.names[i] for i in self._loaded],
+            'loadedBytes': self.loaded_bytes,
+            'maxBytes': int(self.max_bytes),
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'rows': {name: n for name, n in zip(self.names, self.rows) if n},
+        }
+
+    def close(self):
+        """Close the bundle file and drop the loaded members."""
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        self._loaded.clear()
+        self.loaded_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def describe(path):
+    """One line per member of a bundle file, for the command line."""
+    manifest = read_manifest(path)
+    lines = [f"{path}: {len(manifest['members'])} members, routed on {manifest['route_column']} "
+             f"(written {manifest.get('created_at', '?')})"]
+    for name, member in manifest['members'].items():
+        rows = member.get('train_rows')
+        rmse = member.get('test_rmse')
+        lines.append(f"  {name:<20} crops: {', '.join(member.get('crops') or ['(all others)'])}; "
+                     f"{'all' if rows is None else f'{rows:,}'} train rows; "
+                     f"test RMSE {'-' if rmse is None else f'{rmse:,.2f}'}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import sys
+
+    from predict import MODEL_PATH
+
+    print(describe(sys.argv[1] if len(sys.argv) > 1 else bundle_path(MODEL_PATH)))
@@ -0,0 +1,171 @@
+"""
+Model I/O
+Saving and loading the trained booster in XGBoost's native format.
+
+Next to `xgboost_model.pkl`, training writes `xgboost_model.ubj` (the booster
+in UBJSON), `xgboost_model.meta.json` (a small sidecar with feature names and
+version info) and `xgboost_model.trees.npz` (the trees flattened into arrays
+for predict.py's NumPy evaluator). predict.py loads the native file straight
+into `xgb.Booster`, which skips unpickling the sklearn wrapper, and only falls
+back to the pickle when no up-to-date native file exists.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+
+# Native formats in order of load speed
+NATIVE_SUFFIXES = ('.ubj', '.json')
+METADATA_SUFFIX = '.meta.json'
+TREES_SUFFIX = '.trees.npz'
+
+
+def native_model_path(model_path, suffix='.ubj'):
+    """Path of the native booster file belonging to `model_path`."""
+    return Path(model_path).with_suffix(suffix)
+
+
+def metadata_path(model_path):
+    """Path of the metadata sidecar belonging to `model_path`."""
+    return Path(model_path).with_suffix(METADATA_SUFFIX)
+
+
+def tree_arrays_path(model_path):
+    """Path of the flattened tree arrays belonging to `model_path`."""
+    return Path(model_path).with_suffix(TREES_SUFFIX)
+
+
+def export_native_model(model, model_path, feature_names=None, fmt='.ubj'):
+    """Write the booster of `model` in native format plus its metadata sidecar.
+
+    `model` may be an XGBRegressor or a Booster. Returns the native file path.
+    """
+    import xgboost as xgb
+
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    if feature_names is None:
+        feature_names = booster.feature_names
+    native_path = native_model_path(model_path, fmt)
+    booster.save_model(str(native_path))
+
+    config = json.loads(booster.save_config())
+    metadata = {
+        'format': fmt.lstrip('.'),
+        'model_file': native_path.name,
+        'feature_names': list(feature_names) if feature_names is not None else None,
+        'num_features': booster.num_features(),
+        'num_boosted_rounds': booster.num_boosted_rounds(),
+        'objective': config['learner']['objective']['name'],
+        'xgboost_version': xgb.__version__,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(metadata_path(model_path), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    return native_path
+
+
+def read_metadata(model_path):
+    """Return the metadata sidecar as a dict, or None if it does not exist."""
+    path = metadata_path(model_path)
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_native_model(model_path):
+    """Return the freshest usable native file for `model_path`, or None.
+
+    A native file older than the pickle is ignored, so a model re-saved only
+    as a pickle is never shadowed by a stale booster.
+    """
+    for suffix in NATIVE_SUFFIXES:
+        path = native_model_path(model_path, suffix)
+        if _is_fresh(path, model_path):
+            return path
+    return None
+
+
+def find_tree_arrays(model_path):
+    """Return the flattened tree arrays for `model_path` if up to date, else None."""
+    path = tree_arrays_path(model_path)
+    return path if _is_fresh(path, model_path) else None
+
+
+def _is_fresh(path, model_path):
+    model_path = Path(model_path)
+    pickle_mtime = model_path.stat().st_mtime if model_path.exists() else 0
+    return path.exists() and path.stat().st_mtime >= pickle_mtime
+
+
+def model_signature(model_path):
+    """Cheap fingerprint (name, mtime, size) of every artifact of a model.
+
+    Long-running predictors compare this between requests to notice that a
+    model was retrained without hashing any file contents.
+    """
+    model_path = Path(model_path)
+    candidates = [model_path, metadata_path(model_path), tree_arrays_path(model_path),
+                  model_path.with_name('feature_schema.json'), model_path.with_suffix('.bundle')]
+    candidates += [native_model_path(model_path, suffix) for suffix in NATIVE_SUFFIXES]
+    signature = []
+    for path in candidates:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        signature.append((path.name, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def artifact_version(*paths):
+    """Short content hash identifying a model version (missing paths are skipped)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        path = Path(path)
+        if not path.exists():
+            continue
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class BoosterEstimator:
+    """Minimal predict() wrapper around a native xgb.Booster."""
+
+    def __init__(self, booster, feature_names=None):
+        self.booster = booster
+        self.feature_names_in_ = feature_names
+
+    def predict(self, X):
+        # inplace_predict scores NumPy input without building a DMatrix
+        return self.booster.inplace_predict(X)
+
+
+def load_native_model(path, feature_names=None):
+    """Load a native booster file into a BoosterEstimator."""
+    import xgboost as xgb
+
+    booster = xgb.Booster()
+    booster.load_model(str(path))
+    return BoosterEstimator(booster, feature_names or booster.feature_names)
+
+
+def load_estimator(model_path, fmt='auto'):
+    """Load the model behind `model_path` using the fastest available format.
+
+    `fmt` is 'auto' (native if present, else pickle), 'native' or 'pickle'.
+    Returns (estimator, path_of_loaded_file).
+    """
+    model_path = Path(model_path)
+    if fmt in ('auto', 'native'):
+        native_path = find_native_model(model_path)
+        if native_path is not None:
+            metadata = read_metadata(model_path) or {}
+            return load_native_model(native_path, metadata.get('feature_names')), native_path
+        if fmt == 'native':
+            raise FileNotFoundError(f'No native model found for {model_path}')
+    import joblib
+    return joblib.load(str(model_path)), model_path
@@ -0,0 +1,161 @@
+"""
+Model Registry
+A small versioned store for trained models, so a model is never read while
+it is being written.
+
+Layout:
+  registry/
+    current.json                      manifest naming the published version
+    versions/<hash>/xgboost_model.pkl all artifacts of one version (pickle,
+                    xgboost_model.ubj  native booster, tree arrays, schema),
+                    ...                named by a hash of their contents
+
+publish() writes the artifacts into a private staging directory, fsyncs
+them, renames the directory to versions/<hash> and finally replaces
+current.json with os.replace(). Each step is atomic, so a reader sees either
+the old version or the new one, never a partial model. Old versions are
+pruned, keeping the last `keep`.
+
+Readers resolve the current model with current_model_path(); long-running
+predictors poll manifest_signature() (one stat() call) to notice a publish.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+MANIFEST_FILENAME = 'current.json'
+VERSIONS_DIRNAME = 'versions'
+MODEL_FILENAME = 'xgboost_model.pkl'
+
+
+def manifest_path(registry_dir):
+    return Path(registry_dir) / MANIFEST_FILENAME
+
+
+def is_registry(path):
+    """True if `path` is a registry directory with a published model."""
+    return Path(path).is_dir() and manifest_path(path).exists()
+
+
+def read_manifest(registry_dir):
+    """Return the manifest dict, or None if nothing was published yet."""
+    try:
+        with open(manifest_path(registry_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def manifest_signature(registry_dir):
+    """Cheap change marker for the manifest: (mtime_ns, size, inode) or None."""
+    try:
+        st = manifest_path(registry_dir).stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def current_model_path(registry_dir):
+    """Model file of the published version, or None if there is none."""
+    manifest = read_manifest(registry_dir)
+    if manifest is None:
+        return None
+    return Path(registry_dir) / manifest['model_file']
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _content_hash(directory):
+    from model_io import artifact_version
+
+    files = sorted(p for p in Path(directory).iterdir() if p.is_file())
+    return artifact_version(*files)
+
+
+def _write_manifest(registry_dir, manifest):
+    registry_dir = Path(registry_dir)
+    fd, tmp = tempfile.mkstemp(prefix='.manifest-', dir=registry_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, manifest_path(registry_dir))
+    _fsync_path(registry_dir)
+
+
+def publish(registry_dir, write_artifacts, keep=5, metadata=None):
+    """Publish a new model version atomically.
+
+    `write_artifacts(model_path)` must write the model and every sidecar file
+    next to `model_path` (e.g. lambda path: save_model(model, path, ...)).
+    Returns (version, model_path) of the published version.
+    """
+    registry_dir = Path(registry_dir)
+    versions_dir = registry_dir / VERSIONS_DIRNAME
+    versions_dir.mkdir(parents=True, exist_ok=True)
+
+    staging = Path(tempfile.mkdtemp(prefix='.staging-', dir=registry_dir))
+    try:
+        write_artifacts(staging / MODEL_FILENAME)
+        for path in staging.iterdir():
+            _fsync_path(path)
+        version = _content_hash(staging)
+        target = versions_dir / version
+        if target.exists():
+            # Identical artifacts were published before; reuse them
+            shutil.rmtree(staging)
+        else:
+            os.rename(staging, target)
+            _fsync_path(versions_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    previous = read_manifest(registry_dir) or {}
+    history = [version] + [v for v in previous.get('history', []) if v != version]
+    manifest = {
+        'version': version,
+        'model_file': f'{VERSIONS_DIRNAME}/{version}/{MODEL_FILENAME}',
+        'published_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'previous': previous.get('version'),
+        'history': history[:keep],
+        **(metadata or {}),
+    }
+    _write_manifest(registry_dir, manifest)
+    prune(registry_dir, keep=manifest['history'])
+    return version, registry_dir / manifest['model_file']
+
+
+def rollback(registry_dir):
+    """Point the manifest back at the previously published version."""
+    manifest = read_manifest(registry_dir)
+    if manifest is None or len(manifest.get('history', [])) < 2:
+        raise ValueError("No earlier version to roll back to")
+    version = manifest['history'][1]
+    _write_manifest(registry_dir, dict(
+        manifest,
+        version=version,
+        model_file=f'{VERSIONS_DIRNAME}/{version}/{MODEL_FILENAME}',
+        published_at=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        previous=manifest['version'],
+        history=manifest['history'][1:],
+    ))
+    return version
+
+
+def prune(registry_dir, keep):
+    """Delete version directories not listed in `keep`."""
+    versions_dir = Path(registry_dir) / VERSIONS_DIRNAME
+    for path in versions_dir.iterdir():
+        if path.is_dir() and path.name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
@@ -4,17 +4,85 @@ Reads a JSON object from stdin and writes a JSON result to stdout.
 If a trained model file (`xgboost_model.pkl`) exists in this folder, it will be used.
 Otherwise the script returns a simple heuristic prediction.
 
+When training also exported the booster in XGBoost's native format
+(`xgboost_model.ubj`, see model_io.py) it is loaded directly with
+`xgb.Booster`, which is much faster than unpickling the sklearn wrapper.
+If the flattened trees (`xgboost_model.trees.npz`) are present, predictions
+are computed by TreeEnsemble with NumPy alone and xgboost is never imported.
+
+Features are built according to `feature_schema.json` (written by training
+next to the model; see feature_schema.py). Without a schema file the column
+names stored in the model are used, e.g. [currentPrice, change]. A payload
+that lacks inputs the model was trained on (or names a crop or state it has
+never seen) is not scored on missing values: it gets the heuristic
+prediction, with "missingFeatures" listing what was absent.
+
 Input example (stdin):
 { "crop": "Tomato", "location": "Bangalore", "currentPrice": 3500, "change": 5.2 }
 
 Output example (stdout):
 { "predictedPrice": 3685, "model": "xgboost" }
+
+Batch input:
+A JSON array of payloads is answered with a JSON array of results, and a JSON
+Lines stream (one payload per line) with one result per line, in input order.
+All rows are scored with a single model call; rows with bad input get their
+own error result.
+
+Server mode (`--serve`):
+The model is loaded once and kept resident. Each line on stdin is one JSON
+request and each line on stdout is the matching JSON result. An optional "id"
+field is echoed back and every result carries "elapsedMs", the time spent on
+that request inside the predictor. `--socket PATH` serves the same protocol on
+a local Unix socket instead of stdin/stdout.
+
+Requests that are in flight at the same time are scored together as one
+batch (batching.py; `--batch-window-ms`, `--max-batch`, `--max-latency-ms`).
+Replies still come back in request order. `--no-micro-batch` answers one
+line at a time instead.
+
+Results are memoized in an LRU cache with a TTL (`--cache-size`,
+`--cache-ttl`), keyed on the feature row and the model version hash, and
+dropped when the model files change. `{ "cmd": "stats" }` reports the
+hit/miss/eviction counters.
+
+Model registry:
+When `registry/current.json` exists (or the directory in
+PREDICT_MODEL_REGISTRY), the model it points to is used instead of
+`xgboost_model.pkl`. Publishing there is atomic (see model_registry.py), and
+a running server loads a newly published version in the background and
+switches to it between requests.
+
+Per-crop models:
+When training wrote `xgboost_model.bundle` (`xgboost_model.py --per-crop`),
+each row is scored by the member model of its crop, and the rest by the
+bundle's default member. A batch makes one call per member; members are
+loaded on first use and evicted under PREDICT_BUNDLE_MAX_MB (see
+model_bundle.py).
+
+Prediction table:
+When `prediction_table.bin` (or PREDICT_TABLE_PATH) was built from the
+current model, (crop, location) pairs found in it are answered from that
+memory-mapped file and only the remaining rows are scored (see
+prediction_table.py). A one-shot run that the table fully answers never loads
+the model; a server reopens the table when it is rebuilt.
 """
 import sys
 import json
 import os
+import time
+import argparse
+import threading
 from pathlib import Path
 
+from instrumentation import span
+
+MODEL_PATH = Path(__file__).parent / 'xgboost_model.pkl'
+# Versioned model store (see model_registry.py); used instead of MODEL_PATH
+# once a model has been published to it
+REGISTRY_DIR = Path(os.environ.get('PREDICT_MODEL_REGISTRY', Path(__file__).parent / 'registry'))
+
+
 def fallback_prediction(payload):
     # Simple fallback: adjust by `change` percent if available
     cp = payload.get('currentPrice', 0)
@@ -26,40 +94,640 @@ def fallback_prediction(payload):
     return { 'predictedPrice': predicted, 'model': 'fallback' }
 
 
-def main():
+class LoadedModel:
+    """A trained estimator together with the FeatureBuilder for its inputs."""
+
+    def __init__(self, estimator, features, name='xgboost', version=None, path=None):
+        self.estimator = estimator
+        self.features = features
+        self.name = name
+        # Content hash of the loaded artifacts; part of every cache key
+        self.version = version
+        # Model file the artifacts belong to
+        self.path = path
+
+    def predict(self, X):
+        return self.estimator.predict(X)
+
+    def close(self):
+        """Release files the estimator keeps open (a per-crop bundle)."""
+        close = getattr(self.estimator, 'close', None)
+        if close is not None:
+            close()
+
+
+def model_feature_names(estimator):
+    """Column names the estimator was trained on, if it recorded them."""
+    names = getattr(estimator, 'feature_names_in_', None)
+    if names is None and hasattr(estimator, 'get_booster'):
+        names = estimator.get_booster().feature_names
+    return list(names) if names is not None else None
+
+
+def load_feature_builder(model_path, estimator):
+    """Build the FeatureBuilder for a model.
+
+    Uses the `feature_schema.json` saved next to the model when present;
+    otherwise falls back to the column names recorded in the model itself
+    (the original model was trained on [currentPrice, change]).
+    """
+    from feature_schema import (FeatureBuilder, LEGACY_COLUMNS, LEGACY_DEFAULTS,
+                                load_schema, schema_path_for)
+
+    schema_path = schema_path_for(model_path)
+    if schema_path.exists():
+        return FeatureBuilder.from_schema(load_schema(schema_path))
+    return FeatureBuilder(model_feature_names(estimator) or LEGACY_COLUMNS, defaults=LEGACY_DEFAULTS)
+
+
+class TreeEnsemble:
+    """Pure NumPy evaluator for the flattened trees in `xgboost_model.trees.npz`.
+
+    Every row walks every tree at once: a (rows, trees) array of node indices
+    is advanced one level per step for `max_depth` steps. Leaves point to
+    themselves, so rows that reach a leaf early simply stay there. Rows are
+    processed in chunks to bound the size of that index array.
+    """
+
+    def __init__(self, arrays):
+        import numpy as np
+
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.default_left = arrays['default_left']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = int(arrays['max_depth'])
+        self.base_score = float(arrays['base_score'])
+        self.feature_names_in_ = [str(name) for name in arrays['feature_names']] or None
+        # children[2 * node + went_left] gives the next node in one gather
+        self.children = np.stack([arrays['right'], arrays['left']], axis=1).ravel()
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+        with np.load(str(path)) as arrays:
+            return cls({key: arrays[key] for key in arrays.files})
+
+    def predict(self, X, chunk_nodes=1 << 21):
+        import numpy as np
+
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        out = np.empty(n_rows, dtype=np.float32)
+        if n_trees == 0:
+            out[:] = self.base_score
+            return out
+        step = max(1, chunk_nodes // n_trees)
+        for start in range(0, n_rows, step):
+            rows = X[start:start + step]
+            flat = rows.ravel()
+            row_base = (np.arange(len(rows), dtype=np.int64) * n_features)[:, None]
+            node = np.broadcast_to(self.roots, (len(rows), n_trees)).copy()
+            for _ in range(self.max_depth):
+                x = np.take(flat, row_base + np.take(self.feature, node))
+                go_left = x < np.take(self.threshold, node)
+                missing = np.isnan(x)
+                if missing.any():
+                    go_left[missing] = self.default_left[node[missing]]
+                node = np.take(self.children, 2 * node + go_left)
+            out[start:start + step] = np.take(self.value, node).sum(axis=1, dtype=np.float64) + self.base_score
+        return out
+
+
+@span
+def load_model(model_path=MODEL_PATH, fmt=None):
+    """Load the trained model, or return None when no model file exists.
+
+    Formats are tried fastest first: the flattened trees scored with NumPy
+    (no xgboost import at all), then the native booster, then the pickle.
+    `fmt` ('auto', 'trees', 'native' or 'pickle', default from the
+    PREDICT_MODEL_FORMAT environment variable) forces one of them. A per-crop
+    bundle written with the model takes precedence; `fmt` then picks the
+    format its members are loaded from ('pickle' ignores the bundle).
+    """
+    # Lazy import to avoid requiring packages if not present
+    from feature_schema import schema_path_for
+    from model_io import artifact_version, find_native_model, find_tree_arrays, load_estimator
+
+    from model_bundle import ModelBundle, find_bundle
+
+    trees_path = find_tree_arrays(model_path)
+    bundle = find_bundle(model_path)
+    if (not model_path.exists() and trees_path is None and bundle is None
+            and find_native_model(model_path) is None):
+        return None
+    fmt = fmt or os.environ.get('PREDICT_MODEL_FORMAT', 'auto')
+    if bundle is not None and fmt != 'pickle':
+        estimator, source = ModelBundle(bundle, fmt), bundle
+    elif fmt in ('auto', 'trees') and trees_path is not None:
+        estimator, source = TreeEnsemble.load(trees_path), trees_path
+    elif fmt == 'trees':
+        raise FileNotFoundError(f'No tree arrays found for {model_path}')
+    else:
+        estimator, source = load_estimator(model_path, fmt)
+    version = artifact_version(source, schema_path_for(model_path))
+    return LoadedModel(estimator, load_feature_builder(model_path, estimator), version=version,
+                       path=model_path)
+
+
+class PredictionCache:
+    """Bounded LRU cache with a time-to-live for prediction results.
+
+    Keys are (model version, feature row bytes), so a new model never serves
+    results of the old one and identical inputs hit regardless of how the
+    payload spelled them. Counts hits, misses, evictions and expirations.
+    """
+
+    def __init__(self, max_entries=4096, ttl_seconds=300.0, clock=time.monotonic):
+        from collections import OrderedDict
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (self.clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'maxEntries': self.max_entries,
+            'ttlSeconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+@span
+def predict_batch(model, payloads, cache=None, table=None):
+    """Score a list of payloads with one model call.
+
+    Returns one result per payload, in input order. Rows that cannot be turned
+    into features get their own error result without failing the whole batch,
+    and rows lacking required inputs the flagged heuristic prediction.
+    With a PredictionTable built from this model, and then a PredictionCache,
+    rows found there are answered directly and only the remaining rows are
+    sent to the model.
+    """
+    results = [None] * len(payloads)
+    if model is None:
+        for i, payload in enumerate(payloads):
+            if isinstance(payload, dict):
+                results[i] = fallback_prediction(payload)
+            else:
+                results[i] = { 'error': 'Invalid input', 'details': 'Expected a JSON object' }
+        return results
+
+    import numpy as np
+
+    # Features are built from the model's schema in one vectorized pass
+    missing = {}
+    features, errors = model.features.build(payloads, missing)
+    for i, message in errors.items():
+        if isinstance(payloads[i], dict):
+            results[i] = { 'error': 'Model prediction failed', 'details': message }
+        else:
+            results[i] = { 'error': 'Invalid input', 'details': message }
+    for i, names in missing.items():
+        results[i] = dict(fallback_prediction(payloads[i]), missingFeatures=names)
+
+    row_index = [i for i in range(len(payloads)) if i not in errors and i not in missing]
+    if table is not None and row_index:
+        answers = table.match(payloads, features, row_index)
+        for i, pred_value in answers.items():
+            results[i] = { 'predictedPrice': pred_value, 'model': model.name }
+        row_index = [i for i in row_index if i not in answers]
+
+    cache_keys = {}
+    if cache is not None:
+        pending = []
+        for i in row_index:
+            key = (model.version, features[i].tobytes())
+            cached = cache.get(key)
+            if cached is not None:
+                results[i] = dict(cached)
+            else:
+                cache_keys[i] = key
+                pending.append(i)
+        row_index = pending
+
+    if row_index:
+        if len(row_index) != len(payloads):
+            features = features[row_index]
+        try:
+            preds = np.rint(model.predict(features)).astype(np.int64).tolist()
+        except Exception as e:
+            # Fall back when predict fails
+            failure = { 'error': 'Model prediction failed', 'details': str(e) }
+            for i in row_index:
+                results[i] = dict(failure)
+        else:
+            for i, pred_value in zip(row_index, preds):
+                results[i] = { 'predictedPrice': pred_value, 'model': model.name }
+                if i in cache_keys:
+                    cache.put(cache_keys[i], results[i])
+                    results[i] = dict(results[i])
+    return results
+
+
+def read_payloads(text):
+    """Parse stdin as one JSON value, or as JSON Lines if that fails.
+
+    Returns (payloads, mode) where mode is 'single', 'array' or 'lines'.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        lines = [line for line in text.splitlines() if line.strip()]
+        if len(lines) < 2:
+            raise
+        return [json.loads(line) for line in lines], 'lines'
+    if isinstance(data, list):
+        return data, 'array'
+    return [data], 'single'
+
+
+def resolve_model_path(model_path=MODEL_PATH, registry=REGISTRY_DIR):
+    """The registry's published model if there is one, else `model_path`."""
+    from model_registry import current_model_path, is_registry
+
+    if registry is not None and is_registry(registry):
+        return current_model_path(registry)
+    return model_path
+
+
+class Predictor:
+    """The resident model of --serve mode, with its prediction cache.
+
+    Before each request (at most every `check_interval` seconds) the predictor
+    checks for a new model: one stat() of the registry manifest when a
+    registry is in use, else a stat() of the model files. A new model is
+    loaded on a background thread while requests keep being answered by the
+    current one, and swapped in (clearing the cache) by the next request
+    after it finished loading. A model that fails to load is skipped until
+    its files change again.
+
+    With `table_path`, the prediction table there is reopened whenever the
+    file is replaced, and used while it was built from the active model's
+    files.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, cache=None, check_interval=1.0,
+                 registry=REGISTRY_DIR, background=True, table_path=None):
+        self.model_path = model_path
+        self.registry = registry
+        self.cache = cache
+        self.table_path = table_path
+        self.table = None
+        self._table_check = (None, None, False)
+        self.check_interval = check_interval
+        self.background = background
+        self.model = None
+        self.signature = None
+        self.reloads = 0
+        self._next_check = 0.0
+        self._loader = None
+        self._loaded = None
+        self._failed_signature = None
+        self.reload()
+
+    def _signature(self):
+        from model_io import model_signature
+        from model_registry import is_registry, manifest_signature
+
+        if self.registry is not None and is_registry(self.registry):
+            return ('registry', manifest_signature(self.registry))
+        return ('file', model_signature(self.model_path))
+
+    def _load(self):
+        signature = self._signature()
+        return signature, load_model(resolve_model_path(self.model_path, self.registry))
+
+    def reload(self):
+        """Load the current model synchronously and make it active."""
+        previous = self.model
+        self.signature, self.model = self._load()
+        if previous is not None:
+            previous.close()
+        if self.cache is not None:
+            self.cache.clear()
+        self._check_table()
+
+    def _check_table(self):
+        if self.table_path is None:
+            return
+        from prediction_table import PredictionTable, table_signature
+
+        signature = table_signature(self.table_path)
+        if signature != (self.table.signature if self.table is not None else None):
+            self.table = PredictionTable.open(self.table_path) if signature is not None else None
+
+    def active_table(self):
+        """The prediction table if it was built from the active model, else None."""
+        table, model = self.table, self.model
+        if table is None or model is None:
+            return None
+        # Re-checked only when the table or the model object changes
+        checked_table, checked_model, ok = self._table_check
+        if checked_table is not table or checked_model is not model:
+            ok = table.is_for(model.path)
+            self._table_check = (table, model, ok)
+        return table if ok else None
+
+    def _load_in_background(self):
+        def run():
+            try:
+                self._loaded = (*self._load(), None)
+            except Exception as e:
+                self._loaded = (self._signature(), None, e)
+
+        self._loader = threading.Thread(target=run, name='model-loader', daemon=True)
+        self._loader.start()
+
+    def _swap_loaded(self):
+        signature, model, error = self._loaded
+        self._loaded = None
+        self._loader = None
+        if error is not None:
+            print(f'[predict] model reload failed, keeping current model: {error}', file=sys.stderr)
+            self._failed_signature = signature
+            return
+        previous = self.model
+        self.signature, self.model = signature, model
+        # Requests are scored one at a time, so nothing still uses the old model
+        if previous is not None:
+            previous.close()
+        if self.cache is not None:
+            self.cache.clear()
+        self.reloads += 1
+        print(f'[predict] switched to model version {model.version if model else None}', file=sys.stderr)
+
+    def check_for_update(self):
+        if self._loaded is not None:
+            self._swap_loaded()
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        self._check_table()
+        if self._loader is not None:
+            return
+        signature = self._signature()
+        if signature == self.signature or signature == self._failed_signature:
+            return
+        print('[predict] new model detected, loading', file=sys.stderr)
+        if self.background:
+            self._load_in_background()
+        else:
+            try:
+                self._loaded = (*self._load(), None)
+            except Exception as e:
+                self._loaded = (signature, None, e)
+            self._swap_loaded()
+
+    def predict_batch(self, payloads):
+        self.check_for_update()
+        return predict_batch(self.model, payloads, self.cache, self.active_table())
+
+    def stats(self):
+        model = self.model
+        return {
+            'model': model.name if model is not None else 'fallback',
+            'modelVersion': model.version if model is not None else None,
+            'reloads': self.reloads,
+            'loading': self._loader is not None,
+            'cache': self.cache.stats() if self.cache is not None else None,
+            'table': dict(self.table.stats(), active=self.active_table() is not None)
+                     if self.table is not None else None,
+            'bundle': model.estimator.stats()
+                      if model is not None and hasattr(model.estimator, 'stats') else None,
+        }
+
+
+def parse_request(line):
+    """Parse one line of the server protocol.
+
+    Returns (request_id, kind, body): kind 'single' (body is the payload),
+    'batch' (body is the list of payloads), 'stats', or 'error' (body is the
+    error result).
+    """
+    try:
+        payload = json.loads(line)
+        if not isinstance(payload, (dict, list)):
+            raise ValueError('Expected a JSON object or array')
+    except Exception as e:
+        return None, 'error', { 'error': 'Invalid input', 'details': str(e) }
+    if isinstance(payload, list):
+        return None, 'batch', payload
+    request_id = payload.pop('id', None)
+    if payload.get('cmd') == 'stats':
+        return request_id, 'stats', None
+    if isinstance(payload.get('batch'), list):
+        return request_id, 'batch', payload['batch']
+    return request_id, 'single', payload
+
+
+def format_reply(result, request_id, started):
+    """The JSON reply line for a result, with its id and elapsedMs."""
+    if request_id is not None:
+        result['id'] = request_id
+    result['elapsedMs'] = round((time.perf_counter() - started) * 1000, 3)
+    return json.dumps(result) + '\n'
+
+
+def handle_line(predictor, line):
+    """Answer one line of the server protocol. Returns the JSON reply line.
+
+    A line holding a JSON object is a single request. A JSON array, or an
+    object with a "batch" array, is scored as one batch and answered with
+    { "results": [...] } in the same order. { "cmd": "stats" } returns the
+    model version and cache counters.
+    """
+    started = time.perf_counter()
+    request_id, kind, body = parse_request(line)
+    if kind == 'error':
+        result = body
+    elif kind == 'stats':
+        result = predictor.stats()
+    elif kind == 'batch':
+        result = { 'results': predictor.predict_batch(body) }
+    else:
+        result = predictor.predict_batch([body])[0]
+    return format_reply(result, request_id, started)
+
+
+def serve(predictor, instream=None, outstream=None):
+    """Answer newline-delimited JSON requests until stdin closes."""
+    instream = instream or sys.stdin
+    outstream = outstream or sys.stdout
+    for line in instream:
+        if not line.strip():
+            continue
+        outstream.write(handle_line(predictor, line))
+        outstream.flush()
+
+
+def serve_socket(predictor, socket_path):
+    """Serve the line protocol on a local Unix socket until interrupted."""
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode('utf-8')
+                if not line.strip():
+                    continue
+                self.wfile.write(handle_line(predictor, line).encode('utf-8'))
+                self.wfile.flush()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        print(f'[predict] listening on {socket_path}', file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    os.unlink(socket_path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Crop price predictor')
+    parser.add_argument('--serve', action='store_true',
+                        help='keep the model loaded and answer one JSON request per line')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='with --serve, listen on this Unix socket instead of stdin/stdout')
+    parser.add_argument('--cache-size', type=int,
+                        default=int(os.environ.get('PREDICT_CACHE_SIZE', 4096)),
+                        help='with --serve, max cached predictions (0 disables the cache)')
+    parser.add_argument('--cache-ttl', type=float,
+                        default=float(os.environ.get('PREDICT_CACHE_TTL', 300)),
+                        help='with --serve, seconds a cached prediction stays valid')
+    parser.add_argument('--micro-batch', action=argparse.BooleanOptionalAction,
+                        default=os.environ.get('PREDICT_MICRO_BATCH', '1') != '0',
+                        help='with --serve, score concurrent requests together (see batching.py)')
+    parser.add_argument('--batch-window-ms', type=float,
+                        default=float(os.environ.get('PREDICT_BATCH_WINDOW_MS', 0)),
+                        help='with --micro-batch, max time a batch waits for more requests '
+                             '(0: batch only what queues up while the previous batch is scored)')
+    parser.add_argument('--max-batch', type=int,
+                        default=int(os.environ.get('PREDICT_MAX_BATCH', 256)),
+                        help='with --micro-batch, max rows scored in one batch')
+    parser.add_argument('--max-latency-ms', type=float,
+                        default=float(os.environ.get('PREDICT_MAX_LATENCY_MS', 1000)),
+                        help='with --micro-batch, requests queued longer than this are '
+                             'answered with an Overloaded error')
+    parser.add_argument('--prediction-table', metavar='PATH',
+                        help='precomputed prediction table (default: PREDICT_TABLE_PATH or '
+                             'prediction_table.bin; "off" disables it)')
+    return parser.parse_args(argv)
+
+
+def table_path_arg(value):
+    """Table path for a --prediction-table value, None when disabled."""
+    if value is None:
+        from prediction_table import TABLE_PATH
+        return TABLE_PATH
+    return None if value.strip().lower() in ('', 'off') else Path(value)
+
+
+def answer_from_table(payloads, model_path, table_path):
+    """{row index: result} for the payloads the table answers without a model."""
+    if table_path is None or not Path(table_path).exists():
+        return {}
+    from prediction_table import PredictionTable
+
+    table = PredictionTable.open(table_path)
+    if table is None or not table.is_for(model_path):
+        return {}
+    return { i: { 'predictedPrice': pred_value, 'model': table.model_name }
+             for i, pred_value in table.match(payloads).items() }
+
+
+@span
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.serve:
+        started = time.perf_counter()
+        cache = PredictionCache(args.cache_size, args.cache_ttl) if args.cache_size > 0 else None
+        try:
+            predictor = Predictor(cache=cache, table_path=table_path_arg(args.prediction_table))
+        except Exception as e:
+            print(json.dumps({ 'error': 'Model load failed', 'details': str(e) }))
+            sys.exit(2)
+        load_ms = (time.perf_counter() - started) * 1000
+        print(f'[predict] model {"loaded" if predictor.model is not None else "missing, using fallback"} '
+              f'in {load_ms:.1f} ms', file=sys.stderr)
+        if args.micro_batch:
+            import batching
+            batching.run(predictor, args.batch_window_ms, args.max_batch, args.max_latency_ms, args.socket)
+        elif args.socket:
+            serve_socket(predictor, args.socket)
+        else:
+            serve(predictor)
+        return
+
     try:
-        payload = json.load(sys.stdin)
+        payloads, mode = read_payloads(sys.stdin.read())
     except Exception as e:
         print(json.dumps({ 'error': 'Invalid input', 'details': str(e) }))
         sys.exit(1)
 
-    model_path = Path(__file__).parent / 'xgboost_model.pkl'
-    if model_path.exists():
+    model_path = resolve_model_path()
+    results = answer_from_table(payloads, model_path, table_path_arg(args.prediction_table))
+    pending = [i for i in range(len(payloads)) if i not in results]
+    if pending:
         try:
-            # Lazy import to avoid requiring packages if not present
-            import joblib
-            import numpy as np
-
-            model = joblib.load(str(model_path))
-
-            # Build features — for now we support a minimal feature vector.
-            # If you trained with a different schema, update this section accordingly.
-            # Default features: [currentPrice, change]
-            cp = float(payload.get('currentPrice', 0))
-            ch = float(payload.get('change', 0))
-            features = np.array([[cp, ch]])
-
-            pred = model.predict(features)
-            pred_value = int(round(float(pred[0])))
-            print(json.dumps({ 'predictedPrice': pred_value, 'model': 'xgboost' }))
-            return
+            model = load_model(model_path)
         except Exception as e:
-            # Fall back when model load or predict fails
+            # Fall back when model load fails
             print(json.dumps({ 'error': 'Model prediction failed', 'details': str(e) }))
             sys.exit(2)
+        results.update(zip(pending, predict_batch(model, [payloads[i] for i in pending])))
+    results = [results[i] for i in range(len(payloads))]
 
-    # No model — return fallback
-    print(json.dumps(fallback_prediction(payload)))
+    if mode == 'single':
+        print(json.dumps(results[0]))
+        if results[0].get('error') == 'Invalid input':
+            sys.exit(1)
+        if 'error' in results[0]:
+            sys.exit(2)
+    elif mode == 'array':
+        print(json.dumps(results))
+    else:
+        for result in results:
+            print(json.dumps(result))
 
 if __name__ == '__main__':
     main()
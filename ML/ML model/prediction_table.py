@@ -0,0 +1,400 @@
+"""
+Prediction Table
+Precomputed predictions for every known (crop, location) pair.
+
+Most requests ask about the same few pairs, whose latest market price changes
+at most daily. After a price refresh or a model publish a batch job scores
+all pairs in one vectorized pass and writes them here; predict.py answers
+those pairs straight from the file and runs the model only for the rest.
+
+File layout (one file, replaced atomically with os.replace()):
+  line 1    JSON header padded to 64 bytes: model version and signature, the
+            FeatureBuilder spec, build time, row count
+  keys      .npy blob: sorted uint64 hashes of (crop, location)
+  records   .npy blob: structured array in key order with the predicted
+            price, the feature row it was computed from and the input payload
+
+Both blobs are memory-mapped, so opening the table reads only the header and
+a lookup is one binary search over the keys. A record answers a payload only
+if the feature row built from that payload is byte-identical to the stored
+one, so a changed price, state or extra field never gets a stale answer;
+it simply falls through to the model.
+
+    python prediction_table.py build [--pairs pairs.jsonl | -] [--model PATH]
+    python prediction_table.py lookup Tomato Delhi
+    python prediction_table.py info
+
+`build` without --pairs re-scores the pairs already in the table, which is
+what a model publish needs. The backend's scripts/refresh_prediction_table.js
+feeds the latest market_prices rows in after a price refresh.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+TABLE_MAGIC = 'prediction_table'
+TABLE_VERSION = 1
+# PREDICT_TABLE_PATH=off disables the table
+_TABLE_ENV = os.environ.get('PREDICT_TABLE_PATH', str(Path(__file__).parent / 'prediction_table.bin'))
+TABLE_PATH = None if _TABLE_ENV.strip().lower() in ('', 'off') else Path(_TABLE_ENV)
+ALIGN = 64
+
+
+def _normalize(value):
+    return str(value).strip().casefold() if value is not None else ''
+
+
+def pair_key(crop, location):
+    """64-bit key of a (crop, location) pair; case and surrounding space are ignored."""
+    text = f'{_normalize(crop)}\x1f{_normalize(location)}'.encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(text, digest_size=8).digest(), 'little')
+
+
+def payload_key(payload):
+    """pair_key of a request payload, or None if it names no crop or location."""
+    if not isinstance(payload, dict):
+        return None
+    crop = payload.get('crop') or payload.get('Crop')
+    location = payload.get('location')
+    if crop is None or location is None:
+        return None
+    return pair_key(crop, location)
+
+
+def table_signature(path):
+    """Cheap change marker for the table file: (mtime_ns, size, inode) or None."""
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _pad(f):
+    f.write(b'\0' * (-f.tell() % ALIGN))
+
+
+def _skip_padding(f):
+    f.seek(f.tell() + (-f.tell() % ALIGN))
+
+
+def write_table(path, keys, records, header):
+    """Write keys, records and header to `path` atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = dict(header, magic=TABLE_MAGIC, table_version=TABLE_VERSION, rows=int(len(keys)))
+    line = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    line += b' ' * (-(len(line) + 1) % ALIGN) + b'\n'
+
+    fd, tmp = tempfile.mkstemp(prefix='.prediction_table-', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # mkstemp creates the file private; the table is read by other processes
+            os.fchmod(f.fileno(), 0o644)
+            f.write(line)
+            np.lib.format.write_array(f, np.ascontiguousarray(keys, dtype='<u8'), allow_pickle=False)
+            _pad(f)
+            np.lib.format.write_array(f, np.ascontiguousarray(records), allow_pickle=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return path
+
+
+def _map_array(f, path):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    offset = f.tell()
+    if shape[0] == 0:
+        array = np.empty(shape, dtype=dtype)
+    else:
+        # Plain ndarray view of the mapping: indexing np.memmap itself is slower
+        array = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                          order='F' if fortran_order else 'C').view(np.ndarray)
+    f.seek(offset + array.nbytes)
+    return array
+
+
+class PredictionTable:
+    """Read-only, memory-mapped view of a prediction table file."""
+
+    def __init__(self, path):
+        from feature_schema import FeatureBuilder
+
+        self.path = Path(path)
+        self.signature = table_signature(self.path)
+        with open(self.path, 'rb') as f:
+            self.header = json.loads(f.readline())
+            if self.header.get('magic') != TABLE_MAGIC:
+                raise ValueError(f'{self.path} is not a prediction table')
+            self.keys = _map_array(f, self.path)
+            _skip_padding(f)
+            self.records = _map_array(f, self.path)
+        self._predicted = self.records['predicted']
+        self._features = self.records['features']
+        self.model_version = self.header['model_version']
+        self.model_name = self.header.get('model_name', 'xgboost')
+        self.features = FeatureBuilder(**self.header['features'])
+        self.hits = self.misses = 0
+
+    @classmethod
+    def open(cls, path=TABLE_PATH):
+        """The table at `path`, or None if there is no (readable) table."""
+        if path is None or not Path(path).exists():
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f'[predict] ignoring prediction table {path}: {e}', file=sys.stderr)
+            return None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def is_for(self, model_path):
+        """True if the table was built from the model files now at `model_path`.
+
+        Compares the stat() signature recorded at build time, so no model file
+        is read.
+        """
+        from model_io import model_signature
+
+        if model_path is None or str(Path(model_path).resolve()) != self.header.get('model_file'):
+            return False
+        return [list(entry) for entry in model_signature(model_path)] == self.header.get('model_signature')
+
+    def find(self, crop, location):
+        """Record index of a pair, or -1."""
+        return self._find(pair_key(crop, location))
+
+    def _find(self, key):
+        key = np.uint64(key)
+        i = int(self.keys.searchsorted(key))
+        return i if i < len(self.keys) and self.keys[i] == key else -1
+
+    def match(self, payloads, features=None, rows=None):
+        """Return {row index: predicted price} for the rows the table can answer.
+
+        `features` is the feature matrix of `payloads` built with this table's
+        FeatureBuilder (built here when omitted); `rows` limits the lookup to
+        those row indices. Counts a hit or a miss for every looked-up row.
+        """
+        if features is None:
+            features, errors = self.features.build(payloads)
+            rows = [i for i in range(len(payloads)) if i not in errors] if rows is None else rows
+        elif rows is None:
+            rows = range(len(payloads))
+        if len(rows) == 1:
+            # Single requests: one binary search, no temporary arrays
+            i = rows[0]
+            key = payload_key(payloads[i])
+            index = self._find(key) if key is not None else -1
+            answers = {}
+            if index >= 0 and self._features[index].tobytes() == features[i].tobytes():
+                answers[i] = int(self._predicted[index])
+        else:
+            answers = self._match_many(payloads, features, rows)
+        self.hits += len(answers)
+        self.misses += len(rows) - len(answers)
+        return answers
+
+    def _match_many(self, payloads, features, rows):
+        if not len(rows) or not len(self.keys):
+            return {}
+        keys = [payload_key(payloads[i]) for i in rows]
+        rows = np.array([i for i, key in zip(rows, keys) if key is not None], dtype=np.int64)
+        keys = np.array([key for key in keys if key is not None], dtype=np.uint64)
+        index = np.minimum(self.keys.searchsorted(keys), len(self.keys) - 1)
+        found = self.keys[index] == keys
+        # Bitwise row comparison, so NaN (missing) matches NaN
+        same = (self._features[index].view(np.uint32) == features[rows].view(np.uint32)).all(axis=1)
+        hit = found & same
+        return dict(zip(rows[hit].tolist(), self._predicted[index[hit]].tolist()))
+
+    def payloads(self):
+        """The input payloads the table was built from, in key order."""
+        return [json.loads(bytes(raw)) for raw in self.records['payload']]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'rows': len(self),
+            'modelVersion': self.model_version,
+            'builtAt': self.header.get('built_at'),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def table_payload(payload):
+    """The part of a request payload worth keeping for a rebuild."""
+    return {k: v for k, v in payload.items() if k != 'id' and not k.startswith('_')}
+
+
+def build_table(model, payloads, path=TABLE_PATH, model_path=None):
+    """Score every pair in `payloads` with one model call and write the table.
+
+    Later payloads for the same pair replace earlier ones; payloads without a
+    crop and location or with unusable inputs are skipped. Returns
+    (rows written, distinct pairs).
+    """
+    from model_io import model_signature
+
+    by_key = {}
+    for payload in payloads:
+        key = payload_key(payload)
+        if key is not None:
+            by_key[key] = table_payload(payload)
+    keys = np.array(sorted(by_key), dtype='<u8')
+    ordered = [by_key[int(key)] for key in keys]
+
+    X, errors = model.features.build(ordered)
+    ok = np.array([i not in errors for i in range(len(ordered))], dtype=bool)
+    keys, X = keys[ok], X[ok]
+    encoded = [json.dumps(p, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+               for p, keep in zip(ordered, ok) if keep]
+
+    dtype = np.dtype([
+        ('predicted', '<i8'),
+        ('features', '<f4', (X.shape[1],)),
+        ('payload', f'S{max((len(raw) for raw in encoded), default=1)}'),
+    ])
+    records = np.zeros(len(keys), dtype=dtype)
+    if len(keys):
+        records['predicted'] = np.rint(model.predict(X)).astype(np.int64)
+        records['features'] = X
+        records['payload'] = encoded
+
+    header = {
+        'model_name': model.name,
+        'model_version': model.version,
+        'model_file': str(Path(model_path).resolve()) if model_path is not None else None,
+        'model_signature': [list(entry) for entry in model_signature(model_path)] if model_path else None,
+        'features': model.features.spec,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    write_table(path, keys, records, header)
+    return len(keys), len(ordered)
+
+
+def refresh_table(path=TABLE_PATH, model_path=None):
+    """Re-score the pairs of an existing table with the current model.
+
+    Returns the number of rows written, or None when there is no table or no
+    model.
+    """
+    from predict import load_model, resolve_model_path
+
+    table = PredictionTable.open(path)
+    if table is None:
+        return None
+    payloads = table.payloads()
+    model_path = model_path or resolve_model_path()
+    model = load_model(model_path)
+    if model is None:
+        return None
+    written, _ = build_table(model, payloads, path, model_path)
+    return written
+
+
+def refresh_after_publish(model_file, registry=None, path=TABLE_PATH):
+    """Rebuild the table for a model just saved to `model_file`.
+
+    Only a table serving that model is rebuilt: one built from the same file,
+    or with `registry`, from any version of that registry. Returns the number
+    of rows written, or None if there was nothing to rebuild.
+    """
+    table = PredictionTable.open(path)
+    built_from = table.header.get('model_file') if table is not None else None
+    if built_from is None:
+        return None
+    if registry is not None:
+        if not Path(built_from).is_relative_to(Path(registry).resolve()):
+            return None
+    elif built_from != str(Path(model_file).resolve()):
+        return None
+    return refresh_table(path, model_file)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Precomputed crop price prediction table')
+    parser.add_argument('--table', type=Path, default=TABLE_PATH,
+                        help='table file (default: PREDICT_TABLE_PATH or prediction_table.bin)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='score all pairs and write the table')
+    build.add_argument('--pairs', help='JSON array or JSON Lines of payloads with crop and location '
+                                       '("-" for stdin; default: the pairs already in the table)')
+    build.add_argument('--model', type=Path, default=None,
+                       help='model file (default: the one predict.py would use)')
+    lookup = sub.add_parser('lookup', help='print the stored prediction for one pair')
+    lookup.add_argument('crop')
+    lookup.add_argument('location')
+    sub.add_parser('info', help='print the table header')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.table is None:
+        print("Prediction table disabled (PREDICT_TABLE_PATH=off); pass --table", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == 'build':
+        from predict import load_model, read_payloads, resolve_model_path
+
+        started = time.perf_counter()
+        if args.pairs:
+            text = sys.stdin.read() if args.pairs == '-' else Path(args.pairs).read_text(encoding='utf-8')
+            payloads = read_payloads(text)[0] if text.strip() else []
+        else:
+            table = PredictionTable.open(args.table)
+            if table is None:
+                print(f"No table at {args.table}; pass --pairs", file=sys.stderr)
+                sys.exit(1)
+            payloads = table.payloads()
+        model_path = args.model or resolve_model_path()
+        model = load_model(model_path)
+        if model is None:
+            print(f"No model at {model_path}", file=sys.stderr)
+            sys.exit(2)
+        written, pairs = build_table(model, payloads, args.table, model_path)
+        print(json.dumps({'table': str(args.table), 'payloads': len(payloads), 'pairs': pairs,
+                          'rows': written, 'skipped': pairs - written,
+                          'modelVersion': model.version,
+                          'seconds': round(time.perf_counter() - started, 3)}))
+        return
+
+    table = PredictionTable.open(args.table)
+    if table is None:
+        print(f"No table at {args.table}", file=sys.stderr)
+        sys.exit(1)
+    if args.command == 'info':
+        print(json.dumps(dict(table.header, bytes=table.path.stat().st_size), indent=2))
+    else:
+        index = table.find(args.crop, args.location)
+        if index < 0:
+            print(json.dumps({'error': 'Pair not in table'}))
+            sys.exit(1)
+        print(json.dumps({'predictedPrice': int(table.records['predicted'][index]),
+                          'payload': json.loads(bytes(table.records['payload'][index]))}))
+
+
+if __name__ == '__main__':
+    main()
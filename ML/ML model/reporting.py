@@ -0,0 +1,188 @@
+"""
+Reporting
+Figures for the preprocessing and training scripts, kept off the pipeline's
+critical path.
+
+matplotlib and seaborn are imported only when the first figure is rendered,
+always with the non-interactive Agg backend, so importing the pipeline
+modules (or running them with plots disabled) never loads a plotting stack.
+
+A ReportWriter decides whether and where figures are written:
+
+    with ReportWriter(output_dir, enabled=True, background=True) as reports:
+        reports.render('correlation_matrix', corr_matrix)
+
+With background=True figures are rendered in a separate worker process and
+render() returns immediately; leaving the `with` block (or close()) waits for
+the remaining figures and reports any that failed.
+"""
+
+from pathlib import Path
+
+DPI = 300
+
+
+def _pyplot():
+    """Import pyplot and seaborn on first use, forcing the Agg backend."""
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set_style('whitegrid')
+    plt.rcParams['figure.figsize'] = (12, 8)
+    return plt, sns
+
+
+def _save(plt, path, dpi):
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close('all')
+
+
+def plot_correlation_matrix(path, corr_matrix, dpi=DPI):
+    """Heatmap of a correlation DataFrame."""
+    plt, sns = _pyplot()
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0,
+                fmt='.2f', square=True, linewidths=1)
+    plt.title('Feature Correlation Matrix', fontsize=16, fontweight='bold')
+    _save(plt, path, dpi)
+
+
+def plot_feature_distributions(path, df, dpi=DPI):
+    """Histogram grid, one panel per column of `df`."""
+    plt, _ = _pyplot()
+    columns = list(df.columns)
+    n_cols = 3
+    n_rows = max((len(columns) + n_cols - 1) // n_cols, 1)
+
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(15, n_rows * 4))
+    axes = axes.flatten()
+    for idx, col in enumerate(columns):
+        axes[idx].hist(df[col], bins=20, color='skyblue', edgecolor='black', alpha=0.7)
+        axes[idx].set_title(f'Distribution of {col}', fontweight='bold')
+        axes[idx].set_xlabel(col)
+        axes[idx].set_ylabel('Frequency')
+        axes[idx].grid(True, alpha=0.3)
+
+    # Hide unused subplots
+    for idx in range(len(columns), len(axes)):
+        axes[idx].axis('off')
+    _save(plt, path, dpi)
+
+
+def plot_feature_importance(path, importance_df, dpi=DPI):
+    """Horizontal bar chart of a Feature/Importance DataFrame."""
+    plt, sns = _pyplot()
+    plt.figure(figsize=(10, 6))
+    sns.barplot(data=importance_df, x='Importance', y='Feature', palette='viridis')
+    plt.title('XGBoost Feature Importance', fontsize=16, fontweight='bold')
+    plt.xlabel('Importance Score', fontsize=12)
+    plt.ylabel('Features', fontsize=12)
+    _save(plt, path, dpi)
+
+
+def plot_prediction_analysis(path, y_true, y_pred, dpi=DPI):
+    """Actual-vs-predicted scatter and residual plot side by side."""
+    plt, _ = _pyplot()
+    fig, axes = plt.subplots(1, 2, figsize=(16, 6))
+
+    # Actual vs Predicted scatter plot with the perfect prediction line
+    axes[0].scatter(y_true, y_pred, alpha=0.6, s=100, edgecolors='black', linewidth=1)
+    min_val = min(y_true.min(), y_pred.min())
+    max_val = max(y_true.max(), y_pred.max())
+    axes[0].plot([min_val, max_val], [min_val, max_val], 'r--', linewidth=2, label='Perfect Prediction')
+    axes[0].set_xlabel('Actual Price', fontsize=12, fontweight='bold')
+    axes[0].set_ylabel('Predicted Price', fontsize=12, fontweight='bold')
+    axes[0].set_title('Actual vs Predicted Prices', fontsize=14, fontweight='bold')
+    axes[0].legend()
+    axes[0].grid(True, alpha=0.3)
+
+    # Residuals plot
+    residuals = y_true - y_pred
+    axes[1].scatter(y_pred, residuals, alpha=0.6, s=100, edgecolors='black', linewidth=1, color='coral')
+    axes[1].axhline(y=0, color='r', linestyle='--', linewidth=2)
+    axes[1].set_xlabel('Predicted Price', fontsize=12, fontweight='bold')
+    axes[1].set_ylabel('Residuals', fontsize=12, fontweight='bold')
+    axes[1].set_title('Residual Plot', fontsize=14, fontweight='bold')
+    axes[1].grid(True, alpha=0.3)
+    _save(plt, path, dpi)
+
+
+# Figure name -> renderer; the name is also the PNG file name
+FIGURES = {
+    'correlation_matrix': plot_correlation_matrix,
+    'feature_distributions': plot_feature_distributions,
+    'feature_importance': plot_feature_importance,
+    'prediction_analysis': plot_prediction_analysis,
+}
+
+
+def render_figure(name, path, *args, dpi=DPI):
+    """Render one figure by name (runs in the worker for background writers)."""
+    FIGURES[name](path, *args, dpi=dpi)
+    return str(path)
+
+
+class ReportWriter:
+    """Renders named figures as PNGs into `output_dir`, or does nothing.
+
+    A disabled writer (the scripts' default) skips figures entirely.
+    """
+
+    def __init__(self, output_dir='.', enabled=True, background=False, dpi=DPI):
+        self.output_dir = Path(output_dir)
+        self.enabled = enabled
+        self.background = background
+        self.dpi = dpi
+        self.written = []
+        self._executor = None
+        self._pending = []
+
+    def path_for(self, name):
+        return self.output_dir / f'{name}.png'
+
+    def render(self, name, *args):
+        """Render figure `name` from `args` (see FIGURES for the arguments)."""
+        if not self.enabled:
+            return None
+        if name not in FIGURES:
+            raise ValueError(f"Unknown figure {name!r}")
+        path = self.path_for(name)
+        if not self.background:
+            render_figure(name, path, *args, dpi=self.dpi)
+            self.written.append(path)
+            print(f"✓ {name.replace('_', ' ').capitalize()} saved as '{path.name}'")
+            return path
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn: the worker must not inherit the trainer's thread pools
+            self._executor = ProcessPoolExecutor(max_workers=1,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        self._pending.append((name, path, self._executor.submit(render_figure, name, path, *args,
+                                                                 dpi=self.dpi)))
+        print(f"  (rendering '{path.name}' in the background)")
+        return path
+
+    def close(self):
+        """Wait for background figures; returns the paths that were written."""
+        for name, path, future in self._pending:
+            try:
+                future.result()
+                self.written.append(path)
+                print(f"✓ {name.replace('_', ' ').capitalize()} saved as '{path.name}'")
+            except Exception as e:
+                print(f"⚠ Could not render {path.name}: {e}")
+        self._pending = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        return list(self.written)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,221 @@
+"""
+Statistics Engine
+Column statistics, IQR outlier bounds and correlations for all numeric
+columns at once, computed with NumPy over one contiguous array.
+
+compute_statistics() does everything in a single call for data that fits in
+memory. For streaming input, feed chunks to a StatsAccumulator (partial
+results from different chunks or workers can be merged), build the report,
+then count outliers in a second pass with count_outliers().
+
+A report is a plain dict:
+  {'n_rows': int,
+   'columns': [names],
+   'stats': {column: {'count', 'missing', 'mean', 'std', 'min', 'q1',
+                      'median', 'q3', 'max', 'iqr', 'lower_bound',
+                      'upper_bound', 'outliers', 'outlier_pct'}},
+   'correlation': (k, k) ndarray of pairwise-complete Pearson correlations,
+   'exact_quantiles': bool}
+"""
+
+import numpy as np
+
+QUANTILES = (0.25, 0.5, 0.75)
+IQR_FACTOR = 1.5
+
+
+class StatsAccumulator:
+    """Mergeable partial statistics over chunks of a (rows, columns) array.
+
+    Moments and co-moments are kept per column pair over rows where both
+    values are present (matching pandas' pairwise corr()), shifted by the
+    first chunk's means for numerical stability. Quantiles come from a
+    uniform row sample of at most `sample_size` rows, so they are exact
+    whenever the total row count fits in the sample.
+    """
+
+    def __init__(self, columns, sample_size=200_000, seed=42):
+        self.columns = list(columns)
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        k = len(self.columns)
+        self.n_rows = 0
+        self.shift = None
+        self.pair_count = np.zeros((k, k))
+        self.pair_sum = np.zeros((k, k))     # [i, j]: sum of x_i where x_j present
+        self.pair_sumsq = np.zeros((k, k))   # [i, j]: sum of x_i**2 where x_j present
+        self.cross = np.zeros((k, k))        # [i, j]: sum of x_i * x_j
+        self.minimum = np.full(k, np.inf)
+        self.maximum = np.full(k, -np.inf)
+        self.sample = np.empty((0, k))
+        self.sample_seen = 0
+
+    def update(self, X):
+        """Add a chunk of rows (2-D array, columns in self.columns order)."""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.columns):
+            raise ValueError(f"Expected an array with {len(self.columns)} columns, got shape {X.shape}")
+        if len(X) == 0:
+            return self
+        if self.shift is None:
+            with np.errstate(invalid='ignore'):
+                self.shift = np.nan_to_num(np.nanmean(X, axis=0))
+
+        present = ~np.isnan(X)
+        if present.all():
+            # No missing values: pairwise sums reduce to plain column sums
+            Z = X - self.shift
+            self.pair_count += len(X)
+            self.pair_sum += Z.sum(axis=0)[:, None]
+            self.pair_sumsq += np.einsum('ij,ij->j', Z, Z)[:, None]
+            self.cross += Z.T @ Z
+            self.minimum = np.minimum(self.minimum, X.min(axis=0))
+            self.maximum = np.maximum(self.maximum, X.max(axis=0))
+        else:
+            mask = present.astype(np.float64)
+            Z = np.where(present, X - self.shift, 0.0)
+            self.pair_count += mask.T @ mask
+            self.pair_sum += Z.T @ mask
+            self.pair_sumsq += (Z * Z).T @ mask
+            self.cross += Z.T @ Z
+            self.minimum = np.minimum(self.minimum, np.where(present, X, np.inf).min(axis=0))
+            self.maximum = np.maximum(self.maximum, np.where(present, X, -np.inf).max(axis=0))
+        self.n_rows += len(X)
+        self._add_sample(X)
+        return self
+
+    def _add_sample(self, X):
+        # Keep a uniform sample of all rows seen so far
+        total = self.sample_seen + len(X)
+        if total <= self.sample_size:
+            self.sample = X if self.sample_seen == 0 else np.concatenate([self.sample, X])
+        else:
+            keep_old = self.rng.binomial(self.sample_size, self.sample_seen / total)
+            old = self.sample[self.rng.choice(len(self.sample), min(keep_old, len(self.sample)), replace=False)]
+            new = X[self.rng.choice(len(X), min(self.sample_size - len(old), len(X)), replace=False)]
+            self.sample = np.concatenate([old, new])
+        self.sample_seen = total
+
+    def merge(self, other):
+        """Fold another accumulator over the same columns into this one."""
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge statistics over different columns")
+        if other.n_rows == 0:
+            return self
+        if self.shift is None:
+            self.shift = other.shift
+        # Re-express other's shifted sums around this accumulator's shift
+        d = other.shift - self.shift
+        n, s, ss = other.pair_count, other.pair_sum, other.pair_sumsq
+        sum_i = s + d[:, None] * n
+        self.pair_sumsq += ss + 2 * d[:, None] * s + (d[:, None] ** 2) * n
+        self.cross += other.cross + d[:, None] * s.T + d[None, :] * s + np.outer(d, d) * n
+        self.pair_sum += sum_i
+        self.pair_count += n
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+        self.n_rows += other.n_rows
+
+        total = self.sample_seen + other.sample_seen
+        if len(self.sample) + len(other.sample) <= self.sample_size:
+            self.sample = np.concatenate([self.sample, other.sample])
+        else:
+            take_self = self.rng.binomial(self.sample_size, self.sample_seen / total)
+            take_self = min(take_self, len(self.sample))
+            take_other = min(self.sample_size - take_self, len(other.sample))
+            self.sample = np.concatenate([
+                self.sample[self.rng.choice(len(self.sample), take_self, replace=False)],
+                other.sample[self.rng.choice(len(other.sample), take_other, replace=False)],
+            ])
+        self.sample_seen = total
+        return self
+
+    def report(self):
+        """Build the statistics report; outlier counts are filled in later."""
+        k = len(self.columns)
+        n = self.pair_count
+        count = np.diag(n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_shifted = np.diag(self.pair_sum) / count
+            var = (np.diag(self.pair_sumsq) - count * mean_shifted ** 2) / (count - 1)
+            std = np.sqrt(np.maximum(var, 0))
+
+            # Pairwise-complete Pearson correlation
+            cov = n * self.cross - self.pair_sum * self.pair_sum.T
+            var_i = n * self.pair_sumsq - self.pair_sum ** 2
+            correlation = cov / np.sqrt(var_i * var_i.T)
+        correlation[n < 2] = np.nan
+
+        if len(self.sample) and not np.isnan(self.sample).any():
+            q = np.quantile(self.sample, QUANTILES, axis=0)
+        elif len(self.sample):
+            q = np.nanquantile(self.sample, QUANTILES, axis=0)
+        else:
+            q = np.full((len(QUANTILES), k), np.nan)
+        iqr = q[2] - q[0]
+        lower = q[0] - IQR_FACTOR * iqr
+        upper = q[2] + IQR_FACTOR * iqr
+
+        stats = {}
+        for j, col in enumerate(self.columns):
+            stats[col] = {
+                'count': int(count[j]),
+                'missing': int(self.n_rows - count[j]),
+                'mean': float(mean_shifted[j] + self.shift[j]) if count[j] else np.nan,
+                'std': float(std[j]),
+                'min': float(self.minimum[j]) if count[j] else np.nan,
+                'q1': float(q[0, j]),
+                'median': float(q[1, j]),
+                'q3': float(q[2, j]),
+                'max': float(self.maximum[j]) if count[j] else np.nan,
+                'iqr': float(iqr[j]),
+                'lower_bound': float(lower[j]),
+                'upper_bound': float(upper[j]),
+                'outliers': None,
+                'outlier_pct': None,
+            }
+        return {
+            'n_rows': self.n_rows,
+            'columns': list(self.columns),
+            'stats': stats,
+            'correlation': correlation,
+            'exact_quantiles': self.sample_seen <= self.sample_size,
+        }
+
+
+def outlier_bounds(report):
+    """(lower, upper) bound arrays in report column order."""
+    lower = np.array([report['stats'][col]['lower_bound'] for col in report['columns']])
+    upper = np.array([report['stats'][col]['upper_bound'] for col in report['columns']])
+    return lower, upper
+
+
+def count_outliers(X, report):
+    """Per-column count of values outside the report's IQR bounds in chunk X."""
+    lower, upper = outlier_bounds(report)
+    X = np.asarray(X, dtype=np.float64)
+    return ((X < lower) | (X > upper)).sum(axis=0)
+
+
+def set_outlier_counts(report, counts):
+    """Store outlier counts (summed over all chunks) in the report."""
+    for col, n_out in zip(report['columns'], counts):
+        stats = report['stats'][col]
+        stats['outliers'] = int(n_out)
+        stats['outlier_pct'] = (int(n_out) / report['n_rows']) * 100 if report['n_rows'] else 0.0
+    return report
+
+
+def compute_statistics(X, columns):
+    """Full report for an in-memory array: exact quantiles and outlier counts."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    accumulator = StatsAccumulator(columns, sample_size=max(len(X), 1))
+    report = accumulator.update(X).report()
+    return set_outlier_counts(report, count_outliers(X, report))
+
+
+def frame_statistics(df, columns=None):
+    """compute_statistics over the numeric columns of a DataFrame."""
+    if columns is None:
+        columns = df.select_dtypes(include=[np.number]).columns.tolist()
+    return compute_statistics(df[columns].to_numpy(dtype=np.float64), columns)
@@ -0,0 +1,45 @@
+"""MicroBatcher: every row of a failed or shed batch gets its own error result."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from batching import MicroBatcher  # noqa: E402
+
+
+def _run(batcher, rows):
+    async def main():
+        batcher.start()
+        try:
+            return await batcher.submit(rows)
+        finally:
+            await batcher.close()
+    return asyncio.run(main())
+
+
+def _assert_distinct(results, error):
+    assert [r['error'] for r in results] == [error] * len(results)
+    assert len({id(r) for r in results}) == len(results)
+
+
+def test_failed_batch_answers_each_row_with_its_own_error():
+    def score(rows):
+        raise ValueError('boom')
+
+    results = _run(MicroBatcher(score, window_ms=0, threaded=False), [{}, {}, {}])
+    _assert_distinct(results, 'Model prediction failed')
+    results[0]['details'] = 'changed'
+    assert results[1]['details'] == 'boom'
+
+
+def test_shed_batch_answers_each_row_with_its_own_error():
+    def score(rows):
+        raise AssertionError('a shed batch must not be scored')
+
+    # A negative latency budget sheds every request
+    batcher = MicroBatcher(score, window_ms=0, max_latency_ms=-1, threaded=False)
+    results = _run(batcher, [{}, {}])
+    _assert_distinct(results, 'Overloaded')
+    assert batcher.shed == 1
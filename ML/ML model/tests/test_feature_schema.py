@@ -0,0 +1,64 @@
+"""The backend's /api/ml/predict payload run through the FeatureBuilder of a trained schema."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ML_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ML_DIR))
+
+from data_preprocessing import feature_engineering  # noqa: E402
+from feature_schema import LEGACY_COLUMNS, LEGACY_DEFAULTS, FeatureBuilder, build_schema  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def trained():
+    """Schema and engineered rows as data_preprocessing produces them from dataset.csv."""
+    raw = pd.read_csv(ML_DIR / 'dataset.csv', nrows=200)
+    engineered, le_state, le_crop = feature_engineering(raw)
+    columns = [col for col in engineered.columns if col != 'Price']
+    schema = build_schema(columns, {'State': le_state, 'Crop': le_crop})
+    return raw, engineered[columns], FeatureBuilder.from_schema(schema)
+
+
+def backend_payload(**fields):
+    """The message ml.routes.js writes after its market_prices lookup."""
+    payload = {'crop': 'Tomato', 'location': 'Bangalore', 'state': 'Karnataka',
+               'currentPrice': 3500, 'change': 2.5}
+    payload.update(fields)
+    return payload
+
+
+def test_market_price_payload_is_reported_missing(trained):
+    _, _, builder = trained
+    missing = {}
+    _, errors = builder.build([backend_payload()], missing)
+    assert errors == {}
+    assert set(missing[0]) == {'Crop', 'CostCultivation', 'CostCultivation2', 'Production', 'Yield',
+                               'Temperature', 'RainFall Annual'}
+
+
+def test_payload_with_agronomic_fields_matches_training_features(trained):
+    raw, engineered, builder = trained
+    row = raw.iloc[0]
+    # Optional fields the backend forwards (PREDICT_FIELDS in ml.routes.js)
+    payload = backend_payload(crop=row['Crop'].title(), state=row['State'], **{
+        'costCultivation': row['CostCultivation'], 'costCultivation2': row['CostCultivation2'],
+        'production': row['Production'], 'yield': row['Yield'], 'temperature': row['Temperature'],
+        'rainfallAnnual': row['RainFall Annual'],
+    })
+    missing = {}
+    X, errors = builder.build([payload], missing)
+    assert errors == {} and missing == {}
+    np.testing.assert_allclose(X[0], engineered.iloc[0].to_numpy(dtype=np.float32), rtol=1e-6)
+
+
+def test_legacy_model_scores_the_market_price_payload():
+    builder = FeatureBuilder(LEGACY_COLUMNS, defaults=LEGACY_DEFAULTS)
+    missing = {}
+    X, errors = builder.build([backend_payload(), {'crop': 'Tomato', 'location': 'Bangalore'}], missing)
+    assert errors == {} and missing == {}
+    np.testing.assert_array_equal(X, [[3500, 2.5], [0, 0]])
@@ -0,0 +1,42 @@
+"""Per-crop model family: crops too small or broken to train fall back to the global model."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import xgboost_model  # noqa: E402
+
+
+def _split(codes, seed):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({'Crop_Encoded': codes, 'x': rng.normal(size=len(codes))})
+    y = pd.Series(X['x'] * 100 + 1000 * X['Crop_Encoded'] + rng.normal(size=len(codes)))
+    return X, y
+
+
+def test_min_crop_rows_below_fold_count_is_rejected():
+    with pytest.raises(SystemExit):
+        xgboost_model.parse_args(['--per-crop', '--min-crop-rows', str(xgboost_model.CV_FOLDS - 1)])
+
+
+def test_tiny_and_failing_crops_keep_the_global_model():
+    # Crop 0 is large, crop 1 has fewer rows than CV folds, crop 2 cannot be trained (NaN labels)
+    X_train, y_train = _split(np.repeat([0, 1, 2], [300, 3, 40]), seed=0)
+    y_train[X_train['Crop_Encoded'] == 2] = np.nan
+    X_test, y_test = _split(np.repeat([0, 1, 2], [60, 2, 10]), seed=1)
+    known = X_train['Crop_Encoded'] != 2
+    global_model = xgb.XGBRegressor(n_estimators=20).fit(X_train[known], y_train[known])
+
+    members, routes, y_family = xgboost_model.train_crop_models(
+        global_model, X_train, y_train, X_test, y_test,
+        vocabulary={'WHEAT': 0, 'GRAM': 1, 'MOONG': 2}, min_rows=1, search='random', n_iter=1, n_jobs=1)
+
+    assert set(routes) <= {0}
+    assert 1 not in routes and 2 not in routes
+    assert len(y_family) == len(X_test)
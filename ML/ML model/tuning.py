@@ -0,0 +1,207 @@
+"""
+Hyperparameter Search
+Search engines for the XGBoost price model that reuse one set of prebuilt
+cross-validation folds.
+
+The folds are turned into XGBoost matrices once (a QuantileDMatrix for each
+training part and a DMatrix referencing its bins for each validation part),
+so no configuration pays for re-binning the data. Every configuration is
+trained with xgb.train and early stopping on the validation folds, which
+turns 'n_estimators' into an upper bound instead of a grid dimension.
+
+Engines:
+  random    n_iter configurations sampled from the grid
+  halving   successive halving: every configuration gets a small round
+            budget, the best 1/eta continue boosting (from where they
+            stopped) with eta times the budget, until max_rounds
+The exhaustive GridSearchCV path stays in xgboost_model.hyperparameter_tuning
+as the 'grid' engine for comparison.
+
+Scores use the same metric as the grid search: RMSE = sqrt(mean fold MSE).
+All sampling is seeded, so a search is reproducible for a given seed.
+"""
+
+import itertools
+import math
+
+import numpy as np
+
+# The grid hyperparameter_tuning has always searched
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'learning_rate': [0.01, 0.05, 0.1],
+    'max_depth': [3, 5, 7],
+    'subsample': [0.8, 1.0],
+    'colsample_bytree': [0.8, 1.0],
+    'min_child_weight': [1, 3, 5]
+}
+SEARCH_ENGINES = ('grid', 'random', 'halving')
+EARLY_STOPPING_ROUNDS = 20
+
+
+def build_folds(X, y, n_splits=5, nthread=-1):
+    """Build the K validation folds once as XGBoost matrices.
+
+    Uses the same unshuffled KFold splits as GridSearchCV(cv=n_splits), so
+    scores are comparable with the grid search.
+    Returns a list of (dtrain, dvalid) pairs.
+    """
+    import xgboost as xgb
+    from sklearn.model_selection import KFold
+
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float64)
+    folds = []
+    for train_idx, valid_idx in KFold(n_splits=n_splits).split(X):
+        dtrain = xgb.QuantileDMatrix(X[train_idx], y[train_idx], nthread=nthread)
+        dvalid = xgb.QuantileDMatrix(X[valid_idx], y[valid_idx], ref=dtrain, nthread=nthread)
+        folds.append((dtrain, dvalid))
+    return folds
+
+
+def grid_configurations(param_grid=None):
+    """All parameter combinations of the grid, without 'n_estimators'."""
+    grid = {k: v for k, v in (param_grid or PARAM_GRID).items() if k != 'n_estimators'}
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def max_rounds_for(param_grid=None):
+    """Round budget implied by the grid's n_estimators values."""
+    return max((param_grid or PARAM_GRID).get('n_estimators', [200]))
+
+
+def sample_configurations(param_grid=None, n_iter=None, seed=42):
+    """n_iter distinct configurations drawn from the grid (all if n_iter is None)."""
+    configs = grid_configurations(param_grid)
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(configs))
+    if n_iter is not None:
+        order = order[:n_iter]
+    return [configs[i] for i in order]
+
+
+class FoldTrainer:
+    """Boosts one configuration on every fold and tracks its CV curve.
+
+    Training can be resumed with more rounds (successive halving) and stops
+    for good once the validation score has not improved for
+    `early_stopping_rounds` rounds.
+    """
+
+    def __init__(self, params, folds, seed=42, nthread=-1,
+                 early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+        self.params = dict(params)
+        self.folds = folds
+        self.train_params = {
+            'objective': 'reg:squarederror',
+            'eval_metric': 'rmse',
+            'tree_method': 'hist',
+            'seed': seed,
+            'nthread': nthread,
+            **self.params,
+        }
+        self.early_stopping_rounds = early_stopping_rounds
+        self.boosters = [None] * len(folds)
+        self.curves = [[] for _ in folds]
+        self.stopped = False
+
+    @property
+    def rounds(self):
+        return min(len(curve) for curve in self.curves)
+
+    def train(self, total_rounds):
+        """Boost every fold up to total_rounds (fewer if early stopping kicks in)."""
+        import xgboost as xgb
+
+        extra = total_rounds - self.rounds
+        if self.stopped or extra <= 0:
+            return self
+        for i, (dtrain, dvalid) in enumerate(self.folds):
+            history = {}
+            self.boosters[i] = xgb.train(
+                self.train_params, dtrain, num_boost_round=extra,
+                evals=[(dvalid, 'valid')], evals_result=history,
+                early_stopping_rounds=self.early_stopping_rounds,
+                xgb_model=self.boosters[i], verbose_eval=False,
+            )
+            added = history['valid']['rmse']
+            self.curves[i].extend(added)
+            if len(added) < extra:
+                self.stopped = True
+        if self.stopped:
+            # Align folds on the shortest curve so the mean is well defined
+            n = self.rounds
+            self.curves = [curve[:n] for curve in self.curves]
+        return self
+
+    def cv_curve(self):
+        """CV RMSE after each round: sqrt of the mean fold MSE."""
+        n = self.rounds
+        mse = np.square(np.array([curve[:n] for curve in self.curves]))
+        return np.sqrt(mse.mean(axis=0))
+
+    def best(self):
+        """(best CV RMSE, number of rounds that achieved it)."""
+        curve = self.cv_curve()
+        best_round = int(np.argmin(curve))
+        return float(curve[best_round]), best_round + 1
+
+
+def _result(trainers, engine, n_fits):
+    scored = [(trainer.best(), trainer) for trainer in trainers]
+    (best_rmse, best_rounds), best_trainer = min(scored, key=lambda item: item[0][0])
+    best_params = {'n_estimators': best_rounds, **best_trainer.params}
+    return {
+        'engine': engine,
+        'best_params': best_params,
+        'best_rmse': best_rmse,
+        'fold_rmse': [float(curve[best_rounds - 1]) for curve in best_trainer.curves],
+        'n_candidates': len(trainers),
+        'n_fits': n_fits,
+        'boosting_rounds': sum(trainer.rounds * len(trainer.folds) for trainer in trainers),
+    }
+
+
+def random_search(folds, param_grid=None, n_iter=20, seed=42, nthread=-1,
+                  early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+    """Evaluate n_iter sampled configurations with full budget and early stopping."""
+    max_rounds = max_rounds_for(param_grid)
+    trainers = []
+    for params in sample_configurations(param_grid, n_iter, seed):
+        trainer = FoldTrainer(params, folds, seed, nthread, early_stopping_rounds)
+        trainers.append(trainer.train(max_rounds))
+    return _result(trainers, 'random', len(trainers) * len(folds))
+
+
+def successive_halving(folds, param_grid=None, n_candidates=None, eta=3, min_rounds=None,
+                       seed=42, nthread=-1, early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+    """Successive halving over sampled configurations.
+
+    Rung budgets grow by `eta` from `min_rounds` up to the grid's largest
+    n_estimators; after each rung only the best 1/eta configurations are
+    boosted further. Configurations that early-stopped keep their score but
+    are not trained again.
+    """
+    max_rounds = max_rounds_for(param_grid)
+    trainers = [FoldTrainer(params, folds, seed, nthread, early_stopping_rounds)
+                for params in sample_configurations(param_grid, n_candidates, seed)]
+    if min_rounds is None:
+        n_rungs = max(1, math.ceil(math.log(max(len(trainers), 1), eta)))
+        min_rounds = max(1, int(max_rounds / eta ** (n_rungs - 1)))
+
+    alive = list(trainers)
+    budget = min_rounds
+    n_fits = 0
+    while True:
+        budget = min(budget, max_rounds)
+        for trainer in alive:
+            if not trainer.stopped and trainer.rounds < budget:
+                trainer.train(budget)
+                n_fits += len(folds)
+        if budget >= max_rounds or len(alive) <= 1:
+            break
+        alive.sort(key=lambda trainer: trainer.best()[0])
+        alive = alive[:max(1, len(alive) // eta)]
+        budget *= eta
+    return _result(trainers, 'halving', n_fits)
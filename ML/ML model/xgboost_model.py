@@ -5,30 +5,45 @@ This script trains an XGBoost model for crop price prediction with hyperparamete
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import xgboost as xgb
 import pickle
+import json
+import argparse
+import io
+import os
+import time
+from pathlib import Path
+from data_io import read_processed_data
+import external_memory
+from feature_schema import load_schema, save_schema, schema_path_for
+from instrumentation import span, stage
+from model_bundle import DEFAULT_MEMBER, bundle_path, member_files, write_bundle
+from model_io import export_native_model, tree_arrays_path
+from model_registry import publish
+from prediction_table import refresh_after_publish
+from reporting import ReportWriter
+from tuning import PARAM_GRID, SEARCH_ENGINES, build_folds, random_search, successive_halving
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set visualization style
-sns.set_style('whitegrid')
-plt.rcParams['figure.figsize'] = (12, 8)
+# Cross-validation folds of every search; a training set needs at least this many rows
+CV_FOLDS = 5
 
+@span
 def load_processed_data(filepath):
-    """Load the preprocessed dataset"""
+    """Load the preprocessed dataset (CSV, Parquet or memory-mapped Arrow)"""
     print("=" * 60)
     print("LOADING PROCESSED DATA")
     print("=" * 60)
-    df = pd.read_csv(filepath)
+    df = read_processed_data(filepath)
     print(f"✓ Data loaded successfully!")
     print(f"  Shape: {df.shape}")
     print(f"  Features: {list(df.columns)}")
     return df
 
+@span
 def prepare_train_test_split(df, target_col='Price', test_size=0.2, random_state=42):
     """Split data into training and testing sets"""
     print("\n" + "=" * 60)
@@ -51,6 +66,7 @@ def prepare_train_test_split(df, target_col='Price', test_size=0.2, random_state
     
     return X_train, X_test, y_train, y_test
 
+@span
 def train_baseline_model(X_train, y_train, X_test, y_test):
     """Train a baseline XGBoost model"""
     print("\n" + "=" * 60)
@@ -95,118 +111,381 @@ def train_baseline_model(X_train, y_train, X_test, y_test):
     
     return baseline_model, test_rmse, test_r2
 
-def hyperparameter_tuning(X_train, y_train):
-    """Perform hyperparameter tuning using GridSearchCV"""
+@span
+def hyperparameter_tuning(X_train, y_train, search='grid', n_iter=20, seed=42, n_jobs=-1,
+                          return_cv=False):
+    """Perform hyperparameter tuning
+
+    search='grid' runs the exhaustive GridSearchCV over PARAM_GRID; 'random'
+    and 'halving' use the faster engines in tuning.py, which share prebuilt
+    folds and early-stop on the validation fold. With return_cv=True the
+    per-fold RMSE of the best configuration is returned as well, so
+    evaluate_model can reuse it instead of cross-validating again.
+    """
     print("\n" + "=" * 60)
     print("HYPERPARAMETER TUNING")
     print("=" * 60)
     
     # Define parameter grid
-    param_grid = {
-        'n_estimators': [50, 100, 200],
-        'learning_rate': [0.01, 0.05, 0.1],
-        'max_depth': [3, 5, 7],
-        'subsample': [0.8, 1.0],
-        'colsample_bytree': [0.8, 1.0],
-        'min_child_weight': [1, 3, 5]
-    }
+    param_grid = PARAM_GRID
     
     print("Parameter grid:")
     for param, values in param_grid.items():
         print(f"  {param}: {values}")
     
-    # Initialize XGBoost model
-    xgb_model = xgb.XGBRegressor(
-        objective='reg:squarederror',
-        random_state=42
-    )
-    
-    # Perform grid search with cross-validation
-    print("\nPerforming GridSearchCV (this may take a few minutes)...")
-    grid_search = GridSearchCV(
-        estimator=xgb_model,
-        param_grid=param_grid,
-        cv=5,
-        scoring='neg_mean_squared_error',
-        n_jobs=-1,
-        verbose=1
-    )
-    
-    grid_search.fit(X_train, y_train)
+    started = time.perf_counter()
+    if search == 'grid':
+        # Initialize XGBoost model
+        xgb_model = xgb.XGBRegressor(
+            objective='reg:squarederror',
+            random_state=seed
+        )
+        
+        # Perform grid search with cross-validation
+        print("\nPerforming GridSearchCV (this may take a few minutes)...")
+        grid_search = GridSearchCV(
+            estimator=xgb_model,
+            param_grid=param_grid,
+            cv=CV_FOLDS,
+            scoring='neg_mean_squared_error',
+            n_jobs=n_jobs,
+            verbose=1
+        )
+        
+        with stage('GridSearchCV.fit'):
+            grid_search.fit(X_train, y_train)
+        best_model, best_params = grid_search.best_estimator_, grid_search.best_params_
+        best_rmse = np.sqrt(-grid_search.best_score_)
+        fold_rmse = np.sqrt(-np.array([grid_search.cv_results_[f'split{i}_test_score'][grid_search.best_index_]
+                                       for i in range(grid_search.n_splits_)]))
+    elif search in SEARCH_ENGINES:
+        print(f"\nPerforming {search} search with early stopping (seed {seed})...")
+        with stage('build_folds'):
+            folds = build_folds(X_train, y_train, n_splits=CV_FOLDS, nthread=n_jobs)
+        if search == 'random':
+            with stage('random_search'):
+                result = random_search(folds, param_grid, n_iter=n_iter, seed=seed, nthread=n_jobs)
+        else:
+            with stage('successive_halving'):
+                result = successive_halving(folds, param_grid, seed=seed, nthread=n_jobs)
+        print(f"  Candidates: {result['n_candidates']}, fold fits: {result['n_fits']}, "
+              f"boosting rounds: {result['boosting_rounds']:,}")
+        best_params, best_rmse = result['best_params'], result['best_rmse']
+        fold_rmse = np.array(result['fold_rmse'])
+        
+        # Refit on the full training set with the selected number of trees
+        best_model = xgb.XGBRegressor(
+            objective='reg:squarederror',
+            random_state=seed,
+            n_jobs=n_jobs,
+            **best_params
+        )
+        with stage('refit'):
+            best_model.fit(X_train, y_train)
+    else:
+        raise ValueError(f"Unknown search engine {search!r}; expected one of {SEARCH_ENGINES}")
+    elapsed = time.perf_counter() - started
     
     print("\n✓ Hyperparameter tuning completed!")
     print(f"\n  Best parameters:")
-    for param, value in grid_search.best_params_.items():
+    for param, value in best_params.items():
         print(f"    {param}: {value}")
     
-    print(f"\n  Best CV RMSE: {np.sqrt(-grid_search.best_score_):,.2f}")
+    print(f"\n  Best CV RMSE: {best_rmse:,.2f}")
+    print(f"  Search time: {elapsed:.1f}s")
     
-    return grid_search.best_estimator_, grid_search.best_params_
+    if return_cv:
+        return best_model, best_params, fold_rmse
+    return best_model, best_params
 
-def evaluate_model(model, X_train, y_train, X_test, y_test):
-    """Evaluate the trained model"""
+@span
+def train_external_memory(data_file, params=None, chunk_rows=external_memory.DEFAULT_CHUNK_ROWS,
+                          test_size=0.2, seed=42, n_jobs=-1, cache_dir=None):
+    """Train and evaluate without loading the dataset into memory
+
+    XGBoost reads the processed file chunk by chunk through an external-memory
+    matrix (see external_memory.py), with fixed parameters instead of a search.
+    Train and test rows are assigned by hashing the row index. Returns the
+    model as an XGBRegressor, its train/test metrics and the feature names.
+    """
+    print("\n" + "=" * 60)
+    print("OUT-OF-CORE TRAINING (EXTERNAL MEMORY)")
+    print("=" * 60)
+    
+    params = dict(external_memory.DEFAULT_PARAMS, **(params or {}))
+    print(f"Parameters: {params}")
+    print(f"Chunks of {chunk_rows:,} rows, {test_size * 100:.0f}% test rows by row-index hash (seed {seed})")
+    
+    started = time.perf_counter()
+    booster, info = external_memory.train(data_file, params, chunk_rows=chunk_rows, test_size=test_size,
+                                          seed=seed, nthread=n_jobs, cache_dir=cache_dir)
+    print(f"✓ Trained {info['rounds']} rounds on {info['rows']:,} rows in {time.perf_counter() - started:.1f}s "
+          f"(page cache {info['cache_bytes'] / 1e6:,.0f} MB on disk)")
+    
+    # The rest of the pipeline (save_model, feature importance) expects the sklearn wrapper
+    model = xgb.XGBRegressor(objective='reg:squarederror', tree_method='hist', random_state=seed, **params)
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    
+    started = time.perf_counter()
+    evaluation = external_memory.evaluate(booster, data_file, chunk_rows=chunk_rows,
+                                          test_size=test_size, seed=seed)
+    print(f"\n✓ Final Model Performance ({time.perf_counter() - started:.1f}s, streamed):")
+    for label, split in (('Training', 'train'), ('Testing', 'test')):
+        m = evaluation[split]
+        print(f"\n  {label} Metrics:")
+        print(f"    RMSE:  {m['rmse']:,.2f}")
+        print(f"    MAE:   {m['mae']:,.2f}")
+        print(f"    R²:    {m['r2']:.4f}")
+        print(f"    MAPE:  {m['mape']:.2f}%")
+    
+    metrics = {f'{split}_{name}': value for split, m in evaluation.items() for name, value in m.items()}
+    return model, metrics, info['feature_names']
+
+def crop_groups(crop_codes, vocabulary=None, groups=None):
+    """Member name -> crop codes for the per-crop model family
+    
+    `vocabulary` is the schema's Crop encoder (name -> code). `groups` maps a
+    group name to crop names that share one model; every other crop present
+    in `crop_codes` gets a model of its own.
+    """
+    names = {int(code): str(name).strip() for name, code in (vocabulary or {}).items()}
+    by_name = {name.casefold(): code for code, name in names.items()}
+    present = sorted({int(code) for code in crop_codes})
+    members, grouped = {}, set()
+    for group, crops in (groups or {}).items():
+        codes = [by_name[c.strip().casefold()] for c in crops if c.strip().casefold() in by_name]
+        codes = [code for code in codes if code in present and code not in grouped]
+        if codes:
+            members[group] = codes
+            grouped.update(codes)
+    for code in present:
+        if code not in grouped:
+            name = names.get(code, f'crop_{code}')
+            members['_'.join(name.casefold().split()) or f'crop_{code}'] = [code]
+    return members
+
+def _fit_crop_member(name, X, y, search, n_iter, seed, n_jobs):
+    """Process pool task: hyperparameter search and refit for one crop group"""
+    import contextlib
+    import io
+    
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model, params, fold_rmse = hyperparameter_tuning(X, y, search=search, n_iter=n_iter, seed=seed,
+                                                         n_jobs=n_jobs, return_cv=True)
+    return name, model, params, float(np.mean(fold_rmse)), time.perf_counter() - started
+
+@span
+def train_crop_models(global_model, X_train, y_train, X_test, y_test, vocabulary=None, groups=None,
+                      min_rows=200, search='grid', n_iter=20, seed=42, n_jobs=-1):
+    """Train one model per crop (or crop group) in a process pool
+    
+    Each member runs the same hyperparameter search as the global model, on
+    its crops' training rows only. The core budget `n_jobs` (-1 = all cores)
+    is split between pool workers and XGBoost threads per worker, and the
+    largest groups are submitted first. A member is kept only if it beats
+    the global model on its crops' test rows; groups with fewer than
+    `min_rows` (and at least CV_FOLDS) training rows, groups whose training
+    fails, and crops without a kept member are served by the global model.
+    Returns (members, routes, family test predictions).
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    print("\n" + "=" * 60)
+    print("PER-CROP MODELS")
+    print("=" * 60)
+    
+    train_codes = X_train['Crop_Encoded'].to_numpy()
+    test_codes = X_test['Crop_Encoded'].to_numpy()
+    candidates = {}
+    min_rows = max(min_rows, CV_FOLDS)
+    for name, codes in crop_groups(np.unique(train_codes), vocabulary, groups).items():
+        rows = np.isin(train_codes, codes)
+        if rows.sum() < min_rows:
+            print(f"  {name}: {rows.sum()} training rows (< {min_rows}), served by the global model")
+            continue
+        candidates[name] = (codes, rows)
+    
+    cores = os.cpu_count() if n_jobs is None or n_jobs < 0 else max(n_jobs, 1)
+    workers = max(min(len(candidates), cores), 1)
+    threads = max(cores // workers, 1)
+    print(f"Training {len(candidates)} members with {search} search: "
+          f"{workers} worker processes x {threads} threads")
+    
+    started = time.perf_counter()
+    fitted = {}
+    # spawn: the parent has already run XGBoost's OpenMP threads, which do not survive fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(_fit_crop_member, name, X_train[rows], y_train[rows],
+                               search, n_iter, seed, threads): name
+                   for name, (codes, rows) in sorted(candidates.items(), key=lambda kv: -kv[1][1].sum())}
+        for future in as_completed(futures):
+            # One failing crop must not cost the global model, which is not saved yet
+            try:
+                name, model, params, cv_rmse, seconds = future.result()
+            except Exception as e:
+                print(f"  ⚠ {futures[future]}: training failed ({e}), served by the global model")
+                continue
+            fitted[name] = (model, params, cv_rmse, seconds)
+    print(f"✓ Members trained in {time.perf_counter() - started:.1f}s")
+    
+    # Keep a member only where it beats the global model on held-out rows
+    y_family = global_model.predict(X_test).astype(np.float64)
+    members, routes = {}, {}
+    print(f"\n  {'member':<20} {'train rows':>10} {'test rows':>9} {'RMSE':>10} {'global':>10}  kept")
+    for name, (codes, rows) in candidates.items():
+        if name not in fitted:
+            continue
+        model, params, cv_rmse, seconds = fitted[name]
+        test_rows = np.isin(test_codes, codes)
+        if test_rows.any():
+            member_pred = model.predict(X_test[test_rows])
+            member_rmse = regression_metrics(y_test[test_rows], member_pred)['rmse']
+            global_rmse = regression_metrics(y_test[test_rows], y_family[test_rows])['rmse']
+        else:
+            member_rmse = global_rmse = float('nan')
+        kept = member_rmse < global_rmse
+        print(f"  {name:<20} {int(rows.sum()):>10,} {int(test_rows.sum()):>9,} {member_rmse:>10,.2f} "
+              f"{global_rmse:>10,.2f}  {'yes' if kept else 'no'}")
+        if kept:
+            y_family[test_rows] = member_pred
+            members[name] = {'model': model, 'codes': codes, 'params': params, 'train_rows': int(rows.sum()),
+                             'cv_rmse': cv_rmse, 'test_rmse': member_rmse, 'train_s': seconds}
+            routes.update({code: name for code in codes})
+    
+    family = regression_metrics(y_test, y_family)
+    global_rmse = regression_metrics(y_test, global_model.predict(X_test))['rmse']
+    print(f"\n✓ {len(members)} of {len(candidates)} members kept; family test RMSE {family['rmse']:,.2f} "
+          f"vs {global_rmse:,.2f} global (R² {family['r2']:.4f})")
+    return members, routes, y_family
+
+@span
+def save_bundle(global_model, members, routes, filepath, feature_names, vocabulary=None, global_metrics=None):
+    """Write the per-crop model family as one bundle file next to `filepath`
+    
+    The global model is the bundle's default member, for rows of every crop
+    without a member of its own.
+    """
+    names = {int(code): str(name).strip() for name, code in (vocabulary or {}).items()}
+    entries = {DEFAULT_MEMBER: {'model': global_model, 'codes': [],
+                                'test_rmse': (global_metrics or {}).get('test_rmse')}}
+    entries.update(members)
+    manifest_members, files = {}, {}
+    for name, member in entries.items():
+        paths = member_files(name)
+        trees = io.BytesIO()
+        export_tree_arrays(member['model'], trees)
+        files[paths['trees']] = trees.getvalue()
+        files[paths['native']] = bytes(member['model'].get_booster().save_raw('ubj'))
+        manifest_members[name] = {
+            'crops': [names.get(code, str(code)) for code in member['codes']],
+            'codes': [int(code) for code in member['codes']],
+            'train_rows': member.get('train_rows'),
+            'test_rmse': member.get('test_rmse'),
+            'cv_rmse': member.get('cv_rmse'),
+            'params': member.get('params'),
+            'files': paths,
+        }
+    manifest = {
+        'route_column': 'Crop_Encoded',
+        'feature_names': list(feature_names),
+        'default': DEFAULT_MEMBER,
+        'routes': {str(code): name for code, name in sorted(routes.items())},
+        'members': manifest_members,
+    }
+    path = write_bundle(bundle_path(filepath), manifest, files)
+    print(f"✓ Per-crop bundle saved to: {path} ({len(entries)} members, {path.stat().st_size / 1e6:.1f} MB)")
+    return path
+
+def regression_metrics(y_true, y_pred):
+    """RMSE, MAE, R² and MAPE from one pass over the residuals"""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    residuals = y_true - np.asarray(y_pred, dtype=np.float64)
+    abs_residuals = np.abs(residuals)
+    ss_res = residuals @ residuals
+    ss_tot = np.sum((y_true - y_true.mean()) ** 2)
+    return {
+        'rmse': float(np.sqrt(ss_res / len(y_true))),
+        'mae': float(abs_residuals.mean()),
+        'r2': float(1 - ss_res / ss_tot) if ss_tot > 0 else float('nan'),
+        'mape': float(np.mean(abs_residuals / np.abs(y_true)) * 100),
+    }
+
+def _cv_metrics_scorer(estimator, X, y):
+    return regression_metrics(y, estimator.predict(X))
+
+@span
+def cross_validate_parallel(model, X, y, cv=5, n_jobs=-1):
+    """K-fold CV of `model` with the folds fitted in parallel processes
+    
+    The core budget `n_jobs` (-1 = all cores) is split between fold workers
+    and XGBoost threads per fold. joblib memory-maps the training matrix into
+    the workers instead of copying it. Returns {metric: per-fold array}.
+    """
+    from sklearn.base import clone
+    from sklearn.model_selection import cross_validate
+    
+    cores = os.cpu_count() if n_jobs is None or n_jobs < 0 else max(n_jobs, 1)
+    workers = min(cv, cores)
+    estimator = clone(model).set_params(n_jobs=max(cores // workers, 1))
+    scores = cross_validate(estimator, X, y, cv=cv, n_jobs=workers, scoring=_cv_metrics_scorer)
+    return {name: scores[f'test_{name}'] for name in ('rmse', 'mae', 'r2', 'mape')}
+
+@span
+def evaluate_model(model, X_train, y_train, X_test, y_test, cv_fold_rmse=None, n_jobs=-1):
+    """Evaluate the trained model
+    
+    Train and test rows are scored separately, without copying either
+    frame. Pass `cv_fold_rmse` (from hyperparameter_tuning(..., return_cv=True))
+    to reuse the search's cross-validation instead of fitting the folds again.
+    """
     print("\n" + "=" * 60)
     print("MODEL EVALUATION")
     print("=" * 60)
     
-    # Make predictions
+    # Make predictions; concatenating the splits first would copy both frames
     y_train_pred = model.predict(X_train)
     y_test_pred = model.predict(X_test)
     
     # Calculate metrics
-    train_rmse = np.sqrt(mean_squared_error(y_train, y_train_pred))
-    test_rmse = np.sqrt(mean_squared_error(y_test, y_test_pred))
-    train_mae = mean_absolute_error(y_train, y_train_pred)
-    test_mae = mean_absolute_error(y_test, y_test_pred)
-    train_r2 = r2_score(y_train, y_train_pred)
-    test_r2 = r2_score(y_test, y_test_pred)
-    
-    # Calculate MAPE (Mean Absolute Percentage Error)
-    train_mape = np.mean(np.abs((y_train - y_train_pred) / y_train)) * 100
-    test_mape = np.mean(np.abs((y_test - y_test_pred) / y_test)) * 100
+    train = regression_metrics(y_train, y_train_pred)
+    test = regression_metrics(y_test, y_test_pred)
     
     print("\n✓ Final Model Performance:")
-    print(f"\n  Training Metrics:")
-    print(f"    RMSE:  {train_rmse:,.2f}")
-    print(f"    MAE:   {train_mae:,.2f}")
-    print(f"    R²:    {train_r2:.4f}")
-    print(f"    MAPE:  {train_mape:.2f}%")
-    
-    print(f"\n  Testing Metrics:")
-    print(f"    RMSE:  {test_rmse:,.2f}")
-    print(f"    MAE:   {test_mae:,.2f}")
-    print(f"    R²:    {test_r2:.4f}")
-    print(f"    MAPE:  {test_mape:.2f}%")
+    for label, m in (('Training', train), ('Testing', test)):
+        print(f"\n  {label} Metrics:")
+        print(f"    RMSE:  {m['rmse']:,.2f}")
+        print(f"    MAE:   {m['mae']:,.2f}")
+        print(f"    R²:    {m['r2']:.4f}")
+        print(f"    MAPE:  {m['mape']:.2f}%")
     
     # Cross-validation score
-    cv_scores = cross_val_score(
-        model, X_train, y_train, 
-        cv=5, 
-        scoring='neg_mean_squared_error'
-    )
-    cv_rmse = np.sqrt(-cv_scores)
-    
-    print(f"\n  Cross-Validation (5-fold):")
-    print(f"    Mean RMSE: {cv_rmse.mean():,.2f}")
-    print(f"    Std RMSE:  {cv_rmse.std():,.2f}")
-    
-    metrics = {
-        'train_rmse': train_rmse,
-        'test_rmse': test_rmse,
-        'train_mae': train_mae,
-        'test_mae': test_mae,
-        'train_r2': train_r2,
-        'test_r2': test_r2,
-        'train_mape': train_mape,
-        'test_mape': test_mape,
-        'cv_rmse_mean': cv_rmse.mean(),
-        'cv_rmse_std': cv_rmse.std()
-    }
+    if cv_fold_rmse is not None:
+        cv = {'rmse': np.asarray(cv_fold_rmse)}
+        print(f"\n  Cross-Validation ({len(cv['rmse'])}-fold, from hyperparameter search):")
+    else:
+        started = time.perf_counter()
+        cv = cross_validate_parallel(model, X_train, y_train, cv=5, n_jobs=n_jobs)
+        print(f"\n  Cross-Validation (5-fold, {time.perf_counter() - started:.1f}s):")
+    print(f"    Mean RMSE: {cv['rmse'].mean():,.2f}")
+    print(f"    Std RMSE:  {cv['rmse'].std():,.2f}")
+    if 'mae' in cv:
+        print(f"    Mean MAE:  {cv['mae'].mean():,.2f}")
+        print(f"    Mean R²:   {cv['r2'].mean():.4f}")
+        print(f"    Mean MAPE: {cv['mape'].mean():.2f}%")
+    
+    metrics = {f'{split}_{name}': value
+               for split, m in (('train', train), ('test', test)) for name, value in m.items()}
+    for name, values in cv.items():
+        metrics[f'cv_{name}_mean'] = values.mean()
+        metrics[f'cv_{name}_std'] = values.std()
     
     return metrics, y_test_pred
 
-def plot_feature_importance(model, feature_names):
-    """Plot feature importance"""
+@span
+def plot_feature_importance(model, feature_names, reports=None):
+    """Rank feature importance; the bar chart is rendered only when `reports` is given"""
     print("\n" + "=" * 60)
     print("FEATURE IMPORTANCE ANALYSIS")
     print("=" * 60)
@@ -223,101 +502,249 @@ def plot_feature_importance(model, feature_names):
         print(f"  {row['Feature']}: {row['Importance']:.4f}")
     
     # Plot
-    plt.figure(figsize=(10, 6))
-    sns.barplot(
-        data=feature_importance_df, 
-        x='Importance', 
-        y='Feature',
-        palette='viridis'
-    )
-    plt.title('XGBoost Feature Importance', fontsize=16, fontweight='bold')
-    plt.xlabel('Importance Score', fontsize=12)
-    plt.ylabel('Features', fontsize=12)
-    plt.tight_layout()
-    plt.savefig('/Users/nishanishmitha/Desktop/ML model /feature_importance.png', dpi=300, bbox_inches='tight')
-    print("\n✓ Feature importance plot saved as 'feature_importance.png'")
-    plt.close()
+    if reports is not None:
+        reports.render('feature_importance', feature_importance_df)
     
     return feature_importance_df
 
-def plot_predictions(y_test, y_pred):
+@span
+def plot_predictions(y_test, y_pred, reports):
     """Plot actual vs predicted values"""
     print("\n" + "=" * 60)
     print("GENERATING PREDICTION VISUALIZATIONS")
     print("=" * 60)
     
-    # Create figure with subplots
-    fig, axes = plt.subplots(1, 2, figsize=(16, 6))
-    
-    # Plot 1: Actual vs Predicted scatter plot
-    axes[0].scatter(y_test, y_pred, alpha=0.6, s=100, edgecolors='black', linewidth=1)
-    
-    # Add perfect prediction line
-    min_val = min(y_test.min(), y_pred.min())
-    max_val = max(y_test.max(), y_pred.max())
-    axes[0].plot([min_val, max_val], [min_val, max_val], 'r--', linewidth=2, label='Perfect Prediction')
-    
-    axes[0].set_xlabel('Actual Price', fontsize=12, fontweight='bold')
-    axes[0].set_ylabel('Predicted Price', fontsize=12, fontweight='bold')
-    axes[0].set_title('Actual vs Predicted Prices', fontsize=14, fontweight='bold')
-    axes[0].legend()
-    axes[0].grid(True, alpha=0.3)
-    
-    # Plot 2: Residuals plot
-    residuals = y_test - y_pred
-    axes[1].scatter(y_pred, residuals, alpha=0.6, s=100, edgecolors='black', linewidth=1, color='coral')
-    axes[1].axhline(y=0, color='r', linestyle='--', linewidth=2)
-    axes[1].set_xlabel('Predicted Price', fontsize=12, fontweight='bold')
-    axes[1].set_ylabel('Residuals', fontsize=12, fontweight='bold')
-    axes[1].set_title('Residual Plot', fontsize=14, fontweight='bold')
-    axes[1].grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig('/Users/nishanishmitha/Desktop/ML model /prediction_analysis.png', dpi=300, bbox_inches='tight')
-    print("✓ Prediction analysis plot saved as 'prediction_analysis.png'")
-    plt.close()
+    reports.render('prediction_analysis', np.asarray(y_test), np.asarray(y_pred))
+
+# Objectives whose prediction is the raw margin (no link function)
+IDENTITY_OBJECTIVES = {'reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:squaredlogerror'}
 
-def save_model(model, filepath):
-    """Save the trained model"""
+@span
+def export_tree_arrays(model, filepath):
+    """Flatten the boosted trees into compact arrays for predict.py's NumPy evaluator
+    
+    All trees are concatenated into flat node arrays (feature index, threshold,
+    left/right child, default direction for missing values, leaf value). Child
+    indices are global, and leaves point to themselves so every tree can be
+    walked the same fixed number of steps.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if learner['gradient_booster']['name'] != 'gbtree' or objective not in IDENTITY_OBJECTIVES:
+        raise ValueError(f"Tree export supports gbtree regression only, got "
+                         f"{learner['gradient_booster']['name']} / {objective}")
+    if int(learner['learner_model_param'].get('num_target', 1)) != 1:
+        raise ValueError("Tree export supports single-target models only")
+    
+    trees = learner['gradient_booster']['model']['trees']
+    feature, threshold, left, right, default_left, value, roots, depths = [], [], [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        if any(tree.get('split_type', [])):
+            raise ValueError("Tree export does not support categorical splits")
+        lc = np.asarray(tree['left_children'], dtype=np.int64)
+        rc = np.asarray(tree['right_children'], dtype=np.int64)
+        n_nodes = len(lc)
+        is_leaf = lc == -1
+        node_ids = np.arange(n_nodes)
+        
+        feature.append(np.where(is_leaf, 0, tree['split_indices']))
+        threshold.append(np.where(is_leaf, 0, tree['split_conditions']))
+        left.append(np.where(is_leaf, node_ids, lc) + offset)
+        right.append(np.where(is_leaf, node_ids, rc) + offset)
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        # For leaves XGBoost stores the leaf value in split_conditions
+        value.append(np.where(is_leaf, tree['split_conditions'], 0))
+        roots.append(offset)
+        
+        # Depth of the deepest leaf, found by walking down from the root
+        depth = np.zeros(n_nodes, dtype=np.int64)
+        for node in range(n_nodes):
+            if not is_leaf[node]:
+                depth[lc[node]] = depth[rc[node]] = depth[node] + 1
+        depths.append(int(depth.max()))
+        offset += n_nodes
+    
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    feature_names = booster.feature_names or []
+    
+    np.savez(
+        filepath,
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold).astype(np.float32),
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        default_left=np.concatenate(default_left),
+        value=np.concatenate(value).astype(np.float32),
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=np.int32(max(depths, default=0)),
+        base_score=np.float64(base_score),
+        feature_names=np.asarray(feature_names, dtype=str),
+    )
+    return filepath
+
+@span
+def save_model(model, filepath, feature_schema=None, feature_names=None):
+    """Save the trained model (pickle and native booster), and its feature schema next to it"""
     with open(filepath, 'wb') as f:
         pickle.dump(model, f)
     print(f"\n✓ Model saved to: {filepath}")
+    
+    # Native booster + metadata sidecar: predict.py loads this without unpickling
+    native_file = export_native_model(model, filepath, feature_names)
+    print(f"✓ Native booster saved to: {native_file}")
+    
+    # Flat tree arrays: predict.py scores these with NumPy alone, without importing xgboost
+    try:
+        trees_file = export_tree_arrays(model, tree_arrays_path(filepath))
+        print(f"✓ Tree arrays saved to: {trees_file}")
+    except ValueError as e:
+        print(f"  Skipped tree array export: {e}")
+    
+    if feature_schema is not None:
+        # The schema must list columns in the order the model was trained on
+        schema = dict(feature_schema, columns=list(feature_names or feature_schema['columns']))
+        schema_file = schema_path_for(filepath)
+        save_schema(schema, schema_file)
+        print(f"✓ Feature schema saved to: {schema_file}")
+
+def parse_args(argv=None):
+    """Command line options"""
+    parser = argparse.ArgumentParser(description='Crop price XGBoost training')
+    parser.add_argument('--data', default='/Users/nishanishmitha/Desktop/ML model /processed_data.csv',
+                        help='processed dataset (.csv, .parquet or .arrow)')
+    parser.add_argument('--model', default='/Users/nishanishmitha/Desktop/ML model /xgboost_model.pkl',
+                        help='where to save the trained model')
+    parser.add_argument('--registry', default=None,
+                        help='publish atomically to this model registry directory instead of --model')
+    parser.add_argument('--search', choices=SEARCH_ENGINES, default='grid',
+                        help='hyperparameter search engine: grid (default) is the exhaustive GridSearchCV; '
+                             'random and halving are the faster early-stopping engines')
+    parser.add_argument('--n-iter', type=int, default=20,
+                        help='configurations sampled by --search random')
+    parser.add_argument('--seed', type=int, default=42, help='seed for fold sampling and training')
+    parser.add_argument('--n-jobs', type=int, default=int(os.environ.get('TRAIN_N_JOBS', -1)),
+                        help='CPU cores for search and cross-validation (-1 = all; env TRAIN_N_JOBS)')
+    parser.add_argument('--external-memory', action='store_true',
+                        help='train out of core: stream --data in chunks through an external-memory '
+                             'DMatrix, with fixed parameters and a row-hash train/test split')
+    parser.add_argument('--chunk-rows', type=int, default=external_memory.DEFAULT_CHUNK_ROWS,
+                        help='with --external-memory, rows read per chunk')
+    parser.add_argument('--cache-dir', default=None,
+                        help='with --external-memory, directory for the page cache (default: temp dir)')
+    parser.add_argument('--params', type=json.loads, default=None,
+                        help='with --external-memory, JSON object of XGBRegressor parameters '
+                             'overriding the defaults, e.g. \'{"max_depth": 7}\'')
+    parser.add_argument('--per-crop', action='store_true',
+                        help='also train one model per crop in a process pool and save them as '
+                             'one bundle (xgboost_model.bundle) next to the global model')
+    parser.add_argument('--crop-groups', default=None,
+                        help='with --per-crop, JSON file mapping a group name to the crops that share '
+                             'one model, e.g. {"pulses": ["ARHAR", "GRAM", "MOONG"]}')
+    parser.add_argument('--min-crop-rows', type=int, default=200,
+                        help='with --per-crop, crops (or groups) with fewer training rows use the global model')
+    parser.add_argument('--plots', action=argparse.BooleanOptionalAction, default=False,
+                        help='render the PNG figures (off by default)')
+    parser.add_argument('--plots-dir', default=None,
+                        help='directory for the figures (default: next to --model)')
+    parser.add_argument('--background-plots', action='store_true',
+                        help='render figures in a background process')
+    args = parser.parse_args(argv)
+    if args.crop_groups:
+        args.per_crop = True
+    if args.per_crop and args.external_memory:
+        parser.error('--per-crop needs the training set in memory; it cannot be combined with --external-memory')
+    if args.min_crop_rows < CV_FOLDS:
+        parser.error(f'--min-crop-rows must be at least {CV_FOLDS}, the number of cross-validation folds')
+    return args
 
-def main():
+@span
+def main(argv=None):
     """Main execution function"""
     print("\n" + "=" * 60)
     print("CROP PRICE PREDICTION - XGBOOST MODEL TRAINING")
     print("=" * 60)
     
     # File paths
-    data_file = '/Users/nishanishmitha/Desktop/ML model /processed_data.csv'
-    model_file = '/Users/nishanishmitha/Desktop/ML model /xgboost_model.pkl'
-    
-    # 1. Load processed data
-    df = load_processed_data(data_file)
-    
-    # 2. Prepare train-test split
-    X_train, X_test, y_train, y_test = prepare_train_test_split(df)
-    
-    # 3. Train baseline model
-    baseline_model, baseline_rmse, baseline_r2 = train_baseline_model(
-        X_train, y_train, X_test, y_test
-    )
-    
-    # 4. Hyperparameter tuning
-    best_model, best_params = hyperparameter_tuning(X_train, y_train)
-    
-    # 5. Evaluate final model
-    metrics, y_pred = evaluate_model(best_model, X_train, y_train, X_test, y_test)
-    
-    # 6. Feature importance analysis
-    feature_importance = plot_feature_importance(best_model, X_train.columns.tolist())
-    
-    # 7. Prediction visualizations
-    plot_predictions(y_test, y_pred)
-    
-    # 8. Save model
-    save_model(best_model, model_file)
+    args = parse_args(argv)
+    data_file = args.data
+    model_file = args.model
+    
+    # 1. The schema written by data_preprocessing
+    schema_file = schema_path_for(data_file)
+    if schema_file.exists():
+        feature_schema = load_schema(schema_file)
+    else:
+        # Data processed before schemas existed: predict.py falls back to the model's column names
+        print(f"  No feature schema found at {schema_file}; the model will be saved without one")
+        feature_schema = None
+    
+    if args.external_memory:
+        # 2-5. Stream the data from disk: train and evaluate without loading it
+        best_model, metrics, feature_names = train_external_memory(
+            data_file, args.params, chunk_rows=args.chunk_rows, seed=args.seed,
+            n_jobs=args.n_jobs, cache_dir=args.cache_dir
+        )
+        baseline_rmse = None
+    else:
+        # 2. Load processed data and prepare the train-test split
+        df = load_processed_data(data_file)
+        X_train, X_test, y_train, y_test = prepare_train_test_split(df)
+        feature_names = X_train.columns.tolist()
+        
+        # 3. Train baseline model
+        baseline_model, baseline_rmse, baseline_r2 = train_baseline_model(
+            X_train, y_train, X_test, y_test
+        )
+        
+        # 4. Hyperparameter tuning
+        best_model, best_params, cv_fold_rmse = hyperparameter_tuning(
+            X_train, y_train, search=args.search, n_iter=args.n_iter, seed=args.seed,
+            n_jobs=args.n_jobs, return_cv=True
+        )
+        
+        # 5. Evaluate final model (reusing the search's cross-validation)
+        metrics, y_pred = evaluate_model(best_model, X_train, y_train, X_test, y_test,
+                                         cv_fold_rmse=cv_fold_rmse, n_jobs=args.n_jobs)
+    
+    # 5b. Per-crop model family, with the global model as its default member
+    if args.per_crop:
+        vocabulary = (feature_schema or {}).get('encoders', {}).get('Crop')
+        groups = None
+        if args.crop_groups:
+            with open(args.crop_groups, encoding='utf-8') as f:
+                groups = json.load(f)
+        crop_members, crop_routes, _ = train_crop_models(
+            best_model, X_train, y_train, X_test, y_test, vocabulary, groups,
+            min_rows=args.min_crop_rows, search=args.search, n_iter=args.n_iter, seed=args.seed,
+            n_jobs=args.n_jobs
+        )
+    
+    def save_artifacts(path):
+        save_model(best_model, path, feature_schema, feature_names)
+        if args.per_crop:
+            save_bundle(best_model, crop_members, crop_routes, path, feature_names, vocabulary, metrics)
+    
+    reports = ReportWriter(args.plots_dir or Path(model_file).parent, enabled=args.plots,
+                           background=args.background_plots)
+    with reports:
+        # 6. Feature importance analysis
+        feature_importance = plot_feature_importance(best_model, feature_names, reports)
+        
+        # 7. Prediction visualizations (need the test predictions in memory)
+        if args.plots and not args.external_memory:
+            plot_predictions(y_test, y_pred, reports)
+        
+        # 8. Save model (while background figures render)
+        if args.registry:
+            version, model_file = publish(args.registry, save_artifacts)
+            print(f"✓ Published model version {version} to registry: {args.registry}")
+        else:
+            save_artifacts(model_file)
+        table_rows = refresh_after_publish(model_file, args.registry)
+        if table_rows is not None:
+            print(f"✓ Prediction table rebuilt for the new model: {table_rows} pairs")
     
     # Final summary
     print("\n" + "=" * 60)
@@ -330,13 +757,20 @@ def main():
     print(f"  Test MAE: ₹{metrics['test_mae']:,.2f}")
     print(f"  Test MAPE: {metrics['test_mape']:.2f}%")
     
-    improvement = ((baseline_rmse - metrics['test_rmse']) / baseline_rmse) * 100
-    print(f"\n  Improvement over baseline: {improvement:.2f}%")
+    if baseline_rmse is not None:
+        improvement = ((baseline_rmse - metrics['test_rmse']) / baseline_rmse) * 100
+        print(f"\n  Improvement over baseline: {improvement:.2f}%")
     
     print("\n📁 Generated Files:")
     print("  ✓ xgboost_model.pkl")
-    print("  ✓ feature_importance.png")
-    print("  ✓ prediction_analysis.png")
+    print("  ✓ xgboost_model.ubj + xgboost_model.meta.json")
+    print("  ✓ xgboost_model.trees.npz")
+    if feature_schema is not None:
+        print("  ✓ feature_schema.json")
+    if args.per_crop:
+        print("  ✓ xgboost_model.bundle")
+    for path in reports.written:
+        print(f"  ✓ {path.name}")
     
     print("\n🎯 Top 3 Most Important Features:")
     for idx, row in feature_importance.head(3).iterrows():
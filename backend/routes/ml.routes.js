@@ -2,15 +2,124 @@ const express = require('express');
 const router = express.Router();
 const { spawn } = require('child_process');
 const path = require('path');
+const fs = require('fs');
 const db = require('../config/database');
 
+const PREDICT_TIMEOUT_MS = Number(process.env.ML_PREDICT_TIMEOUT_MS) || 10000;
+const scriptPath = path.join(__dirname, '..', '..', 'ML', 'ML model', 'predict.py');
+// Fields of a request body that are passed on to the predictor; everything else
+// (protocol keys such as `batch` and `cmd`, internal fields) stays in Node.
+// A model trained with a feature schema also needs the agronomic inputs, which
+// market_prices does not hold: clients that know them can send them, otherwise
+// predict.py answers with its heuristic and lists them in `missingFeatures`.
+const PREDICT_FIELDS = [
+  'crop', 'location', 'state', 'currentPrice', 'change',
+  'costCultivation', 'costCultivation2', 'production', 'yield', 'temperature', 'rainfallAnnual'
+];
+const PROTOCOL_KEYS = ['batch', 'cmd'];
+
+// Determine Python executable. Prefer workspace venv if present to ensure required packages.
+function resolvePython() {
+  const repoRoot = path.resolve(__dirname, '..', '..');
+  const candidates = [
+    path.join(repoRoot, '.venv', 'Scripts', 'python.exe'),
+    path.join(repoRoot, '.venv', 'bin', 'python'),
+    'python'
+  ];
+  for (const c of candidates) {
+    try {
+      if (fs.existsSync(c)) { return c; }
+    } catch (e) { /* ignore */ }
+  }
+  return 'python';
+}
+
+// A single long-running `predict.py --serve` process keeps the model resident.
+// Requests are written as JSON lines tagged with an id and replies are matched
+// back to their callers; if the process dies it is respawned on the next request.
+let predictor = null;
+
+function startPredictor() {
+  const pythonExec = resolvePython();
+  console.log('Starting resident ML predictor:', pythonExec, scriptPath);
+
+  const proc = spawn(pythonExec, [scriptPath, '--serve'], { stdio: ['pipe', 'pipe', 'pipe'] });
+  const state = { proc, pending: new Map(), nextId: 1, buffer: '' };
+
+  proc.stdout.on('data', (data) => {
+    state.buffer += data.toString();
+    let newline;
+    while ((newline = state.buffer.indexOf('\n')) !== -1) {
+      const line = state.buffer.slice(0, newline).trim();
+      state.buffer = state.buffer.slice(newline + 1);
+      if (!line) continue;
+      let result;
+      try {
+        result = JSON.parse(line);
+      } catch (e) {
+        console.error('Invalid JSON from python predictor:', line);
+        continue;
+      }
+      const entry = state.pending.get(result.id);
+      if (!entry) continue;
+      state.pending.delete(result.id);
+      clearTimeout(entry.timer);
+      delete result.id;
+      entry.resolve(result);
+    }
+  });
+  proc.stderr.on('data', (data) => { console.log('[predict.py]', data.toString().trim()); });
+
+  const fail = (err) => {
+    if (predictor === state) predictor = null;
+    for (const entry of state.pending.values()) {
+      clearTimeout(entry.timer);
+      entry.reject(err);
+    }
+    state.pending.clear();
+  };
+  proc.on('error', (err) => {
+    console.error('Failed to spawn python predictor:', err);
+    fail(err);
+  });
+  proc.on('close', (code) => {
+    console.log('Python predictor exited with code:', code);
+    fail(new Error(`Python predictor exited with code ${code}`));
+  });
+  proc.stdin.on('error', (err) => fail(err));
+
+  return state;
+}
+
+function runPrediction(payload) {
+  if (!predictor) predictor = startPredictor();
+  const state = predictor;
+  const id = state.nextId++;
+  const message = { id };
+  for (const field of PREDICT_FIELDS) {
+    if (payload[field] !== undefined) message[field] = payload[field];
+  }
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => {
+      state.pending.delete(id);
+      reject(new Error(`Python predictor timed out after ${PREDICT_TIMEOUT_MS} ms`));
+    }, PREDICT_TIMEOUT_MS);
+    state.pending.set(id, { resolve, reject, timer });
+    state.proc.stdin.write(JSON.stringify(message) + '\n');
+  });
+}
+
+
 // POST /api/ml/predict
 // Expects JSON body like: { crop: 'Tomato', location: 'Bangalore' }
 // Optionally accepts currentPrice and change, but if omitted, the latest DB entry for the crop+location will be used.
 router.post('/predict', async (req, res) => {
   const payload = req.body || {};
-  const scriptPath = path.join(__dirname, '..', '..', 'ML', 'ML model', 'predict.py');
 
+  const protocolKey = PROTOCOL_KEYS.find((key) => Object.prototype.hasOwnProperty.call(payload, key));
+  if (protocolKey) {
+    return res.status(400).json({ error: `Unsupported field: ${protocolKey}` });
+  }
   if (!payload.crop || !payload.location) {
     return res.status(400).json({ error: 'Missing required fields: crop, location' });
   }
@@ -30,6 +139,7 @@ router.post('/predict', async (req, res) => {
 
       payload.currentPrice = Number(row.modal_price);
       payload.change = Number(row.price_change_percentage) || 0;
+      if (!payload.state && row.state) payload.state = row.state;
       payload._db_source = { market_name: row.market_name, city: row.city, price_date: row.price_date };
     }
   } catch (err) {
@@ -37,70 +147,19 @@ router.post('/predict', async (req, res) => {
     return res.status(500).json({ error: 'Failed to read market data from database', details: String(err) });
   }
 
-  // Determine Python executable. Prefer workspace venv if present to ensure required packages.
-  const fs = require('fs');
-  const repoRoot = path.resolve(__dirname, '..', '..');
-  const candidates = [
-    path.join(repoRoot, '.venv', 'Scripts', 'python.exe'),
-    path.join(repoRoot, '.venv', 'bin', 'python'),
-    'python'
-  ];
-  let pythonExec = 'python';
-  for (const c of candidates) {
-    try {
-      if (fs.existsSync(c)) { pythonExec = c; break; }
-    } catch (e) { /* ignore */ }
-  }
-  console.log('Using python executable for ML prediction:', pythonExec);
-
-  // Spawn python script and pass JSON via stdin
   try {
-    console.log('ML predictor script path:', scriptPath, 'exists:', fs.existsSync(scriptPath));
-    console.log('ML predictor python executable:', pythonExec, 'exists:', (pythonExec === 'python' ? 'unknown' : fs.existsSync(pythonExec)));
-  } catch (e) { console.warn('Error checking paths', e); }
-
-  const py = spawn(pythonExec, [scriptPath], { stdio: ['pipe', 'pipe', 'pipe'] });
-  let stdout = '';
-  let stderr = '';
-
-  py.stdout.on('data', (data) => { stdout += data.toString(); });
-  py.stderr.on('data', (data) => { stderr += data.toString(); });
-
-  py.on('error', (err) => {
-    console.error('Failed to spawn python predictor:', err);
-    return res.status(500).json({ error: 'Failed to start python predictor', details: String(err) });
-  });
-
-  py.on('close', (code) => {
-    console.log('Python predictor exited with code:', code);
-    // If non-zero, but script wrote JSON to stdout (e.g., error details), return that to client
-    if (code !== 0) {
-      try {
-        const parsed = JSON.parse(stdout);
-        // return parser message if present
-        return res.status(500).json(Object.assign({}, parsed, { _db_source: payload._db_source }));
-      } catch (e) {
-        console.error('ML predict script failed with no JSON output. stderr:', stderr);
-        // Return a fallback prediction (simple heuristic) if script fails
-        const fallback = Math.round(payload.currentPrice * (1 + ((payload.change || 0) / 100)));
-        return res.json({ predictedPrice: fallback, model: 'fallback', message: 'Python predictor failed, returned fallback prediction', details: stderr || stdout, _db_source: payload._db_source });
-      }
+    const result = await runPrediction(payload);
+    // include db source info for traceability
+    if (result.error) {
+      return res.status(500).json(Object.assign({}, result, { _db_source: payload._db_source }));
     }
-
-    try {
-      const result = JSON.parse(stdout);
-      // include db source info for traceability
-      return res.json(Object.assign({}, result, { _db_source: payload._db_source }));
-    } catch (err) {
-      console.error('Invalid JSON from python script:', err, stdout);
-      const fallback = Math.round(payload.currentPrice * (1 + ((payload.change || 0) / 100)));
-      return res.json({ predictedPrice: fallback, model: 'fallback', message: 'Invalid output from predictor, returned fallback prediction', _db_source: payload._db_source });
-    }
-  });
-
-  // Send payload to python script
-  py.stdin.write(JSON.stringify(payload));
-  py.stdin.end();
+    return res.json(Object.assign({}, result, { _db_source: payload._db_source }));
+  } catch (err) {
+    console.error('ML predictor failed:', err.message);
+    // Return a fallback prediction (simple heuristic) if the predictor fails
+    const fallback = Math.round(payload.currentPrice * (1 + ((payload.change || 0) / 100)));
+    return res.json({ predictedPrice: fallback, model: 'fallback', message: 'Python predictor failed, returned fallback prediction', details: err.message, _db_source: payload._db_source });
+  }
 });
 
 module.exports = router;
@@ -0,0 +1,87 @@
+/**
+ * Rebuild the ML prediction table from the latest market prices.
+ *
+ * Run after each market price refresh (e.g. from the import job or cron):
+ *   node scripts/refresh_prediction_table.js
+ *
+ * For every crop and location that /api/ml/predict can be asked about (each
+ * city and each market name) it takes the latest market_prices row, builds
+ * the same payload the route sends to predict.py and pipes all of them to
+ * `prediction_table.py build`, which scores them in one pass.
+ */
+const path = require('path');
+const fs = require('fs');
+const { spawn } = require('child_process');
+require('dotenv').config({ path: path.join(__dirname, '..', '.env') });
+const { promisePool } = require('../config/database');
+
+const mlDir = path.join(__dirname, '..', '..', 'ML', 'ML model');
+const tableScript = path.join(mlDir, 'prediction_table.py');
+
+function resolvePython() {
+  const repoRoot = path.resolve(__dirname, '..', '..');
+  const candidates = [
+    path.join(repoRoot, '.venv', 'Scripts', 'python.exe'),
+    path.join(repoRoot, '.venv', 'bin', 'python')
+  ];
+  return candidates.find((c) => fs.existsSync(c)) || 'python';
+}
+
+// Latest row per (crop, market); the route matches a location against either
+// the city or the market name, newest price first
+async function latestPayloads() {
+  const [rows] = await promisePool.query(`
+    SELECT mp.crop_name, mp.market_name, mp.city, mp.state, mp.modal_price,
+           mp.price_change_percentage, mp.price_date
+    FROM market_prices mp
+    JOIN (SELECT crop_name, market_name, MAX(price_date) AS price_date
+          FROM market_prices GROUP BY crop_name, market_name) latest
+      USING (crop_name, market_name, price_date)
+  `);
+
+  const byPair = new Map();
+  for (const row of rows) {
+    for (const location of new Set([row.city, row.market_name])) {
+      const key = `${row.crop_name}\u001f${location}`;
+      const seen = byPair.get(key);
+      if (!seen || row.price_date > seen.price_date) byPair.set(key, Object.assign({ location }, row));
+    }
+  }
+  return Array.from(byPair.values(), (row) => ({
+    crop: row.crop_name,
+    location: row.location,
+    state: row.state,
+    currentPrice: Number(row.modal_price),
+    change: Number(row.price_change_percentage) || 0
+  }));
+}
+
+function buildTable(payloads) {
+  return new Promise((resolve, reject) => {
+    const proc = spawn(resolvePython(), [tableScript, 'build', '--pairs', '-'],
+      { cwd: mlDir, stdio: ['pipe', 'pipe', 'inherit'] });
+    let output = '';
+    proc.stdout.on('data', (data) => { output += data.toString(); });
+    proc.on('error', reject);
+    proc.on('close', (code) => {
+      if (code !== 0) return reject(new Error(`prediction_table.py exited with code ${code}`));
+      resolve(JSON.parse(output));
+    });
+    proc.stdin.end(payloads.map((p) => JSON.stringify(p)).join('\n') + '\n');
+  });
+}
+
+async function main() {
+  try {
+    const payloads = await latestPayloads();
+    console.log(`Scoring ${payloads.length} crop/location pairs...`);
+    const result = await buildTable(payloads);
+    console.log(`✅ Prediction table: ${result.rows} pairs (model ${result.modelVersion}) in ${result.seconds}s`);
+    process.exit(0);
+  } catch (err) {
+    console.error('❌ Error:', err.message);
+    process.exit(1);
+  }
+}
+
+main();
@@ -1,9 +1,227 @@
 const fs = require('fs');
 const path = require('path');
-const { execSync } = require('child_process');
+const { spawn } = require('child_process');
+
+const TRANSCRIBER_SCRIPT = path.join(__dirname, 'vosk_transcriber.py');
+const PYTHON = process.env.ASR_PYTHON || 'python3';
+const POOL_SIZE = Math.max(1, Number(process.env.ASR_WORKERS) || 2);
+const JOB_TIMEOUT_MS = Number(process.env.ASR_TIMEOUT_MS) || 30000;
+const MAX_QUEUE = Number(process.env.ASR_MAX_QUEUE) || 100;
+const LATENCY_SAMPLES = 500;
+
+const mockTranscriptions = {
+    en: 'I am growing rice on 5 acres. The crop is in flowering stage. I noticed some pest damage and used neem oil spray. I expect 50 quintals of yield.',
+    hi: 'Main 5 bighe par makka ugar raha hoon. Fasal growth stage mein hai. Mujhe kuch insect ka nuksan dikha.',
+    kn: 'Naan 4 acres par sugarcane karandi kondu irukkireen. Growth stage mein hai. Mujhe neelavaada problem illa.',
+};
 
 /**
- * Transcribe audio using Vosk ASR (via Python)
+ * Pool of long-lived `vosk_transcriber.py --worker` processes.
+ * Jobs wait in a FIFO queue and are handed to the next idle worker, one job
+ * per worker at a time. A worker that exceeds the job timeout is killed and
+ * replaced; a worker that exits is respawned. Nothing blocks the event loop.
+ */
+class TranscriberPool {
+    constructor({ size = POOL_SIZE, timeoutMs = JOB_TIMEOUT_MS, maxQueue = MAX_QUEUE, script = TRANSCRIBER_SCRIPT } = {}) {
+        this.size = size;
+        this.script = script;
+        this.timeoutMs = timeoutMs;
+        this.maxQueue = maxQueue;
+        this.workers = [];
+        this.queue = [];
+        this.nextId = 1;
+        this.closed = false;
+        this.stats = {
+            submitted: 0,
+            completed: 0,
+            failed: 0,
+            timeouts: 0,
+            rejected: 0,
+            restarts: 0,
+            maxQueueDepth: 0,
+            backends: {},
+            cacheHits: 0,
+        };
+        this.latencies = [];
+        this.queueWaits = [];
+    }
+
+    start() {
+        while (this.workers.length < this.size) {
+            this.workers.push(this._spawnWorker());
+        }
+        return this;
+    }
+
+    _spawnWorker() {
+        const proc = spawn(PYTHON, [this.script, '--worker'], { stdio: ['pipe', 'pipe', 'pipe'] });
+        const worker = { proc, job: null, buffer: '', alive: true };
+
+        proc.stdout.on('data', (data) => {
+            worker.buffer += data.toString();
+            let newline;
+            while ((newline = worker.buffer.indexOf('\n')) !== -1) {
+                const line = worker.buffer.slice(0, newline).trim();
+                worker.buffer = worker.buffer.slice(newline + 1);
+                if (line) this._onReply(worker, line);
+            }
+        });
+        proc.stderr.on('data', (data) => { console.log('[ASR worker]', data.toString().trim()); });
+        proc.on('error', (err) => {
+            console.error('[ASR] Failed to spawn transcriber worker:', err.message);
+            this._onExit(worker, err);
+        });
+        proc.on('close', (code) => this._onExit(worker, new Error(`Transcriber worker exited with code ${code}`)));
+        proc.stdin.on('error', (err) => this._onExit(worker, err));
+        // Idle workers must not keep the process alive; a running job's timer does
+        proc.unref();
+        for (const stream of [proc.stdin, proc.stdout, proc.stderr]) stream.unref();
+        return worker;
+    }
+
+    _onReply(worker, line) {
+        let reply;
+        try {
+            reply = JSON.parse(line);
+        } catch (e) {
+            console.error('[ASR] Invalid JSON from transcriber worker:', line);
+            return;
+        }
+        const job = worker.job;
+        if (!job || reply.id !== job.id) return;
+        if (reply.partial !== undefined) {
+            // Streaming hypothesis from the recognizer; the final reply follows
+            if (job.onPartial) job.onPartial(reply.partial);
+            return;
+        }
+        worker.job = null;
+        clearTimeout(job.timer);
+        if (reply.error) {
+            this._finish(job, new Error(reply.error));
+        } else {
+            if (reply.backend) this.stats.backends[reply.backend] = (this.stats.backends[reply.backend] || 0) + 1;
+            if (reply.cached) this.stats.cacheHits += 1;
+            this._finish(job, null, reply.text);
+        }
+        this._dispatch();
+    }
+
+    _onExit(worker, err) {
+        if (!worker.alive) return;
+        if (worker.job) {
+            clearTimeout(worker.job.timer);
+            this._finish(worker.job, err);
+            worker.job = null;
+        }
+        this._replace(worker);
+    }
+
+    // Take a worker out of the pool and start its successor. Once it is marked
+    // dead no job is dispatched to it, and its 'close' event is ignored.
+    _replace(worker) {
+        worker.alive = false;
+        this.workers = this.workers.filter((w) => w !== worker);
+        if (!this.closed) {
+            this.stats.restarts += 1;
+            this.workers.push(this._spawnWorker());
+            this._dispatch();
+        }
+    }
+
+    _finish(job, err, text) {
+        const latency = Date.now() - job.submittedAt;
+        this._record(this.latencies, latency);
+        if (err) {
+            this.stats.failed += 1;
+            job.reject(err);
+        } else {
+            this.stats.completed += 1;
+            job.resolve(text);
+        }
+    }
+
+    _record(samples, value) {
+        samples.push(value);
+        if (samples.length > LATENCY_SAMPLES) samples.shift();
+    }
+
+    _dispatch() {
+        for (const worker of this.workers) {
+            if (!this.queue.length) return;
+            if (!worker.alive || worker.job) continue;
+            const job = this.queue.shift();
+            worker.job = job;
+            this._record(this.queueWaits, Date.now() - job.submittedAt);
+            job.timer = setTimeout(() => {
+                // A stuck worker cannot be interrupted mid-job: replace it
+                this.stats.timeouts += 1;
+                worker.job = null;
+                this._finish(job, new Error(`Transcription timed out after ${this.timeoutMs} ms`));
+                worker.proc.kill('SIGKILL');
+                this._replace(worker);
+            }, this.timeoutMs);
+            const message = { id: job.id, audio: job.audioPath, language: job.language };
+            if (job.onPartial) message.partials = true;
+            worker.proc.stdin.write(JSON.stringify(message) + '\n');
+        }
+    }
+
+    transcribe(audioPath, language = 'en', { onPartial = null } = {}) {
+        if (!this.workers.length) this.start();
+        if (this.queue.length >= this.maxQueue) {
+            this.stats.rejected += 1;
+            return Promise.reject(new Error(`ASR queue full (${this.maxQueue} jobs waiting)`));
+        }
+        return new Promise((resolve, reject) => {
+            const job = { id: this.nextId++, audioPath, language, onPartial, resolve, reject, submittedAt: Date.now(), timer: null };
+            this.stats.submitted += 1;
+            this.queue.push(job);
+            this.stats.maxQueueDepth = Math.max(this.stats.maxQueueDepth, this.queue.length);
+            this._dispatch();
+        });
+    }
+
+    metrics() {
+        return Object.assign({
+            workers: this.workers.length,
+            busyWorkers: this.workers.filter((w) => w.job).length,
+            queueDepth: this.queue.length,
+            timeoutMs: this.timeoutMs,
+            latencyMs: summarize(this.latencies),
+            queueWaitMs: summarize(this.queueWaits),
+            cacheHitRate: this.stats.completed ? this.stats.cacheHits / this.stats.completed : null,
+        }, this.stats);
+    }
+
+    close() {
+        this.closed = true;
+        for (const job of this.queue) job.reject(new Error('ASR pool closed'));
+        this.queue = [];
+        for (const worker of this.workers) worker.proc.kill();
+        this.workers = [];
+    }
+}
+
+function percentile(sorted, p) {
+    if (!sorted.length) return null;
+    return sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+}
+
+function summarize(samples) {
+    const sorted = samples.slice().sort((a, b) => a - b);
+    const mean = sorted.length ? sorted.reduce((a, b) => a + b, 0) / sorted.length : null;
+    return { count: sorted.length, mean, p50: percentile(sorted, 0.5), p95: percentile(sorted, 0.95), max: sorted.length ? sorted[sorted.length - 1] : null };
+}
+
+let pool = null;
+
+function getPool() {
+    if (!pool) pool = new TranscriberPool().start();
+    return pool;
+}
+
+/**
+ * Transcribe audio using Vosk ASR (via the Python worker pool)
  * For POC: returns mock transcription if Vosk not available
  */
 async function transcribeAudio(audioPath, language = 'en') {
@@ -13,14 +231,10 @@ async function transcribeAudio(audioPath, language = 'en') {
             console.warn(`[ASR] Audio file not found: ${audioPath}; falling back to mock transcription`);
         } else {
             console.log(`[Vosk] Transcribing: ${audioPath} (${language})`);
-            
+
             try {
-                // Try to use Vosk Python script for real transcription
-                const result = execSync(`python3 ${path.join(__dirname, 'vosk_transcriber.py')} "${audioPath}" "${language}"`, {
-                    encoding: 'utf-8',
-                    timeout: 30000,
-                }).trim();
-                
+                const result = (await getPool().transcribe(audioPath, language) || '').trim();
+
                 if (result && result.length > 0) {
                     console.log(`[Vosk] Result: "${result}"`);
                     return result;
@@ -29,25 +243,31 @@ async function transcribeAudio(audioPath, language = 'en') {
                 console.log(`[Vosk] Vosk not available, using mock: ${vosk_error.message}`);
             }
         }
-        
+
         // Fallback to mock transcription
-        const mockTranscriptions = {
-            en: 'I am growing rice on 5 acres. The crop is in flowering stage. I noticed some pest damage and used neem oil spray. I expect 50 quintals of yield.',
-            hi: 'Main 5 bighe par makka ugar raha hoon. Fasal growth stage mein hai. Mujhe kuch insect ka nuksan dikha.',
-            kn: 'Naan 4 acres par sugarcane karandi kondu irukkireen. Growth stage mein hai. Mujhe neelavaada problem illa.',
-        };
-        
         const transcription = mockTranscriptions[language] || mockTranscriptions['en'];
-        
+
         console.log(`[Mock] Result: "${transcription}"`);
         return transcription;
-        
+
     } catch (error) {
         console.error('[ASR] Error:', error.message);
         throw error;
     }
 }
 
+function getMetrics() {
+    return pool ? pool.metrics() : { workers: 0, queueDepth: 0 };
+}
+
+function shutdown() {
+    if (pool) pool.close();
+    pool = null;
+}
+
 module.exports = {
     transcribeAudio,
+    getMetrics,
+    shutdown,
+    TranscriberPool,
 };
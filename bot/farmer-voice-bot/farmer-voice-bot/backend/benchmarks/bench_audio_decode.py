@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Audio Decode Benchmark
+Decode latency and file I/O per clip for the transcriber's decoding stage,
+against the old pydub fallback that exported a .wav next to the upload.
+
+Methods:
+  legacy   decode at the source rate, export a .wav next to the upload and
+           read it back: the pydub from_file/export round-trip
+           transcribe_audio did when sr.AudioFile failed (reproduced with
+           ffmpeg directly, since pydub also needs ffprobe)
+  stream   vosk_transcriber.iter_pcm_frames(path): 0.25 s frames from an
+           ffmpeg pipe, the decoder the transcriber uses
+
+Synthetic clips (a tone over noise) are generated with ffmpeg in webm/opus,
+ogg/vorbis and mp3. File bytes written are the write_bytes delta of
+/proc/self/io (page-cache writes to files; pipes are not counted), and
+leaked files are files left next to the clip after decoding.
+
+Usage:
+    python benchmarks/bench_audio_decode.py [--seconds 30] [--repeat 5] [--json out.json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+FORMATS = {
+    'webm': ['-c:a', 'libopus', '-b:a', '32k'],
+    'ogg': ['-c:a', 'libvorbis', '-q:a', '3'],
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '64k'],
+}
+
+
+def make_clip(directory, fmt, seconds):
+    """Encode a synthetic voice-note-like clip and return its path."""
+    from vosk_transcriber import ffmpeg_binary
+
+    path = Path(directory) / f'clip.{fmt}'
+    source = (f'sine=frequency=220:duration={seconds}:sample_rate=48000,'
+              f'volume=0.3[a];anoisesrc=duration={seconds}:sample_rate=48000:amplitude=0.05[b];'
+              f'[a][b]amix=inputs=2')
+    subprocess.run([ffmpeg_binary(), '-y', '-loglevel', 'error', '-filter_complex', source,
+                    '-ac', '1', *FORMATS[fmt], str(path)], check=True)
+    return path
+
+
+def file_bytes_written():
+    with open('/proc/self/io') as f:
+        fields = dict(line.split(': ') for line in f.read().split('\n') if line)
+    return int(fields['write_bytes'])
+
+
+def decode_legacy(path):
+    import wave
+    from vosk_transcriber import ffmpeg_binary
+
+    # AudioSegment.from_file: ffmpeg -> wav on stdout at the source rate
+    decoded = subprocess.run([ffmpeg_binary(), '-loglevel', 'error', '-i', str(path),
+                              '-f', 'wav', '-'], stdin=subprocess.DEVNULL,
+                             stdout=subprocess.PIPE, check=True).stdout
+    # sound.export(wav_path): written by Python next to the upload
+    wav_path = path.with_suffix('.wav')
+    with open(wav_path, 'wb') as f:
+        f.write(decoded)
+    # sr.AudioFile(wav_path) + recognizer.record(); its resampling is not timed
+    with wave.open(str(wav_path), 'rb') as wav:
+        return wav.readframes(wav.getnframes())
+
+
+def decode_stream(path):
+    from vosk_transcriber import iter_pcm_frames
+    return sum(len(frame) for frame in iter_pcm_frames(str(path)))
+
+
+METHODS = {
+    'legacy': decode_legacy,
+    'stream': decode_stream,
+}
+
+
+def bench(method, path, repeat):
+    before = set(path.parent.iterdir())
+    latencies = []
+    written = []
+    leaked = 0
+    for _ in range(repeat):
+        start_io = file_bytes_written()
+        started = time.perf_counter()
+        METHODS[method](path)
+        latencies.append((time.perf_counter() - started) * 1000)
+        written.append(file_bytes_written() - start_io)
+        extra = set(path.parent.iterdir()) - before
+        leaked = max(leaked, len(extra))
+        for leftover in extra:
+            leftover.unlink()
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'mean_ms': float(np.mean(latencies)),
+        'file_bytes_written': int(np.mean(written)),
+        'leaked_files': leaked,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--seconds', type=int, default=30, help='clip length')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--formats', nargs='+', default=list(FORMATS))
+    parser.add_argument('--methods', nargs='+', default=list(METHODS))
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{args.seconds} s clips, {args.repeat} runs each")
+    print(f"{'format':<6} {'method':<8} {'p50 ms':>9} {'mean ms':>9} {'file bytes':>12} {'leaked':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.formats:
+            clip_dir = Path(tmp) / fmt
+            clip_dir.mkdir()
+            path = make_clip(clip_dir, fmt, args.seconds)
+            for method in args.methods:
+                # One untimed run so every method starts with a warm page cache
+                bench(method, path, 1)
+                row = bench(method, path, args.repeat)
+                results.setdefault(fmt, {})[method] = row
+                print(f"{fmt:<6} {method:<8} {row['p50_ms']:>9.1f} {row['mean_ms']:>9.1f} "
+                      f"{row['file_bytes_written']:>12,} {row['leaked_files']:>7}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'seconds': args.seconds, 'repeat': args.repeat, 'results': results}, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
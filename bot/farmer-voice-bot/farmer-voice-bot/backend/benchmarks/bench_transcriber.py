@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Transcriber Benchmark
+Cold start, per-clip latency, decode/segmentation throughput, cache hit
+latency and peak RSS of vosk_transcriber.py on synthetic voice notes.
+
+Clips are generated with ffmpeg: tone bursts of 1-4 s ("words") separated
+by short pauses over background noise, encoded as webm/opus like the
+browser recorder's uploads. Measurements:
+  cold_start   one-shot `vosk_transcriber.py clip lang` processes (wall, RSS)
+  transcribe   transcribe_segments in a warm process, cache off
+  pipeline     decode + EnergySegmenter alone (audio seconds per second)
+  cache_hit    transcribe_segments answered from the transcription cache
+The backend that answered is recorded: without a Vosk model or network the
+transcribe numbers measure the mock fallback, not recognition.
+
+Usage:
+    python benchmarks/bench_transcriber.py [--durations 10 60 300] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TRANSCRIBER = BACKEND_DIR / 'vosk_transcriber.py'
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def make_voice_note(path, seconds, seed=42):
+    """Encode a synthetic voice note of `seconds` seconds as webm/opus."""
+    from vosk_transcriber import ffmpeg_binary
+
+    rng = np.random.default_rng(seed)
+    # Alternate "words" and pauses by gating a tone with an on/off volume expression
+    t, gates = 0.0, []
+    while t < seconds:
+        word = rng.uniform(1.0, 4.0)
+        gates.append(f'between(t,{t:.2f},{min(t + word, seconds):.2f})')
+        t += word + rng.uniform(0.5, 1.2)
+    volume = '+'.join(gates) or '0'
+    graph = (f"sine=frequency=180:duration={seconds}:sample_rate=48000,"
+             f"volume='{volume}':eval=frame[v];"
+             f"anoisesrc=duration={seconds}:sample_rate=48000:amplitude=0.004[n];"
+             f"[v][n]amix=inputs=2")
+    subprocess.run([ffmpeg_binary(), '-y', '-loglevel', 'error', '-filter_complex', graph,
+                    '-ac', '1', '-c:a', 'libopus', '-b:a', '32k', str(path)], check=True)
+    return path
+
+
+# Runs a script as __main__ and reports its peak RSS (VmHWM; ru_maxrss would
+# include this process's memory inherited at fork) on stderr's last line
+PEAK_RSS_WRAPPER = r'''
+import runpy, sys
+script = sys.argv.pop(1)
+sys.path.insert(0, script.rsplit('/', 1)[0])
+try:
+    runpy.run_path(script, run_name='__main__')
+finally:
+    with open('/proc/self/status') as f:
+        hwm = [line.split()[1] for line in f if line.startswith('VmHWM:')][0]
+    sys.stderr.write(f'\nPEAK_RSS_KB {hwm}\n')
+'''
+
+
+def peak_rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def summary(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {'n': int(samples.size), 'p50_ms': float(np.percentile(samples, 50)),
+            'p95_ms': float(np.percentile(samples, 95)), 'mean_ms': float(samples.mean())}
+
+
+def cold_start(clip, language, repeats):
+    env = dict(os.environ, ASR_CACHE_PATH='off')
+    walls, rss = [], []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', PEAK_RSS_WRAPPER, str(TRANSCRIBER), str(clip), language],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        walls.append((time.perf_counter() - started) * 1000)
+        rss.append(int(proc.stderr.split()[-1]) / 1024)
+        if proc.returncode != 0:
+            raise RuntimeError(f"vosk_transcriber.py exited with {proc.returncode}")
+    result = summary(walls)
+    result['peak_rss_mb'] = max(rss)
+    return result
+
+
+def bench_clip(clip, seconds, language, repeats, cache_dir):
+    import contextlib
+    import vosk_transcriber as vt
+
+    result = {}
+    with contextlib.redirect_stderr(open(os.devnull, 'w')):
+        vt.CACHE_PATH = 'off'
+        timings, backend = [], None
+        for _ in range(repeats):
+            started = time.perf_counter()
+            backend = vt.transcribe_segments(str(clip), language)['backend']
+            timings.append((time.perf_counter() - started) * 1000)
+        result['transcribe'] = dict(summary(timings), backend=backend,
+                                    realtime_factor=seconds / (np.median(timings) / 1000))
+
+        timings, n_segments = [], 0
+        for _ in range(repeats):
+            started = time.perf_counter()
+            n_segments = sum(1 for _ in vt.iter_segments(str(clip)))
+            timings.append((time.perf_counter() - started) * 1000)
+        result['pipeline'] = dict(summary(timings), segments=n_segments,
+                                  audio_s_per_s=seconds / (np.median(timings) / 1000))
+
+        if vt.backend_fingerprint(language):
+            vt.CACHE_PATH, vt._cache = str(Path(cache_dir) / 'cache.sqlite'), None
+            vt.transcribe_segments(str(clip), language)
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                vt.transcribe_segments(str(clip), language)
+                timings.append((time.perf_counter() - started) * 1000)
+            result['cache_hit'] = summary(timings)
+            vt._cache = None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--durations', nargs='+', type=int, default=[10, 60, 300],
+                        help='clip lengths in seconds')
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--cold-starts', type=int, default=3)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = {'clips': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        clips = {seconds: make_voice_note(Path(tmp) / f'note_{seconds}s.webm', seconds)
+                 for seconds in args.durations}
+        shortest = min(args.durations)
+        results['cold_start'] = cold_start(clips[shortest], args.language, args.cold_starts)
+        results['cold_start']['clip_s'] = shortest
+        print(f"cold start ({shortest} s clip): {json.dumps(results['cold_start'])}")
+        for seconds, clip in clips.items():
+            results['clips'][f'{seconds}s'] = bench_clip(clip, seconds, args.language, args.repeats, tmp)
+            print(f"{seconds:>5} s clip: {json.dumps(results['clips'][f'{seconds}s'])}")
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -201,6 +201,14 @@ app.get('/api/session/:sessionId', (req, res) => {
     res.json(sessions[sessionId]);
 });
 
+/**
+ * GET /api/asr/metrics
+ * Transcriber pool metrics: queue depth, busy workers, latency, timeouts
+ */
+app.get('/api/asr/metrics', (req, res) => {
+    res.json(asrHandler.getMetrics());
+});
+
 /**
  * Health check
  */
@@ -214,6 +222,12 @@ app.use((err, req, res, next) => {
     res.status(500).json({ error: 'Internal server error', message: err.message });
 });
 
+// Stop the transcriber workers with the server
+process.on('SIGTERM', () => {
+    asrHandler.shutdown();
+    process.exit(0);
+});
+
 // Start server
 app.listen(PORT, () => {
     console.log(`🌾 Farmer Voice Bot Backend running on http://localhost:${PORT}`);
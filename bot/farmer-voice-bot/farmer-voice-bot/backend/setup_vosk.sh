@@ -1,23 +1,35 @@
 #!/bin/bash
 # Download and setup Vosk models for offline speech recognition
+# vosk_transcriber.py finds them in $VOSK_MODEL_DIR (default ~/.vosk) by name
 
-VOSK_DIR="$HOME/.vosk"
+VOSK_DIR="${VOSK_MODEL_DIR:-$HOME/.vosk}"
 mkdir -p "$VOSK_DIR"
 
 echo "📥 Downloading Vosk models..."
 
+download_model() {
+    local name="$1"
+    if [ -d "$VOSK_DIR/$name" ]; then
+        echo "$name already present"
+        return
+    fi
+    wget -q -O "$name.zip" "https://alphacephei.com/vosk/models/$name.zip"
+    unzip -q -o "$name.zip"
+    rm -f "$name.zip"
+}
+
+cd "$VOSK_DIR"
+
 # English model
 echo "Downloading English model..."
-cd "$VOSK_DIR"
-wget -q -O vosk-model-en-us-0.42.4.zip https://alphacephei.com/vosk/models/vosk-model-en-us-0.42.4.zip
-unzip -q -o vosk-model-en-us-0.42.4.zip
-rm -f vosk-model-en-us-0.42.4.zip
+download_model vosk-model-small-en-us-0.15
 
 # Hindi model (optional)
 echo "Downloading Hindi model..."
-wget -q -O vosk-model-hi-0.42.4.zip https://alphacephei.com/vosk/models/vosk-model-hi-0.42.4.zip
-unzip -q -o vosk-model-hi-0.42.4.zip
-rm -f vosk-model-hi-0.42.4.zip
+download_model vosk-model-small-hi-0.22
+
+# Python binding (the ffmpeg binary is also needed for webm/ogg/mp3 input)
+pip install -q vosk
 
 echo "✅ Vosk models downloaded and extracted to $VOSK_DIR"
 ls -la "$VOSK_DIR"
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of transcriptions
+Farmers often resend the same voice note after a flaky upload; a resend is
+answered from here without decoding the audio again.
+
+Entries are keyed by sha256(audio bytes) + language + backend fingerprint
+(which backends and models would transcribe it), so a different model never
+returns a stale answer. The store is one SQLite file shared by all worker
+processes (WAL mode). Total size is bounded: the least recently used entries
+are evicted once it exceeds max_bytes. Hit and miss counters are kept in the
+same file, so the hit rate covers every worker.
+
+    python transcript_cache.py [--path FILE]     prints the cache stats as JSON
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'farmer-voice-bot', 'transcripts.sqlite')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+HASH_BLOCK = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def audio_digest(audio_file_path):
+    """sha256 of the file contents, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(audio_file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_key(digest, language, backend):
+    return f"{digest}:{language}:{backend}"
+
+class TranscriptCache:
+    """SQLite-backed LRU cache of transcription results (JSON-serialisable dicts)"""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def _count(self, name):
+        self._db.execute('INSERT INTO counters (name, value) VALUES (?, 1) '
+                         'ON CONFLICT(name) DO UPDATE SET value = value + 1', (name,))
+
+    def get(self, key):
+        """Cached result for key, or None; counts a hit or a miss"""
+        with self._lock:
+            row = self._db.execute('SELECT result FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._count('misses')
+                return None
+            self._db.execute('UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), key))
+            self._count('hits')
+            return json.loads(row[0])
+
+    def put(self, key, result):
+        """Store a result and evict least recently used entries beyond max_bytes"""
+        payload = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.execute('INSERT OR REPLACE INTO entries (key, result, size, created, last_used) '
+                                 'VALUES (?, ?, ?, ?, ?)', (key, payload, len(payload), now, now))
+                self._evict()
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._db.execute('SELECT key, size FROM entries ORDER BY last_used').fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        self._db.execute('INSERT INTO counters (name, value) VALUES (?, ?) '
+                         'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+                         ('evictions', evicted))
+
+    def stats(self):
+        """Entries, bytes, hits, misses, evictions and hit rate"""
+        with self._lock:
+            counters = dict(self._db.execute('SELECT name, value FROM counters').fetchall())
+            entries, size = self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        return {
+            'path': self.path,
+            'entries': entries,
+            'bytes': size,
+            'maxBytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'evictions': counters.get('evictions', 0),
+            'hitRate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+
+    def close(self):
+        self._db.close()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Transcription cache statistics')
+    parser.add_argument('--path', default=os.environ.get('ASR_CACHE_PATH', DEFAULT_PATH))
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        print(f"No cache at {args.path}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(TranscriptCache(args.path).stats(), indent=2))
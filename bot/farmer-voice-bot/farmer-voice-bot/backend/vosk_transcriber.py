@@ -1,71 +1,543 @@
 #!/usr/bin/env python3
 """
 Speech-to-Text transcription using multiple backends
-Tries Google Speech Recognition (with internet) or local fallback
+Tries an offline Vosk model first, then Google Speech Recognition (with
+internet), then a mock transcription
+
+Vosk models live in ~/.vosk (VOSK_MODEL_DIR), see setup_vosk.sh. A model is
+picked per language by directory name (VOSK_MODEL_EN / _HI / _KN override the
+path), loaded once per process and reused for every clip. Audio is decoded to
+16 kHz mono PCM through an ffmpeg pipe and fed to the recognizer in fixed-size
+frames while it decodes; no intermediate .wav is written next to the upload.
+An energy-based segmenter splits the stream at pauses into chunks of at most
+ASR_MAX_CHUNK_S seconds. Long recordings have their chunks transcribed
+concurrently on ASR_CHUNK_WORKERS processes and stitched back in order with
+timestamps; a chunk that fails only loses its own text.
+Results are cached by audio content hash (transcript_cache.py), so a resent
+voice note is answered before anything is decoded.
+ASR_BACKEND=vosk|google restricts the chain to one backend (default: auto).
+
+One-shot:
+    vosk_transcriber.py <audio_file> [language]     prints the transcription
+
+Worker mode (used by asrHandler.js's worker pool):
+    vosk_transcriber.py --worker [--socket PATH]
+Reads one JSON job per line, {"id": 1, "audio": "/path/file.webm", "language": "en"},
+and answers each with one JSON line,
+{"id": 1, "text": "...", "backend": "vosk", "segments": [{"start": 0.0, "end": 4.2, "text": "..."}], "elapsedMs": 812.4}.
+With "partials": true in the job, partial results (Vosk hypotheses, or the
+chunks stitched so far) are streamed first as {"id": 1, "partial": "..."} lines.
+Libraries and models are loaded once per process instead of once per voice note.
+With --socket the same protocol is served on a Unix socket.
 """
 
 import sys
 import os
 import json
+import time
+import collections
+import glob
+import importlib.util
+import itertools
+import shutil
+import subprocess
+import wave
 
-def transcribe_audio(audio_file_path, language='en'):
+import numpy as np
+
+import transcript_cache
+
+SAMPLE_RATE = 16000
+FRAME_BYTES = 8000  # 0.25 s of 16-bit mono audio per recognizer call
+VOSK_MODEL_DIR = os.environ.get('VOSK_MODEL_DIR', os.path.expanduser('~/.vosk'))
+ASR_BACKEND = os.environ.get('ASR_BACKEND', 'auto')
+# Long recordings are split at pauses into chunks of at most ASR_MAX_CHUNK_S
+# seconds, transcribed on ASR_CHUNK_WORKERS processes (1 = in this process).
+# The cores are shared by the ASR_WORKERS resident workers of asrHandler.js.
+MAX_CHUNK_S = float(os.environ.get('ASR_MAX_CHUNK_S', 15))
+MIN_SILENCE_MS = int(os.environ.get('ASR_MIN_SILENCE_MS', 400))
+ASR_WORKERS = max(1, int(os.environ.get('ASR_WORKERS') or 2))
+CHUNK_WORKERS = int(os.environ.get('ASR_CHUNK_WORKERS', max(1, (os.cpu_count() or 1) // ASR_WORKERS)))
+# Results are cached by audio content hash in ASR_CACHE_PATH (off to disable)
+CACHE_PATH = os.environ.get('ASR_CACHE_PATH', transcript_cache.DEFAULT_PATH)
+CACHE_MB = float(os.environ.get('ASR_CACHE_MB', 64))
+
+# Model directory name patterns per language, most specific first
+VOSK_MODEL_PATTERNS = {
+    'en': ['vosk-model-en-in*', 'vosk-model-small-en-in*', 'vosk-model-en-us*', 'vosk-model-small-en-us*'],
+    'hi': ['vosk-model-hi*', 'vosk-model-small-hi*'],
+    # No Kannada model is published; a local one is used if present
+    'kn': ['vosk-model-kn*', 'vosk-model-small-kn*'],
+}
+
+_vosk_models = {}
+_chunk_pool = None
+_cache = None
+
+Segment = collections.namedtuple('Segment', 'start end pcm')
+
+class BackendUnavailable(Exception):
+    """The backend cannot run here (library, model or network missing)"""
+
+def find_vosk_model(language):
+    """Path of the Vosk model directory for a language, or None"""
+    override = os.environ.get(f'VOSK_MODEL_{language.upper()}')
+    if override:
+        return override if os.path.isdir(override) else None
+    for pattern in VOSK_MODEL_PATTERNS.get(language, []):
+        matches = sorted(p for p in glob.glob(os.path.join(VOSK_MODEL_DIR, pattern)) if os.path.isdir(p))
+        if matches:
+            return matches[-1]
+    return None
+
+def load_vosk_model(language):
+    """Load the Vosk model for a language once per process"""
+    if language in _vosk_models:
+        return _vosk_models[language]
+    try:
+        import vosk
+    except ImportError:
+        raise BackendUnavailable("vosk is not installed (pip install vosk)")
+    path = find_vosk_model(language)
+    if path is None:
+        raise BackendUnavailable(f"no Vosk model for '{language}' in {VOSK_MODEL_DIR} (run setup_vosk.sh)")
+    vosk.SetLogLevel(-1)
+    started = time.perf_counter()
+    model = vosk.Model(path)
+    print(f"[Vosk] Loaded {os.path.basename(path)} in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+    _vosk_models[language] = model
+    return model
+
+def ffmpeg_binary():
+    """ffmpeg executable: FFMPEG_BINARY, then PATH, then imageio-ffmpeg's bundled one"""
+    binary = os.environ.get('FFMPEG_BINARY') or shutil.which('ffmpeg')
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        raise BackendUnavailable("ffmpeg not found (install ffmpeg or set FFMPEG_BINARY)")
+
+def _is_pcm_wav(path):
+    """True if path is a 16 kHz mono 16-bit WAV"""
+    try:
+        with wave.open(path, 'rb') as wav:
+            return (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) == (SAMPLE_RATE, 1, 2)
+    except (wave.Error, EOFError):
+        return False
+
+def _decode_command(input_arg):
+    """ffmpeg command writing 16 kHz mono s16le PCM to stdout"""
+    return [ffmpeg_binary(), '-loglevel', 'error', '-i', input_arg,
+            '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-']
+
+def iter_pcm_frames(audio_file_path, frame_bytes=FRAME_BYTES):
+    """Yield 16 kHz mono s16le PCM in frame_bytes pieces while the file decodes
+
+    16 kHz mono WAV is read directly; anything else (webm, ogg, mp3, ...)
+    streams through an ffmpeg pipe, so only one frame is held at a time.
     """
-    Transcribe audio file using SpeechRecognition library
-    Returns transcribed text
+    if not os.path.exists(audio_file_path):
+        raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+    if _is_pcm_wav(audio_file_path):
+        with wave.open(audio_file_path, 'rb') as wav:
+            while True:
+                frame = wav.readframes(frame_bytes // 2)
+                if not frame:
+                    return
+                yield frame
+    proc = subprocess.Popen(_decode_command(audio_file_path), stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            frame = proc.stdout.read(frame_bytes)
+            if not frame:
+                break
+            yield frame
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not decode {audio_file_path}: "
+                               f"{proc.stderr.read().decode(errors='replace').strip()}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+def _frame_rms(pcm, frame_samples):
+    """RMS of each frame_samples-sample frame of 16-bit little-endian PCM"""
+    samples = np.frombuffer(pcm, dtype='<i2').astype(np.float64).reshape(-1, frame_samples)
+    return np.sqrt(np.einsum('ij,ij->i', samples, samples) / frame_samples)
+
+class EnergySegmenter:
+    """Split a 16 kHz mono PCM stream at pauses into bounded chunks
+
+    A 30 ms frame counts as speech when its RMS is above threshold_ratio
+    times the running noise floor (and above min_rms). A chunk ends after
+    min_silence_ms of silence once it is at least min_chunk_s long; a chunk
+    that reaches max_chunk_s without a pause is cut at its quietest frame in
+    the second half. Chunks without any speech are dropped. Only the current
+    chunk is held in memory.
     """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=30, min_silence_ms=400,
+                 min_chunk_s=1.0, max_chunk_s=15.0, threshold_ratio=3.0, min_rms=300):
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self.min_silence = max(1, min_silence_ms // frame_ms)
+        self.min_frames = int(min_chunk_s * 1000 / frame_ms)
+        self.max_frames = max(2, int(max_chunk_s * 1000 / frame_ms))
+        self.threshold_ratio = threshold_ratio
+        self.min_rms = min_rms
+        self.pending = b''
+        self.frames = []  # (pcm, rms, is_speech) of the current chunk
+        self.start_sample = 0
+        self.silence_run = 0
+        self.floor = 0.0
+
+    def feed(self, pcm):
+        """Add PCM bytes; yields the chunks that are complete"""
+        data = self.pending + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self.pending = data[usable:]
+        if not usable:
+            return
+        # RMS of every complete frame in one vectorised pass
+        rms = _frame_rms(data[:usable], self.frame_bytes // 2)
+        for k, offset in enumerate(range(0, usable, self.frame_bytes)):
+            yield from self._add(data[offset:offset + self.frame_bytes], rms[k])
+
+    def flush(self):
+        """End of stream; yields the last chunk"""
+        if len(self.pending) >= 2:
+            frame = self.pending[:len(self.pending) // 2 * 2]
+            yield from self._add(frame, _frame_rms(frame, len(frame) // 2)[0])
+        self.pending = b''
+        if self.frames:
+            segment = self._cut(len(self.frames))
+            if segment is not None:
+                yield segment
+
+    def _add(self, frame, rms):
+        rms = float(rms)
+        is_speech = rms > max(self.min_rms, self.floor * self.threshold_ratio)
+        if rms < self.floor:
+            self.floor = rms
+        elif not is_speech:
+            self.floor = 0.95 * self.floor + 0.05 * rms
+        self.frames.append((frame, rms, is_speech))
+        self.silence_run = 0 if is_speech else self.silence_run + 1
+
+        n = len(self.frames)
+        if n >= self.min_frames and self.silence_run >= self.min_silence:
+            segment = self._cut(n)
+        elif n >= self.max_frames:
+            quietest = min(range(n // 2, n), key=lambda i: self.frames[i][1])
+            segment = self._cut(quietest + 1)
+        else:
+            return
+        if segment is not None:
+            yield segment
+
+    def _cut(self, n):
+        frames, self.frames = self.frames[:n], self.frames[n:]
+        self.silence_run = 0
+        for _, _, is_speech in reversed(self.frames):
+            if is_speech:
+                break
+            self.silence_run += 1
+        pcm = b''.join(frame for frame, _, _ in frames)
+        start = self.start_sample
+        self.start_sample += len(pcm) // 2
+        if not any(is_speech for _, _, is_speech in frames):
+            return None
+        return Segment(start / self.sample_rate, self.start_sample / self.sample_rate, pcm)
+
+def iter_segments(audio_file_path, segmenter=None):
+    """Decode a clip and yield its speech chunks as Segment(start, end, pcm)"""
+    segmenter = segmenter or EnergySegmenter(max_chunk_s=MAX_CHUNK_S, min_silence_ms=MIN_SILENCE_MS)
+    # One second of audio per read, so RMS is computed over ~33 frames at a time
+    for frame in iter_pcm_frames(audio_file_path, frame_bytes=SAMPLE_RATE * 2):
+        yield from segmenter.feed(frame)
+    yield from segmenter.flush()
+
+def recognize_vosk(pcm, language='en', on_partial=None):
+    """Offline recognition of a PCM buffer with the cached Vosk model
+
+    The buffer is fed in FRAME_BYTES frames; on_partial(text) is called
+    whenever the partial hypothesis changes.
+    """
+    import vosk
+
+    model = load_vosk_model(language)
+    recognizer = vosk.KaldiRecognizer(model, SAMPLE_RATE)
+    pieces = []
+    last_partial = ''
+    view = memoryview(pcm)
+    for offset in range(0, len(view), FRAME_BYTES):
+        if recognizer.AcceptWaveform(bytes(view[offset:offset + FRAME_BYTES])):
+            text = json.loads(recognizer.Result()).get('text', '')
+            if text:
+                pieces.append(text)
+            last_partial = ''
+        elif on_partial is not None:
+            partial = json.loads(recognizer.PartialResult()).get('partial', '')
+            if partial and partial != last_partial:
+                last_partial = partial
+                on_partial(' '.join(pieces + [partial]))
+    text = json.loads(recognizer.FinalResult()).get('text', '')
+    if text:
+        pieces.append(text)
+    return ' '.join(pieces)
+
+def recognize_google(pcm, language='en', on_partial=None):
+    """Google Speech Recognition of a PCM buffer (requires internet); no partial results"""
     try:
         import speech_recognition as sr
-        from pydub import AudioSegment
-        
-        # Map language codes to speech_recognition language codes
-        lang_map = {
-            'en': 'en-US',
-            'hi': 'hi-IN',
-            'kn': 'en-IN',  # Use English variant for Kannada as fallback
-        }
-        
-        language_code = lang_map.get(language, 'en-US')
-        
-        # Check if file exists
-        if not os.path.exists(audio_file_path):
-            raise Exception(f"Audio file not found: {audio_file_path}")
-        
-        print(f"[ASR] Transcribing: {audio_file_path} ({language})", file=sys.stderr)
-        
-        # Initialize recognizer
-        recognizer = sr.Recognizer()
-        
-        # Load audio file
+    except ImportError as e:
+        raise BackendUnavailable(f"speech_recognition not installed ({e})")
+
+    # Map language codes to speech_recognition language codes
+    lang_map = {
+        'en': 'en-US',
+        'hi': 'hi-IN',
+        'kn': 'en-IN',  # Use English variant for Kannada as fallback
+    }
+
+    language_code = lang_map.get(language, 'en-US')
+
+    # Initialize recognizer
+    recognizer = sr.Recognizer()
+    audio_data = sr.AudioData(pcm, SAMPLE_RATE, 2)
+
+    try:
+        text = recognizer.recognize_google(audio_data, language=language_code)
+        print(f"[Google] Result: \"{text}\"", file=sys.stderr)
+        return text
+    except sr.UnknownValueError:
+        print("[Google] Could not understand audio", file=sys.stderr)
+        return None
+    except sr.RequestError as e:
+        raise BackendUnavailable(f"Google request failed: {e}")
+
+BACKENDS = {
+    'vosk': recognize_vosk,
+    'google': recognize_google,
+}
+
+def backend_chain():
+    """Backends to try, in order, according to ASR_BACKEND"""
+    if ASR_BACKEND in BACKENDS:
+        return [ASR_BACKEND]
+    return ['vosk', 'google']
+
+def ready_backends(language):
+    """Backends of the chain whose library (and model) are present"""
+    ready = []
+    for name in backend_chain():
         try:
-            with sr.AudioFile(audio_file_path) as source:
-                audio_data = recognizer.record(source)
+            if name == 'vosk':
+                load_vosk_model(language)
+            else:
+                import speech_recognition  # noqa: F401
+        except (BackendUnavailable, ImportError) as e:
+            print(f"[ASR] {name} unavailable: {e}", file=sys.stderr)
+            continue
+        ready.append(name)
+    return ready
+
+def transcribe_segment(pcm, language='en', backends=None, on_partial=None):
+    """
+    Transcribe one chunk of PCM with the first backend that works
+    Returns (text, backend name), with text '' when the backends that ran
+    heard no speech; raises if every backend failed
+    """
+    errors = []
+    silent = None
+    for name in backends or backend_chain():
+        try:
+            text = BACKENDS[name](pcm, language, on_partial)
         except Exception as e:
-            # If direct load fails, try converting with pydub
-            try:
-                sound = AudioSegment.from_file(audio_file_path)
-                wav_path = audio_file_path.replace('.webm', '.wav')
-                sound.export(wav_path, format='wav')
-                
-                with sr.AudioFile(wav_path) as source:
-                    audio_data = recognizer.record(source)
-            except Exception as conv_error:
-                raise Exception(f"Could not load audio: {e}, {conv_error}")
-        
-        # Try Google Speech Recognition (requires internet)
+            errors.append(f"{name}: {e}")
+            continue
+        if text:
+            return text, name
+        # No speech is an answer too, but a later backend may still hear some
+        silent = silent or name
+    if silent is not None:
+        return '', silent
+    raise RuntimeError('; '.join(errors) or 'no backend')
+
+def chunk_pool():
+    """Process pool shared by all clips of this process, or None when serial"""
+    global _chunk_pool
+    if _chunk_pool is None and CHUNK_WORKERS > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Not fork: the socket server runs threads, and a forked child only
+        # gets a copy of the thread that forked. Each chunk process loads the
+        # ASR_PRELOAD models itself when it starts.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        _chunk_pool = ProcessPoolExecutor(CHUNK_WORKERS, mp_context=context, initializer=warm_up)
+    return _chunk_pool
+
+def _segment_result(segment, text=None, backend=None, error=None):
+    result = {'start': round(segment.start, 2), 'end': round(segment.end, 2)}
+    if error is None:
+        result.update(text=text, backend=backend)
+    else:
+        print(f"[ASR] Segment {segment.start:.1f}-{segment.end:.1f}s failed: {error}", file=sys.stderr)
+        result.update(text='', error=str(error))
+    return result
+
+def _transcribe_segments_serial(segments, language, backends, on_partial):
+    done = []
+    for segment in segments:
+        prefix = ' '.join(s['text'] for s in done if s['text'])
+        partial = None
+        if on_partial is not None:
+            def partial(text, prefix=prefix):
+                on_partial(f"{prefix} {text}".strip())
         try:
-            text = recognizer.recognize_google(audio_data, language=language_code)
-            print(f"[Google] Result: \"{text}\"", file=sys.stderr)
-            return text
-        except sr.UnknownValueError:
-            print("[Google] Could not understand audio", file=sys.stderr)
-            return get_mock_transcription(language)
-        except sr.RequestError as e:
-            print(f"[Google] Error: {e}", file=sys.stderr)
-            return get_mock_transcription(language)
-        
+            text, backend = transcribe_segment(segment.pcm, language, backends, partial)
+            done.append(_segment_result(segment, text, backend))
+        except Exception as e:
+            done.append(_segment_result(segment, error=e))
+    return done
+
+def _transcribe_segments_parallel(segments, language, backends, on_partial, pool):
+    """Transcribe chunks on the pool as they are decoded, collecting them in order"""
+    pending = []
+    done = []
+
+    def collect_oldest():
+        segment, future = pending.pop(0)
+        try:
+            text, backend = future.result()
+            done.append(_segment_result(segment, text, backend))
+        except Exception as e:
+            done.append(_segment_result(segment, error=e))
+        if on_partial is not None:
+            on_partial(' '.join(s['text'] for s in done if s['text']))
+
+    for segment in segments:
+        # Bound the decoded audio waiting for a worker
+        while len(pending) >= 2 * CHUNK_WORKERS:
+            collect_oldest()
+        pending.append((segment, pool.submit(transcribe_segment, segment.pcm, language, backends)))
+    while pending:
+        collect_oldest()
+    return done
+
+def get_cache():
+    """The shared transcription cache, or None if ASR_CACHE_PATH=off"""
+    global _cache
+    if _cache is None and CACHE_PATH not in ('', 'off'):
+        try:
+            _cache = transcript_cache.TranscriptCache(CACHE_PATH, max_bytes=int(CACHE_MB * 1024 * 1024))
+        except Exception as e:
+            print(f"[ASR] Transcription cache disabled: {e}", file=sys.stderr)
+            _cache = False
+    return _cache or None
+
+def backend_fingerprint(language):
+    """Which backends and models would transcribe this language, without loading them"""
+    parts = []
+    for name in backend_chain():
+        if name == 'vosk':
+            path = find_vosk_model(language)
+            if path and importlib.util.find_spec('vosk'):
+                parts.append(f"vosk:{os.path.basename(os.path.normpath(path))}")
+        elif importlib.util.find_spec('speech_recognition'):
+            parts.append(name)
+    return ','.join(parts)
+
+def transcribe_segments(audio_file_path, language='en', on_partial=None):
+    """
+    Transcribe an audio file chunk by chunk
+    Returns {"text", "backend", "segments": [{"start", "end", "text", "backend"|"error"}]}
+    plus "cached": true when the answer came from the transcription cache, and
+    "noSpeech": true when the clip decoded but no backend heard any speech
+
+    The cache is checked (by content hash) before anything is decoded.
+    Speech chunks from EnergySegmenter are transcribed on the chunk pool
+    (or inline for a single chunk / CHUNK_WORKERS <= 1) and stitched back in
+    order. A chunk that fails only loses its own text; the mock is used when
+    nothing could be transcribed at all. Clips without speech are cached
+    like any other answer.
+    """
+    if not os.path.exists(audio_file_path):
+        print(f"[ASR] Error: Audio file not found: {audio_file_path}", file=sys.stderr)
+        return {'text': get_mock_transcription(language), 'backend': 'mock', 'segments': []}
+
+    cache = get_cache()
+    fingerprint = backend_fingerprint(language)
+    key = None
+    if cache is not None and fingerprint:
+        digest = transcript_cache.audio_digest(audio_file_path)
+        key = transcript_cache.cache_key(digest, language, fingerprint)
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"[ASR] Cache hit: {audio_file_path} ({language})", file=sys.stderr)
+            return dict(cached, cached=True)
+
+    result = _transcribe_segments(audio_file_path, language, on_partial)
+    # Fallbacks and partly failed clips are not cached, so a retry can do better
+    if key is not None and (result['backend'] != 'mock' or result.get('noSpeech')) \
+            and not any('error' in segment for segment in result['segments']):
+        cache.put(key, result)
+    return result
+
+def _transcribe_segments(audio_file_path, language, on_partial):
+    mock = {'text': get_mock_transcription(language), 'backend': 'mock', 'segments': []}
+    print(f"[ASR] Transcribing: {audio_file_path} ({language})", file=sys.stderr)
+    backends = ready_backends(language)
+    if not backends:
+        return mock
+    segments = iter_segments(audio_file_path)
+    try:
+        first = next(segments, None)
+        second = next(segments, None)
+        if first is None:
+            print("[ASR] No speech detected", file=sys.stderr)
+            return dict(mock, noSpeech=True)
+        pool = chunk_pool() if second is not None else None
+        ordered = itertools.chain([first], [second] if second is not None else [], segments)
+        if pool is None:
+            done = _transcribe_segments_serial(ordered, language, backends, on_partial)
+        else:
+            done = _transcribe_segments_parallel(ordered, language, backends, on_partial, pool)
     except Exception as e:
         print(f"[ASR] Error: {e}", file=sys.stderr)
-        return get_mock_transcription(language)
+        return mock
+
+    text = ' '.join(s['text'] for s in done if s['text'])
+    if not text:
+        if not any('error' in s for s in done):
+            print("[ASR] No speech recognized", file=sys.stderr)
+            return dict(mock, segments=done, noSpeech=True)
+        return dict(mock, segments=done)
+    used = {s['backend'] for s in done if s['text']}
+    return {'text': text, 'backend': used.pop() if len(used) == 1 else 'mixed', 'segments': done}
+
+def transcribe_with_backend(audio_file_path, language='en', on_partial=None):
+    """
+    Transcribe an audio file with the first backend that works
+    Returns (text, backend name); the mock is used when none does
+    """
+    result = transcribe_segments(audio_file_path, language, on_partial)
+    return result['text'], result['backend']
+
+def transcribe_audio(audio_file_path, language='en'):
+    """
+    Transcribe audio file with the offline Vosk model, Google or the mock
+    Returns transcribed text
+    """
+    return transcribe_with_backend(audio_file_path, language)[0]
 
 def get_mock_transcription(language='en'):
     """Return mock transcription for fallback"""
@@ -76,13 +548,109 @@ def get_mock_transcription(language='en'):
     }
     return mocks.get(language, mocks['en'])
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
+def warm_up(languages=None):
+    """Load the ASR libraries and Vosk models up front so the first job does not pay for it"""
+    if languages is None:
+        languages = [l for l in os.environ.get('ASR_PRELOAD', 'en').split(',') if l]
+    if 'vosk' in backend_chain():
+        for language in languages:
+            try:
+                load_vosk_model(language)
+            except BackendUnavailable as e:
+                print(f"[ASR] Vosk unavailable for '{language}': {e}", file=sys.stderr)
+    if 'google' in backend_chain():
+        try:
+            import speech_recognition  # noqa: F401
+        except ImportError as e:
+            print(f"[ASR] Google backend unavailable ({e})", file=sys.stderr)
+
+def handle_job(line, emit=None):
+    """Run one JSON job line and return the JSON reply line
+
+    If the job asks for "partials", emit(line) is called with each partial
+    result line before the reply is returned.
+    """
+    started = time.perf_counter()
+    try:
+        job = json.loads(line)
+        if not isinstance(job, dict) or 'audio' not in job:
+            raise ValueError('job must be an object with an "audio" path')
+    except ValueError as e:
+        return json.dumps({'error': 'Invalid job', 'details': str(e)})
+    reply = {'id': job.get('id')}
+    on_partial = None
+    if job.get('partials') and emit is not None:
+        def on_partial(text):
+            emit(json.dumps({'id': job.get('id'), 'partial': text}, ensure_ascii=False))
+    try:
+        reply.update(transcribe_segments(job['audio'], job.get('language', 'en'), on_partial))
+    except Exception as e:
+        reply['error'] = str(e)
+    reply['elapsedMs'] = round((time.perf_counter() - started) * 1000, 1)
+    return json.dumps(reply, ensure_ascii=False)
+
+def serve(instream=None, outstream=None):
+    """Worker loop: one job per input line, one reply per output line"""
+    instream = instream or sys.stdin
+    outstream = outstream or sys.stdout
+
+    def emit(reply):
+        outstream.write(reply + '\n')
+        outstream.flush()
+
+    for line in instream:
+        if not line.strip():
+            continue
+        emit(handle_job(line, emit))
+
+def serve_socket(socket_path):
+    """Serve the worker protocol on a Unix socket, one thread per connection"""
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def emit(self, reply):
+            self.wfile.write((reply + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode('utf-8')
+                if not line.strip():
+                    continue
+                self.emit(handle_job(line, self.emit))
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as server:
+        print(f"[ASR] Worker listening on {socket_path}", file=sys.stderr)
+        server.serve_forever()
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Speech-to-text for farmer voice notes')
+    parser.add_argument('audio_file', nargs='?', help='audio file to transcribe (one-shot mode)')
+    parser.add_argument('language', nargs='?', default='en', help='language code: en, hi, kn')
+    parser.add_argument('--worker', action='store_true',
+                        help='stay resident and read JSON jobs from stdin (or --socket)')
+    parser.add_argument('--socket', metavar='PATH', help='with --worker, listen on this Unix socket')
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        warm_up()
+        print("[ASR] Worker ready", file=sys.stderr)
+        if args.socket:
+            serve_socket(args.socket)
+        else:
+            serve()
+        return
+
+    if not args.audio_file:
         print("Usage: vosk_transcriber.py <audio_file> [language]")
         sys.exit(1)
     
-    audio_file = sys.argv[1]
-    language = sys.argv[2] if len(sys.argv) > 2 else 'en'
-    
-    result = transcribe_audio(audio_file, language)
+    result = transcribe_audio(args.audio_file, args.language)
     print(result)
+
+if __name__ == '__main__':
+    main()